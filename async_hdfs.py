@@ -0,0 +1,134 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from hdfs_simulator import HDFSSimulator
+
+
+class AsyncHDFS:
+    """
+    Capa de E/S en segundo plano sobre HDFSSimulator.
+
+    Las operaciones se ejecutan en un único hilo de E/S, en el orden en que
+    se piden, mientras el hilo que las pide sigue calculando:
+
+    - write_behind: encola la escritura de un archivo y vuelve enseguida.
+      La cola está acotada (max_pending): si está llena, la llamada espera a
+      que termine la escritura más antigua, así la memoria no crece sin límite
+      cuando el disco es más lento que el cálculo.
+    - submit: encola cualquier función (por ejemplo, marcar una tarea como
+      terminada); corre después de las escrituras encoladas antes.
+    - prefetch / read_file: lectura anticipada de un archivo completo, por
+      ejemplo la partición del siguiente reducer mientras se reduce la actual.
+
+    También ofrece corrutinas (write_file_async, read_file_async) para usar
+    el HDFS simulado desde asyncio sin bloquear el bucle de eventos.
+
+    Un error de escritura se propaga en la siguiente llamada a write_behind,
+    submit o flush. Como la cola es FIFO, un archivo leído con read_file o
+    prefetch ya incluye las escrituras encoladas antes; para leerlo
+    directamente con el HDFSSimulator hay que llamar antes a flush().
+    """
+
+    def __init__(self, hdfs: HDFSSimulator, max_pending: int = 4):
+        """
+        Args:
+            hdfs: Simulador HDFS sobre el que se hace la E/S
+            max_pending: Operaciones encoladas y sin terminar como máximo
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending debe ser mayor que 0")
+        self.hdfs = hdfs
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hdfs-io")
+        self._pending = deque()
+        self._prefetched: Dict[str, Future] = {}
+
+    def __enter__(self) -> "AsyncHDFS":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Ya hay un error: se descartan las operaciones que no empezaron y
+            # se espera a la que está en curso, sin ocultar el error original
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._pending.clear()
+            self._prefetched.clear()
+
+    def _reap(self):
+        # Recoge las operaciones terminadas (y propaga su error, si lo hubo)
+        while self._pending and self._pending[0].done():
+            self._pending.popleft().result()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Encola fn(*args) en el hilo de E/S, esperando si la cola está llena.
+
+        Returns:
+            Future con el resultado de fn
+        """
+        self._reap()
+        while len(self._pending) >= self.max_pending:
+            self._pending.popleft().result()
+        future = self._executor.submit(fn, *args)
+        self._pending.append(future)
+        return future
+
+    def write_behind(self, file_path: str, data: Iterable[Tuple[Any, Any]], step: str = "") -> Future:
+        """
+        Encola la escritura de un archivo (ver HDFSSimulator.write_file).
+        data no debe modificarse después: se escribe más tarde desde otro hilo.
+        """
+        return self.submit(self.hdfs.write_file, file_path, data, step)
+
+    def prefetch(self, file_path: str):
+        """
+        Empieza a leer un archivo completo en segundo plano (no cuenta para
+        el límite de la cola: la lectura ocupa memoria, no disco pendiente).
+        """
+        if file_path not in self._prefetched:
+            self._prefetched[file_path] = self._executor.submit(self.hdfs.read_file, file_path)
+
+    def read_file(self, file_path: str) -> List[Tuple[Any, Any]]:
+        """
+        Registros de un archivo: los leídos por adelantado con prefetch o,
+        si no se pidió, una lectura nueva en el hilo de E/S (detrás de las
+        escrituras encoladas).
+        """
+        future = self._prefetched.pop(file_path, None)
+        if future is None:
+            future = self._executor.submit(self.hdfs.read_file, file_path)
+        return future.result()
+
+    def flush(self):
+        """
+        Espera a que terminen todas las operaciones encoladas.
+        """
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self):
+        """
+        Vacía la cola y detiene el hilo de E/S.
+        """
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._prefetched.clear()
+
+    async def write_file_async(self, file_path: str, data: Iterable[Tuple[Any, Any]], step: str = ""):
+        """
+        Corrutina: escribe un archivo en el hilo de E/S.
+        """
+        await asyncio.wrap_future(self._executor.submit(self.hdfs.write_file, file_path, data, step))
+
+    async def read_file_async(self, file_path: str) -> List[Tuple[Any, Any]]:
+        """
+        Corrutina: lee un archivo completo en el hilo de E/S.
+        """
+        future = self._prefetched.pop(file_path, None) or self._executor.submit(self.hdfs.read_file, file_path)
+        return await asyncio.wrap_future(future)
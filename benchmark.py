@@ -0,0 +1,431 @@
+"""
+Banco de pruebas reproducible de los motores MapReduce.
+
+Genera datos sintéticos deterministas (un CSV de clientes con el mismo
+esquema que data/customers-2000000.csv) y ejecuta cada motor sobre ellos,
+cada caso en un proceso nuevo, para medir de forma comparable:
+
+    - registros por segundo y tiempo total
+    - tiempo de pared por fase (map, shuffle, reduce)
+    - pico de memoria residente (RSS) del driver y de sus procesos hijos
+    - bytes escritos a disco (incluye derrames del shuffle y archivos HDFS)
+
+Uso:
+    python benchmark.py                                  # CSV de 10k y 100k filas
+    python benchmark.py --sizes 1000000 --engines process hdfs
+    python benchmark.py --corpus                         # texto de la Divina Comedia
+    python benchmark.py --json resultados.json
+    python benchmark.py --generate data/customers-2000000.csv --rows 2000000
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from columnar import value_counts
+from hdfs_simulator import HDFSSimulator
+from input_formats import CSVInputFormat, TextInputFormat
+from input_readers import parse_csv_line
+from job_logging import QUIET
+from process_pool_map_reduce import ProcessPoolMapReduce
+from simple_map_reduce import SimpleMapReduce
+from simple_map_reduce_hdfs import SimpleMapReduceHDFS
+from threaded_word_count_csv import ThreadedWordCountMapReduce
+from word_count_hdfs import WordCountMapReduce as HDFSWordCount
+from word_counts import WordCountMapReduce as CountryCount
+
+DEFAULT_SIZES = (10000, 100000)
+ENGINES = ("simple", "threaded", "process", "hdfs")
+# Cada cuánto se revisa si el proceso de un caso sigue vivo mientras se espera su resultado
+_POLL_SECONDS = 1.0
+DANTE_PATH = os.path.join("data", "La_divina_comedia-Dante_Alighieri.txt")
+
+CUSTOMERS_HEADER = ["Index", "Customer Id", "First Name", "Last Name", "Company", "City", "Country",
+                    "Phone 1", "Phone 2", "Email", "Subscription Date", "Website"]
+_COUNTRIES = ["Chile", "Peru", "Argentina", "Colombia", "Mexico", "Spain", "Italy", "France",
+              "Germany", "Brazil", "Uruguay", "Bolivia", "Ecuador", "Paraguay", "Portugal",
+              "Canada", "United States of America", "Japan", "China", "India",
+              "Korea, Republic of", "Congo, The Democratic Republic of the", "Iran, Islamic Republic of",
+              "Bahamas, The", "Micronesia, Federated States of"]
+_FIRST_NAMES = ["Ana", "Luis", "Camila", "Jorge", "Sofía", "Mateo", "Valentina", "Diego", "Lucía",
+                "Martín", "Isabella", "Tomás", "Dante", "Beatrice", "Virgilio"]
+_LAST_NAMES = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva",
+               "Martínez", "Sepúlveda", "Alighieri", "Portinari"]
+_CITIES = ["Santiago", "Lima", "Bogotá", "Madrid", "Florencia", "Roma", "Lyon", "Quito", "Montevideo"]
+
+# Métodos de cada motor que corresponden a cada fase (se cronometran si existen)
+_PHASE_METHODS = {
+    "map": ("_map_phase", "_map_blocks_phase", "_threaded_map_phase",
+            "_parallel_map_phase", "_parallel_map_splits_phase"),
+    "shuffle": ("_shuffle_phase",),
+    "reduce": ("_reduce_phase", "_threaded_reduce_phase", "_parallel_reduce_phase"),
+}
+
+
+def generate_customers_csv(path: str, num_rows: int, seed: int = 42) -> str:
+    """
+    Escribe un CSV de clientes sintético y determinista (misma semilla, mismo archivo).
+    La columna 6 es el país; algunos países y empresas llevan comas, así que
+    esos campos quedan entre comillas como en el archivo original.
+
+    Args:
+        path: Ruta del CSV a crear
+        num_rows: Número de filas de datos (sin contar el encabezado)
+        seed: Semilla del generador
+
+    Returns:
+        La ruta del archivo creado
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CUSTOMERS_HEADER)
+        for index in range(1, num_rows + 1):
+            first = rng.choice(_FIRST_NAMES)
+            last = rng.choice(_LAST_NAMES)
+            partner = rng.choice(_LAST_NAMES)
+            company = rng.choice([f"{last} Ltd", f"{last}, {partner} and Sons", f"{partner} PLC"])
+            writer.writerow([
+                index,
+                f"{rng.getrandbits(48):012x}",
+                first,
+                last,
+                company,
+                rng.choice(_CITIES),
+                rng.choice(_COUNTRIES),
+                f"+56-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+                f"{rng.randint(100, 999)}.{rng.randint(100, 999)}.{rng.randint(1000, 9999)}",
+                f"{first.lower()}.{last.lower()}{index}@example.com",
+                f"20{rng.randint(20, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                f"https://www.{partner.lower()}.com/",
+            ])
+    return path
+
+
+def _words(line: str) -> List[Tuple[str, int]]:
+    # Misma normalización que word_count_hdfs.WordCountMapReduce
+    words = (word.strip('.,!?";') for word in line.lower().split())
+    return [(word, 1) for word in words if word]
+
+
+class SimpleWordCount(SimpleMapReduce):
+    """
+    Conteo de palabras de un texto con SimpleMapReduce.
+    """
+
+    # Cada par vale 1, así que "count" equivale a sumar; como además hay
+    # combine_function, el corpus comprueba que ningún motor cuente los
+    # pares ya combinados (el CSV de clientes cubre "sum")
+    numeric_aggregation = "count"
+
+    def map_function(self, key: Any, value: str) -> List[Tuple[str, int]]:
+        return _words(value)
+
+    def reduce_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        return [(key, sum(values))]
+
+    def combine_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        return [(key, sum(values))]
+
+
+class ThreadedWordCount(ThreadedWordCountMapReduce):
+    """
+    Conteo de palabras de un texto con el motor de hilos (sin modo por columnas).
+    """
+
+    input_columns = None
+    # Igual que SimpleWordCount: conteo de pares con combinador
+    numeric_aggregation = "count"
+
+    def map_function(self, key: Any, value: str) -> List[Tuple[str, int]]:
+        return _words(value)
+
+
+class HDFSCountryCount(SimpleMapReduceHDFS):
+    """
+    Conteo de clientes por país (columna 6) con SimpleMapReduceHDFS.
+    """
+
+    input_columns = (6,)
+
+    def map_function(self, key: Any, value: Any) -> List[Tuple[str, int]]:
+        columns = parse_csv_line(value)
+        return [(columns[6], 1)] if len(columns) >= 7 else []
+
+    def reduce_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        return [(key, sum(values))]
+
+    def combine_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        return [(key, sum(values))]
+
+    def map_batch_function(self, columns: Dict[int, List[str]]) -> List[Tuple[str, int]]:
+        return value_counts(columns[6])
+
+
+def _build_case(engine: str, dataset: str, path: str, scratch: str) -> Tuple[Any, Callable[[], List[Tuple[Any, Any]]]]:
+    """
+    Crea el motor de un caso y la función que lo ejecuta sobre el archivo.
+    """
+    if dataset == "customers":
+        if engine == "simple":
+            job = CountryCount(verbosity=QUIET)
+            return job, lambda: job.execute(CSVInputFormat(raw_values="memoryview").read_records(path))
+        if engine == "threaded":
+            job = ThreadedWordCountMapReduce(verbosity=QUIET)
+            return job, lambda: job.execute(CSVInputFormat(raw_values="bytes").read_records(path))
+        if engine == "process":
+            job = ProcessPoolMapReduce(ThreadedWordCountMapReduce(num_threads=1, verbosity=QUIET), verbosity=QUIET)
+            return job, lambda: job.execute_file(path, CSVInputFormat())
+        hdfs = HDFSSimulator(base_path=os.path.join(scratch, "hdfs"), verbosity=QUIET)
+        hdfs.put_file(path, "input/customers.csv")
+        job = HDFSCountryCount(verbosity=QUIET, hdfs=hdfs)
+        return job, lambda: job.execute_file("input/customers.csv", skip_header=True)
+
+    if engine == "simple":
+        job = SimpleWordCount(verbosity=QUIET)
+        return job, lambda: job.execute(TextInputFormat().read_records(path))
+    if engine == "threaded":
+        job = ThreadedWordCount(verbosity=QUIET)
+        return job, lambda: job.execute(TextInputFormat().read_records(path))
+    if engine == "process":
+        job = ProcessPoolMapReduce(SimpleWordCount(verbosity=QUIET), verbosity=QUIET)
+        return job, lambda: job.execute_file(path, TextInputFormat())
+    hdfs = HDFSSimulator(base_path=os.path.join(scratch, "hdfs"), verbosity=QUIET)
+    hdfs.put_file(path, "input/corpus.txt")
+    job = HDFSWordCount(verbosity=QUIET, hdfs=hdfs)
+    return job, lambda: job.execute_file("input/corpus.txt")
+
+
+def _time_phases(engine: Any, timings: Dict[str, float]):
+    """
+    Envuelve los métodos de fase del motor para acumular su tiempo de pared.
+    """
+    for phase, method_names in _PHASE_METHODS.items():
+        for name in method_names:
+            method = getattr(engine, name, None)
+            if method is None:
+                continue
+
+            def timed(*args, _method=method, _phase=phase, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    timings[_phase] = timings.get(_phase, 0.0) + time.perf_counter() - start
+
+            setattr(engine, name, timed)
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _bytes_written() -> Optional[int]:
+    """
+    Bytes enviados a disco por este proceso y sus hijos ya terminados
+    (/proc/self/io, solo Linux). Cuenta también archivos temporales borrados.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines() if line)
+    except OSError:
+        return None
+    return int(counters["write_bytes"])
+
+
+def _run_case(engine: str, dataset: str, path: str, num_records: int, queue: multiprocessing.Queue):
+    """
+    Ejecuta un caso dentro de un proceso dedicado y envía sus métricas por la cola.
+    """
+    scratch = tempfile.mkdtemp(prefix="mapreduce_bench_")
+    # Los derrames del shuffle externo y los temporales de los motores van al directorio del caso
+    tempfile.tempdir = scratch
+    try:
+        job, run = _build_case(engine, dataset, path, scratch)
+        timings = {}
+        _time_phases(job, timings)
+
+        written_before = _bytes_written()
+        start = time.perf_counter()
+        results = run()
+        elapsed = time.perf_counter() - start
+        written_after = _bytes_written()
+
+        queue.put({
+            "engine": engine,
+            "dataset": dataset,
+            "input": path,
+            "records": num_records,
+            "seconds": round(elapsed, 4),
+            "records_per_s": round(num_records / elapsed) if elapsed else None,
+            "phases": {phase: round(seconds, 4) for phase, seconds in timings.items()},
+            "peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+            "children_peak_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            "bytes_written": None if written_before is None else written_after - written_before,
+            "distinct_keys": len(results),
+            "total_count": sum(value for _, value in results),
+        })
+    except Exception as exc:
+        queue.put({"engine": engine, "dataset": dataset, "input": path, "records": num_records,
+                   "error": repr(exc)})
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_case(engine: str, dataset: str, path: str, num_records: int,
+             timeout: float = None) -> Dict[str, Any]:
+    """
+    Ejecuta un caso en un proceso nuevo, de modo que el pico de RSS y los
+    bytes escritos correspondan solo a ese motor.
+
+    Args:
+        engine: "simple", "threaded", "process" o "hdfs"
+        dataset: "customers" (conteo por país) o "corpus" (conteo de palabras)
+        path: Archivo de entrada
+        num_records: Registros del archivo (para calcular registros/s)
+        timeout: Segundos máximos del caso (None = sin límite); al superarlos
+            se termina el proceso
+
+    Returns:
+        Diccionario con las métricas del caso (o "error" si falló, si el
+        proceso terminó sin enviar resultado o si superó el tiempo máximo)
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_case, args=(engine, dataset, path, num_records, queue))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    error = None
+    while True:
+        try:
+            result = queue.get(timeout=_POLL_SECONDS)
+            break
+        except queue_module.Empty:
+            pass
+        if not process.is_alive():
+            # El resultado pudo quedar en la cola justo antes de que el proceso terminara
+            try:
+                result = queue.get(timeout=_POLL_SECONDS)
+                break
+            except queue_module.Empty:
+                error = f"el proceso terminó sin resultado (exitcode {process.exitcode})"
+        elif deadline is not None and time.monotonic() > deadline:
+            process.terminate()
+            error = f"superó el tiempo máximo de {timeout:g}s"
+        if error is not None:
+            result = {"engine": engine, "dataset": dataset, "input": path, "records": num_records,
+                      "error": error}
+            break
+    process.join()
+    return result
+
+
+def _count_lines(path: str) -> int:
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _print_table(results: List[Dict[str, Any]]):
+    header = f"{'motor':<10}{'datos':<20}{'registros':>11}{'seg':>9}{'reg/s':>11}" \
+             f"{'map':>8}{'shuffle':>9}{'reduce':>8}{'RSS MB':>9}{'hijos MB':>10}{'MB escritos':>13}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        label = f"{result['dataset']}"
+        if "error" in result:
+            print(f"{result['engine']:<10}{label:<20}{result['records']:>11}  ERROR: {result['error']}")
+            continue
+        phases = result["phases"]
+        written = result["bytes_written"]
+        print(f"{result['engine']:<10}{label:<20}{result['records']:>11}{result['seconds']:>9.2f}"
+              f"{result['records_per_s']:>11}"
+              f"{phases.get('map', 0):>8.2f}{phases.get('shuffle', 0):>9.2f}{phases.get('reduce', 0):>8.2f}"
+              f"{result['peak_rss_mb']:>9.1f}{result['children_peak_rss_mb']:>10.1f}"
+              f"{'-' if written is None else f'{written / 1e6:.2f}':>13}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Compara los motores MapReduce sobre datos generados.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Filas de los CSV de clientes a generar")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador de datos")
+    parser.add_argument("--corpus", nargs="?", const=DANTE_PATH, default=None,
+                        help=f"Agrega el modo texto sobre un corpus (por defecto {DANTE_PATH})")
+    parser.add_argument("--corpus-repeat", type=int, default=1,
+                        help="Veces que se concatena el corpus para agrandarlo")
+    parser.add_argument("--data-dir", default=None,
+                        help="Directorio donde conservar los datos generados (por defecto, temporal)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Guarda los resultados en JSON")
+    parser.add_argument("--generate", metavar="CSV", default=None,
+                        help="Solo genera un CSV de clientes en esta ruta y termina")
+    parser.add_argument("--rows", type=int, default=2000000, help="Filas para --generate")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Segundos máximos por caso (por defecto, sin límite)")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generate_customers_csv(args.generate, args.rows, args.seed)
+        print(f"Generado {args.generate} ({args.rows} filas, semilla {args.seed})")
+        return
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="mapreduce_bench_data_")
+    os.makedirs(data_dir, exist_ok=True)
+    datasets = []
+
+    for size in args.sizes:
+        path = os.path.join(data_dir, f"customers-{size}-s{args.seed}.csv")
+        if not os.path.exists(path):
+            generate_customers_csv(path, size, args.seed)
+        datasets.append(("customers", path, size))
+
+    if args.corpus:
+        if not os.path.exists(args.corpus) or os.path.getsize(args.corpus) == 0:
+            print(f"Aviso: el corpus {args.corpus} no existe o está vacío; se omite el modo texto")
+        else:
+            path = os.path.join(data_dir, f"corpus-x{args.corpus_repeat}.txt")
+            with open(args.corpus, "rb") as src, open(path, "wb") as dst:
+                text = src.read()
+                for _ in range(args.corpus_repeat):
+                    dst.write(text if text.endswith(b"\n") else text + b"\n")
+            datasets.append(("corpus", path, _count_lines(path)))
+
+    results = []
+    try:
+        for dataset, path, num_records in datasets:
+            for engine in args.engines:
+                print(f"Ejecutando {engine} sobre {os.path.basename(path)}...", flush=True)
+                results.append(run_case(engine, dataset, path, num_records, args.timeout))
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print()
+    _print_table(results)
+
+    # Todos los motores deben coincidir en el resultado de cada archivo de entrada
+    for _, path, num_records in datasets:
+        checks = {(r["distinct_keys"], r["total_count"]) for r in results
+                  if r["input"] == path and r["records"] == num_records and "error" not in r}
+        if len(checks) > 1:
+            print(f"Aviso: los motores no coinciden en {os.path.basename(path)}: {checks}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados guardados en {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
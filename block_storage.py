@@ -0,0 +1,294 @@
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class NameNode:
+    """
+    Índice de metadatos del HDFS simulado (equivalente al fsimage del namenode).
+
+    Guarda, para cada archivo lógico, su tamaño y la lista de bloques con su
+    desplazamiento, longitud y los datanodes que tienen una réplica. Los datos
+    de cada bloque viven en datanodes/<datanode>/<block_id>; el índice se
+    persiste en namenode/fsimage.json, de modo que varias instancias del
+    simulador sobre el mismo directorio ven los mismos archivos.
+
+    Las consultas se sirven desde la copia en memoria: fsimage.json solo se
+    vuelve a leer si otra instancia lo reemplazó (cambia su os.stat), y solo
+    se reescribe, en JSON compacto, cuando el índice cambia.
+
+    Las operaciones sobre el índice se serializan con un lock, para que un
+    hilo de E/S en segundo plano (AsyncHDFS) pueda registrar archivos
+    mientras el hilo principal los consulta.
+    """
+
+    def __init__(self, base_path: Path, num_datanodes: int = 3, replication: int = 3,
+                 block_size: int = 64 * 1024 * 1024):
+        """
+        Args:
+            base_path: Directorio base del HDFS simulado
+            num_datanodes: Número de datanodes simulados (un directorio cada uno)
+            replication: Réplicas de cada bloque (como dfs.replication)
+            block_size: Tamaño de bloque en bytes (como dfs.blocksize)
+        """
+        if num_datanodes < 1:
+            raise ValueError("num_datanodes debe ser mayor que 0")
+        if not 1 <= replication <= num_datanodes:
+            raise ValueError(f"replication debe estar entre 1 y num_datanodes ({num_datanodes})")
+        if block_size < 1:
+            raise ValueError("block_size debe ser mayor que 0")
+
+        self.base_path = base_path
+        self.image_path = base_path / "namenode" / "fsimage.json"
+        # Mismos nombres que los servicios de docker_implementation/docker-compose.yml
+        self.datanodes = [f"datanode{i}" for i in range(1, num_datanodes + 1)]
+        self.replication = replication
+        self.block_size = block_size
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._next_datanode = 0
+        self._lock = threading.RLock()
+        # Firma (os.stat) del fsimage.json que refleja self.files
+        self._image_signature = None
+        self._load()
+
+    def _signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.image_path)
+        except FileNotFoundError:
+            return None
+        # os.replace crea un inodo nuevo en cada guardado, aunque el tamaño y la fecha coincidan
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _load(self):
+        # Relee el índice solo si fsimage.json cambió desde la última lectura o escritura
+        signature = self._signature()
+        if signature == self._image_signature:
+            return
+        if signature is None:
+            self.files = {}
+        else:
+            with open(self.image_path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+        self._image_signature = signature
+
+    def _save(self):
+        self.image_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.image_path.with_name(self.image_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # json.dumps usa el codificador en C; json.dump escribe por partes con el de Python
+            f.write(json.dumps(self.files, separators=(",", ":")))
+        os.replace(tmp_path, self.image_path)
+        self._image_signature = self._signature()
+
+    def block_path(self, datanode: str, block_id: str) -> Path:
+        return self.base_path / "datanodes" / datanode / block_id
+
+    def allocate_block(self) -> Dict[str, Any]:
+        """
+        Reserva un bloque nuevo y elige sus réplicas: datanodes consecutivos
+        en turno rotativo, para repartir los bloques entre todos los nodos.
+
+        Returns:
+            Diccionario con block_id y locations (datanodes con réplica)
+        """
+        with self._lock:
+            first = self._next_datanode
+            self._next_datanode = (first + 1) % len(self.datanodes)
+        locations = [self.datanodes[(first + i) % len(self.datanodes)] for i in range(self.replication)]
+        return {"block_id": f"blk_{uuid.uuid4().hex[:16]}", "locations": locations}
+
+    def add_file(self, file_path: str, blocks: List[Dict[str, Any]], size: int):
+        """
+        Registra un archivo ya escrito. Si existía, libera los bloques
+        anteriores que no forman parte de la nueva versión (un append
+        conserva los bloques que ya tenía).
+        """
+        with self._lock:
+            self._load()
+            previous = self.files.get(file_path)
+            self.files[file_path] = {"size": size, "block_size": self.block_size, "blocks": blocks,
+                                     "mtime": time.time_ns()}
+            self._save()
+        if previous:
+            kept = {block["block_id"] for block in blocks}
+            self.delete_blocks([block for block in previous["blocks"] if block["block_id"] not in kept])
+
+    def get_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._load()
+            return self.files.get(file_path)
+
+    def list_files(self, directory: str = "") -> List[str]:
+        with self._lock:
+            self._load()
+            prefix = directory.strip("/")
+            if not prefix:
+                return sorted(self.files)
+            return sorted(path for path in self.files if path == prefix or path.startswith(prefix + "/"))
+
+    def delete_files(self, file_paths: List[str]):
+        """
+        Elimina archivos del índice y libera sus bloques.
+        """
+        with self._lock:
+            self._load()
+            removed = [self.files.pop(path) for path in file_paths if path in self.files]
+            if removed:
+                self._save()
+        for file_info in removed:
+            self.delete_blocks(file_info["blocks"])
+
+    def delete_blocks(self, blocks: List[Dict[str, Any]]):
+        for block in blocks:
+            for datanode in block["locations"]:
+                self.block_path(datanode, block["block_id"]).unlink(missing_ok=True)
+
+
+class BlockWriter(io.RawIOBase):
+    """
+    Flujo de escritura que corta los bytes en bloques de block_size y escribe
+    cada bloque en todas sus réplicas (como el pipeline de datanodes de HDFS).
+    Al cerrarlo, `blocks` y `size` describen el archivo para el namenode.
+
+    Con offset, los bloques nuevos se ubican a partir de ese desplazamiento
+    del archivo (para agregar datos al final de un archivo existente).
+    """
+
+    def __init__(self, namenode: NameNode, offset: int = 0):
+        super().__init__()
+        self.namenode = namenode
+        self.offset = offset
+        self.blocks: List[Dict[str, Any]] = []
+        self.size = 0
+        self._replicas = []
+
+    def writable(self) -> bool:
+        return True
+
+    def _finish_block(self):
+        for f in self._replicas:
+            f.close()
+        self._replicas = []
+
+    def _start_block(self):
+        self._finish_block()
+        block = self.namenode.allocate_block()
+        block.update(offset=self.offset + self.size, length=0)
+        for datanode in block["locations"]:
+            path = self.namenode.block_path(datanode, block["block_id"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._replicas.append(open(path, "wb"))
+        self.blocks.append(block)
+
+    def write(self, b) -> int:
+        view = memoryview(b).cast("B")
+        block_size = self.namenode.block_size
+        while view:
+            if not self.blocks or self.blocks[-1]["length"] == block_size:
+                self._start_block()
+            block = self.blocks[-1]
+            chunk = view[:block_size - block["length"]]
+            for f in self._replicas:
+                f.write(chunk)
+            block["length"] += len(chunk)
+            self.size += len(chunk)
+            view = view[len(chunk):]
+        return len(b)
+
+    def close(self):
+        self._finish_block()
+        super().close()
+
+    def abort(self):
+        """
+        Descarta los bloques escritos (por ejemplo, si la escritura falló).
+        """
+        self._finish_block()
+        self.namenode.delete_blocks(self.blocks)
+        self.blocks = []
+
+
+class BlockReader(io.RawIOBase):
+    """
+    Flujo de lectura (con seek) sobre los bloques de un archivo.
+
+    Cada bloque se lee de la réplica del datanode preferido si la tiene
+    (lectura local); si no, de la primera réplica disponible (lectura remota).
+    Los bytes leídos desde otros datanodes se acumulan en remote_bytes.
+    """
+
+    def __init__(self, namenode: NameNode, file_info: Dict[str, Any], preferred_datanode: str = None):
+        super().__init__()
+        self.namenode = namenode
+        self.blocks = file_info["blocks"]
+        self.size = file_info["size"]
+        self.preferred_datanode = preferred_datanode
+        self.remote_bytes = 0
+        self._offsets = [block["offset"] for block in self.blocks]
+        self._pos = 0
+        self._open_index = None
+        self._open_file = None
+        self._open_remote = False
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def _open_block(self, index: int):
+        if self._open_file is not None:
+            self._open_file.close()
+        block = self.blocks[index]
+        locations = block["locations"]
+        if self.preferred_datanode in locations:
+            locations = [self.preferred_datanode] + [d for d in locations if d != self.preferred_datanode]
+
+        for datanode in locations:
+            path = self.namenode.block_path(datanode, block["block_id"])
+            if path.exists():
+                self._open_file = open(path, "rb")
+                self._open_index = index
+                self._open_remote = self.preferred_datanode is not None and datanode != self.preferred_datanode
+                return
+        raise IOError(f"Ninguna réplica disponible para el bloque {block['block_id']}")
+
+    def readinto(self, b) -> int:
+        if self._pos >= self.size:
+            return 0
+        index = bisect_right(self._offsets, self._pos) - 1
+        if index != self._open_index:
+            self._open_block(index)
+
+        block = self.blocks[index]
+        block_pos = self._pos - block["offset"]
+        view = memoryview(b).cast("B")[:block["length"] - block_pos]
+        self._open_file.seek(block_pos)
+        n = self._open_file.readinto(view)
+        self._pos += n
+        if self._open_remote:
+            self.remote_bytes += n
+        return n
+
+    def close(self):
+        if self._open_file is not None:
+            self._open_file.close()
+            self._open_file = None
+        super().close()
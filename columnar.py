@@ -0,0 +1,88 @@
+import csv
+import io
+from collections import Counter
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from input_readers import as_text
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él, las columnas son listas de Python
+    np = None
+
+# Filas por bloque que recibe map_batch_function
+DEFAULT_BLOCK_ROWS = 50000
+
+
+def has_numpy() -> bool:
+    return np is not None
+
+
+def parse_rows(values: Sequence[Any], encoding: str = "utf-8") -> Iterable[List[str]]:
+    """
+    Parsea un bloque de valores de entrada como filas CSV con un único csv.reader.
+
+    Acepta filas ya parseadas (listas), líneas str o registros sin decodificar
+    (bytes/memoryview): estos últimos se unen y se decodifican una sola vez
+    por bloque, en lugar de una vez por registro.
+
+    Args:
+        values: Valores de un bloque de registros (todos del mismo tipo)
+        encoding: Codificación de los registros sin decodificar
+
+    Returns:
+        Iterable de filas (listas de columnas)
+    """
+    if not values:
+        return []
+    first = values[0]
+    if isinstance(first, list):
+        return values
+    if isinstance(first, (bytes, bytearray, memoryview)):
+        text = as_text(b"\n".join(values), encoding)
+        return csv.reader(io.StringIO(text, newline=""))
+    return csv.reader(values)
+
+
+def rows_to_columns(rows: Iterable[List[str]], columns: Sequence[int],
+                    as_arrays: bool = False) -> Dict[int, Sequence[Any]]:
+    """
+    Proyecta un bloque de filas en buffers por columna (solo las columnas pedidas).
+    Las filas que no tienen todas las columnas pedidas se descartan, igual que
+    en los map_function por fila de los ejemplos.
+
+    Args:
+        rows: Filas del bloque
+        columns: Índices de las columnas a extraer
+        as_arrays: Si es True y NumPy está disponible, cada columna es un np.ndarray
+
+    Returns:
+        Diccionario índice de columna -> valores de la columna
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    try:
+        # Camino rápido: la proyección recorre las filas en C con itemgetter
+        projected = {column: list(map(itemgetter(column), rows)) for column in columns}
+    except IndexError:
+        needed = max(columns) + 1
+        rows = [row for row in rows if len(row) >= needed]
+        projected = {column: list(map(itemgetter(column), rows)) for column in columns}
+    if as_arrays and np is not None:
+        projected = {column: np.asarray(values) for column, values in projected.items()}
+    return projected
+
+
+def value_counts(values: Sequence[Any]) -> List[Tuple[Any, int]]:
+    """
+    Kernel de agrupar y contar sobre una columna completa.
+    Con un np.ndarray usa np.unique(return_counts=True); con una lista usa
+    Counter, que cuenta en C sin un paso de Python por valor.
+
+    Returns:
+        Pares (valor, cantidad) del bloque, un par por valor distinto
+    """
+    if np is not None and isinstance(values, np.ndarray):
+        uniques, counts = np.unique(values, return_counts=True)
+        return list(zip(uniques.tolist(), counts.tolist()))
+    return list(Counter(values).items())
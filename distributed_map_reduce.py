@@ -0,0 +1,845 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from itertools import chain
+from multiprocessing import AuthenticationError, Process
+from multiprocessing.connection import Client, Connection, Listener, wait
+
+from external_shuffle import ExternalShuffle, read_blocks, write_blocks
+from fault_tolerance import (JobFailedError, Quarantine, RetryPolicy, map_records_skipping, quarantine_entry,
+                             reduce_groups_skipping)
+from input_formats import DEFAULT_SPLIT_SIZE, CSVInputFormat, InputFormat, TextInputFormat
+from job_logging import INFO, ProgressCounter, get_logger
+from job_metrics import JobMetrics, RecordCounter
+from map_reduce_interface import MapReduceInterface
+from map_reduce_utils import batched, batched_records, map_records
+from numeric_aggregation import NumericAggregator, get_aggregation
+from partitioners import HashPartitioner, Partitioner
+
+# Variable de entorno con la clave compartida entre coordinador y workers
+AUTHKEY_ENV = "MAPREDUCE_AUTHKEY"
+
+# Pares por mensaje al servir una partición a un reducer
+_FETCH_BLOCK_SIZE = 10000
+
+
+def default_authkey() -> bytes:
+    """
+    Clave de autenticación de las conexiones: la de MAPREDUCE_AUTHKEY o, si
+    no está definida, una aleatoria (solo sirve para workers lanzados desde
+    este mismo proceso, por ejemplo con LocalCluster).
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    return key.encode() if key else os.urandom(16)
+
+
+class _FetchError(Exception):
+    """
+    Un reducer no pudo leer la salida de map de otro worker.
+    """
+
+    def __init__(self, address: Tuple[str, int], message: str):
+        super().__init__(message)
+        self.address = address
+
+
+class _ShuffleServer:
+    """
+    Servidor de las salidas de map de un worker (como el servicio de shuffle
+    de los NodeManager de Hadoop): cada reducer pide la partición de una
+    tarea de map y la recibe en bloques de pares.
+    """
+
+    def __init__(self, host: str, authkey: bytes, outputs: Dict[Tuple[int, int, int], str]):
+        self.listener = Listener((host, 0), authkey=authkey)
+        self.address = self.listener.address
+        self.outputs = outputs
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                return  # servidor cerrado
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: Connection):
+        with conn:
+            try:
+                key = conn.recv()
+                path = self.outputs.get(key)
+                if path is None:
+                    conn.send(("missing", key))
+                    return
+                conn.send(("ok", key))
+                for block in batched(read_blocks(path), _FETCH_BLOCK_SIZE):
+                    conn.send(block)
+                conn.send(None)
+            except (EOFError, OSError):
+                pass
+
+    def close(self):
+        self.listener.close()
+
+
+class Worker:
+    """
+    Proceso trabajador: se registra en el coordinador, ejecuta las tareas que
+    este le asigna y sirve sus salidas de map a los reducers de otros workers.
+
+    Las salidas de map quedan en el disco local del worker (work_dir), como en
+    Hadoop; solo viajan por la red cuando un reducer las pide.
+    """
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes, work_dir: str = None,
+                 host: str = "127.0.0.1", verbosity: int = INFO):
+        """
+        Args:
+            address: Dirección (host, puerto) del coordinador
+            authkey: Clave compartida con el coordinador y los demás workers
+            work_dir: Directorio local para las salidas de map (por defecto, uno temporal)
+            host: Interfaz en la que escucha el servidor de shuffle; debe ser
+                alcanzable por los demás workers
+            verbosity: 0 (solo errores), 1 (eventos) o 2 (una línea por tarea)
+        """
+        self.address = address
+        self.authkey = authkey
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="mapreduce_worker_")
+        self.host = host
+        self.logger = get_logger(f"Worker-{os.getpid()}", verbosity)
+        self.outputs: Dict[Tuple[int, int, int], str] = {}
+        self.shuffle = None
+        self.job = None
+        self.job_seq = None
+        self.num_reducers = 1
+        self.partitioner = HashPartitioner()
+        self.shuffle_mode = "memory"
+        self.max_records_in_memory = 1000000
+
+    def serve(self):
+        """
+        Atiende al coordinador hasta que pida detenerse o cierre la conexión.
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.shuffle = _ShuffleServer(self.host, self.authkey, self.outputs)
+        try:
+            with Client(self.address, authkey=self.authkey) as conn:
+                conn.send(("register", socket.gethostname(), os.getpid(), self.shuffle.address))
+                self.logger.info(f"Registrado en el coordinador {self.address}; shuffle en {self.shuffle.address}")
+                while True:
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        break
+                    if message[0] == "stop":
+                        break
+                    reply = self._handle(message)
+                    if reply is not None:
+                        conn.send(reply)
+        finally:
+            self.shuffle.close()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _handle(self, message: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+        command = message[0]
+        if command == "job":
+            (_, job_seq, self.job, self.num_reducers, self.partitioner, self.shuffle_mode,
+             self.max_records_in_memory) = message
+            if job_seq != self.job_seq:
+                self._clear_outputs()
+                self.job_seq = job_seq
+            return None
+
+        _, key, attempt, skip, payload = message
+        try:
+            if command == "map":
+                result = self._map_task(key[1], attempt, skip, payload)
+            else:
+                result = self._reduce_task(key[1], attempt, skip, payload)
+        except _FetchError as exc:
+            return "fetch_failed", key, attempt, exc.address, str(exc)
+        except Exception as exc:
+            self.logger.debug(traceback.format_exc())
+            return "failed", key, attempt, repr(exc)
+        return "done", key, attempt, result
+
+    def _clear_outputs(self):
+        for path in self.outputs.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.outputs.clear()
+
+    def _map_task(self, task_id: int, attempt: int, skip: bool, payload: Tuple[str, Any]
+                  ) -> Tuple[int, int, List[int], List[Dict[str, Any]], float]:
+        """
+        Tarea de map: mapea sus registros (o lee su split del archivo) y deja
+        la salida repartida en un archivo local por partición.
+
+        Returns:
+            Registros leídos, pares escritos, pares de cada partición,
+            registros en cuarentena y duración en segundos
+        """
+        start = time.perf_counter()
+        kind, data = payload
+        records = RecordCounter(data if kind == "records" else data[0].read_split(data[1]))
+        quarantined = []
+        if skip:
+            pairs = map_records_skipping(self.job, records, lambda key, value, exc: quarantined.append(
+                quarantine_entry("map", task_id, key, value, exc)))
+        else:
+            pairs = map_records(self.job, records)
+
+        buckets = [[] for _ in range(self.num_reducers)]
+        get_partition = self.partitioner.get_partition
+        for key, value in pairs:
+            buckets[get_partition(key, self.num_reducers)].append((key, value))
+
+        for partition_num, bucket in enumerate(buckets):
+            if bucket:
+                path = os.path.join(self.work_dir, f"map-{task_id:05d}-{attempt}-p{partition_num:05d}.bin")
+                write_blocks(path, bucket)
+                self.outputs[(task_id, attempt, partition_num)] = path
+        self.logger.debug(f"MAP {task_id} (intento {attempt}): {records.count} registros -> {len(pairs)} pares")
+        return records.count, len(pairs), [len(bucket) for bucket in buckets], quarantined, time.perf_counter() - start
+
+    def _fetch(self, partition_num: int, source: Tuple[int, int, Tuple[str, int]]) -> Iterator[Tuple[Any, Any]]:
+        task_id, attempt, address = source
+        key = (task_id, attempt, partition_num)
+        if address == self.shuffle.address:
+            # Salida de map de este mismo worker: se lee del disco local
+            yield from read_blocks(self.outputs[key])
+            return
+        try:
+            with Client(address, authkey=self.authkey) as conn:
+                conn.send(key)
+                status = conn.recv()
+                if status[0] != "ok":
+                    raise _FetchError(address, f"El worker {address} no tiene la salida de map {key}")
+                while True:
+                    block = conn.recv()
+                    if block is None:
+                        return
+                    yield from block
+        except (EOFError, OSError) as exc:
+            raise _FetchError(address, f"No se pudo leer la salida de map {key} de {address}: {exc!r}") from exc
+
+    def _reduce_task(self, partition_num: int, attempt: int, skip: bool,
+                     sources: List[Tuple[int, int, Tuple[str, int]]]
+                     ) -> Tuple[int, int, List[Tuple[Any, Any]], int, List[Dict[str, Any]], float]:
+        """
+        Tarea de reduce de una partición: pide la partición a cada worker que
+        tenga salidas de map (shuffle por la red), agrupa por clave y reduce.
+
+        Returns:
+            Pares leídos, grupos reducidos, pares finales, lecturas remotas,
+            grupos en cuarentena y duración en segundos
+        """
+        start = time.perf_counter()
+        pairs = chain.from_iterable(self._fetch(partition_num, source) for source in sources)
+        remote = sum(1 for _, _, address in sources if address != self.shuffle.address)
+
+        aggregation = get_aggregation(self.job)
+        if aggregation is not None:
+            # Un valor acumulado por clave en lugar de la lista de valores de cada clave
+            aggregator = NumericAggregator(aggregation)
+            aggregator.extend(pairs)
+            num_pairs = len(aggregator)
+            groups = aggregator.items()
+        elif self.shuffle_mode == "external":
+            shuffle = ExternalShuffle(self.max_records_in_memory, spill_dir=self.work_dir)
+            shuffle.extend(pairs)
+            num_pairs = len(shuffle)
+            groups = shuffle.groups()
+        else:
+            grouped = defaultdict(list)
+            for key, value in pairs:
+                grouped[key].append(value)
+            num_pairs = sum(map(len, grouped.values()))
+            groups = iter(sorted(grouped.items()))
+
+        groups = RecordCounter(groups)
+        quarantined = []
+        if aggregation is not None:
+            # Los pares (clave, valor agregado) reemplazan a reduce_function
+            results = list(groups)
+        elif skip:
+            results = list(reduce_groups_skipping(self.job, groups, lambda key, values, exc: quarantined.append(
+                quarantine_entry("reduce", partition_num, key, values, exc))))
+        else:
+            reduce_function = self.job.reduce_function
+            results = [pair for key, values in groups for pair in reduce_function(key, values)]
+        self.logger.debug(f"REDUCE {partition_num} (intento {attempt}): {groups.count} grupos")
+        return num_pairs, groups.count, results, remote, quarantined, time.perf_counter() - start
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, work_dir: str = None, host: str = "127.0.0.1",
+               verbosity: int = INFO):
+    """
+    Punto de entrada de un proceso worker (ver Worker).
+    """
+    Worker(address, authkey, work_dir, host, verbosity).serve()
+
+
+class _WorkerHandle:
+    __slots__ = ("worker_id", "conn", "host", "pid", "shuffle_address")
+
+    def __init__(self, worker_id: int, conn: Connection, host: str, pid: int, shuffle_address: Tuple[str, int]):
+        self.worker_id = worker_id
+        self.conn = conn
+        self.host = host
+        self.pid = pid
+        self.shuffle_address = shuffle_address
+
+
+class DistributedMapReduce(MapReduceInterface):
+    """
+    Motor MapReduce coordinador/workers: el coordinador (este objeto) asigna
+    tareas de map y de reduce por sockets a procesos worker, que pueden estar
+    en otras máquinas (ver LocalCluster para lanzarlos en una sola).
+
+    - Map: cada tarea es un lote de registros (execute) o un split del
+      archivo (execute_file; los workers leen el archivo, que debe estar en
+      un sistema de archivos compartido). La salida queda particionada en el
+      disco local del worker.
+    - Shuffle: cada reducer pide su partición a los workers que ejecutaron
+      las tareas de map, por la red.
+    - Reduce: una tarea por partición; los pares finales vuelven al coordinador.
+
+    Las tareas de map se generan a medida que hay workers libres: el
+    coordinador no lee toda la entrada antes de empezar.
+
+    Los fallos siguen la RetryPolicy (reintentos y modo skip con cuarentena).
+    Si un worker se cae o una tarea supera task_timeout, la tarea en curso se
+    reasigna y sus salidas de map se recalculan en otro worker (el
+    coordinador conserva la descripción de cada tarea de map; con execute,
+    los lotes ya procesados se guardan en un directorio temporal del
+    coordinador). La ejecución especulativa no está implementada en este motor.
+    """
+
+    def __init__(self, job: MapReduceInterface, address: Tuple[str, int] = ("127.0.0.1", 0),
+                 authkey: bytes = None, num_reducers: int = None, batch_size: int = 10000,
+                 verbosity: int = INFO, shuffle_mode: str = "memory", max_records_in_memory: int = 1000000,
+                 partitioner: Partitioner = None, retry_policy: RetryPolicy = None, min_workers: int = 1,
+                 worker_timeout: float = 30.0, task_timeout: Optional[float] = 600.0):
+        """
+        Args:
+            job: Instancia de MapReduceInterface (debe poder serializarse con
+                pickle y su clase debe poder importarse en los workers)
+            address: Dirección en la que el coordinador espera a los workers
+                (puerto 0 = uno libre; ver self.address)
+            authkey: Clave compartida (por defecto MAPREDUCE_AUTHKEY o una aleatoria)
+            num_reducers: Particiones y tareas de reduce (por defecto, los workers
+                conectados al empezar el job)
+            batch_size: Registros por tarea de map (en execute)
+            verbosity: 0 (solo errores), 1 (resumen y eventos) o 2 (una línea por tarea)
+            shuffle_mode: Cómo agrupa cada reducer su partición: "memory" o "external"
+            max_records_in_memory: Pares en memoria por reducer antes de volcar una corrida ("external")
+            partitioner: Estrategia de partición de claves (por defecto HashPartitioner)
+            retry_policy: Reintentos y cuarentena (por defecto RetryPolicy())
+            min_workers: Workers que deben estar conectados para empezar un job
+            worker_timeout: Segundos de espera por workers antes de dar el job por fallido
+            task_timeout: Segundos que puede tardar una tarea en un worker; si se
+                exceden, el worker se da por perdido y la tarea cuenta como un
+                intento fallido y se reasigna (None = sin límite)
+        """
+        if shuffle_mode not in ("memory", "external"):
+            raise ValueError(f"Modo de shuffle desconocido: {shuffle_mode!r} (use 'memory' o 'external')")
+        self.job = job
+        self.requested_address = address
+        self.authkey = authkey or default_authkey()
+        self.num_reducers = num_reducers
+        self.batch_size = batch_size
+        self.shuffle_mode = shuffle_mode
+        self.max_records_in_memory = max_records_in_memory
+        self.partitioner = partitioner or HashPartitioner()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.min_workers = min_workers
+        self.worker_timeout = worker_timeout
+        self.task_timeout = task_timeout
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+        self.metrics = JobMetrics()
+        self.logger = get_logger(type(self).__name__, verbosity)
+        self.address = None
+        self._listener = None
+        self._registrations = queue.Queue()
+        self._workers: Dict[int, _WorkerHandle] = {}
+        self._next_worker_id = 0
+        self._job_seq = 0
+        self._job_message = None
+
+    def map_function(self, key: Any, value: Any) -> List[Tuple[Any, Any]]:
+        return self.job.map_function(key, value)
+
+    def reduce_function(self, key: Any, values: List[Any]) -> List[Tuple[Any, Any]]:
+        return self.job.reduce_function(key, values)
+
+    def combine_function(self, key: Any, values: List[Any]) -> List[Tuple[Any, Any]]:
+        return self.job.combine_function(key, values)
+
+    def __enter__(self) -> "DistributedMapReduce":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """
+        Empieza a aceptar workers en self.address.
+        """
+        if self._listener is not None:
+            return
+        self._listener = Listener(self.requested_address, authkey=self.authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept_workers, daemon=True).start()
+        self.logger.info(f"Coordinador esperando workers en {self.address}")
+
+    def close(self):
+        """
+        Pide a los workers que terminen y deja de aceptar conexiones.
+        """
+        for worker in list(self._workers.values()):
+            try:
+                worker.conn.send(("stop",))
+            except OSError:
+                pass
+            worker.conn.close()
+        self._workers.clear()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept_workers(self):
+        listener = self._listener
+        while True:
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                self.logger.warning("Conexión rechazada: clave de autenticación incorrecta")
+                continue
+            except OSError:
+                return  # coordinador cerrado
+            try:
+                if not conn.poll(self.worker_timeout):
+                    raise EOFError("sin registro")
+                command, host, pid, shuffle_address = conn.recv()
+                if command != "register":
+                    raise EOFError(f"mensaje inesperado {command!r}")
+            except (EOFError, OSError, ValueError) as exc:
+                self.logger.warning(f"Conexión de worker descartada: {exc}")
+                conn.close()
+                continue
+            self._registrations.put((conn, host, pid, tuple(shuffle_address)))
+
+    def _admit_workers(self, timeout: float = None) -> int:
+        """
+        Incorpora los workers registrados desde la última llamada (esperando
+        hasta timeout segundos por el primero, si se indica). A los que llegan
+        durante un job se les envía el job en curso.
+
+        Returns:
+            Número de workers nuevos
+        """
+        admitted = 0
+        while True:
+            try:
+                registration = self._registrations.get(timeout=timeout) if timeout else \
+                    self._registrations.get_nowait()
+            except queue.Empty:
+                return admitted
+            timeout = None
+            conn, host, pid, shuffle_address = registration
+            worker = _WorkerHandle(self._next_worker_id, conn, host, pid, shuffle_address)
+            self._next_worker_id += 1
+            if self._job_message is not None:
+                try:
+                    conn.send(self._job_message)
+                except OSError:
+                    conn.close()
+                    continue
+            self._workers[worker.worker_id] = worker
+            self.metrics.incr("cluster", "workers_joined")
+            self.logger.info(f"Worker {worker.worker_id} conectado ({host}, pid {pid})")
+            admitted += 1
+
+    def wait_for_workers(self, count: int, timeout: float = None):
+        """
+        Espera a que haya al menos count workers conectados.
+        """
+        self.start()
+        deadline = time.monotonic() + (self.worker_timeout if timeout is None else timeout)
+        self._admit_workers()
+        while len(self._workers) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise JobFailedError(f"Solo hay {len(self._workers)} de {count} workers conectados")
+            self._admit_workers(timeout=remaining)
+
+    def execute(self, input_data: Iterable[Tuple[Any, Any]], return_metrics: bool = False):
+        """
+        Ejecuta el job en el cluster; cada lote de batch_size registros es una
+        tarea de map. Los lotes se leen de input_data a medida que hay workers
+        libres.
+
+        Args:
+            input_data: Datos de entrada como pares (clave, valor)
+            return_metrics: Si es True, devuelve también las métricas del job
+
+        Returns:
+            Resultados finales como lista de pares (clave, valor), o la tupla
+            (resultados, métricas) con return_metrics (ver JobMetrics.to_dict)
+        """
+        progress = ProgressCounter(self.logger, "MAP")
+        payloads = (("records", batch) for batch in progress.track_batches(batched_records(input_data, self.batch_size)))
+        return self._run(payloads, return_metrics)
+
+    def execute_file(self, file_path: str, input_format: InputFormat = None,
+                     split_size: int = DEFAULT_SPLIT_SIZE, return_metrics: bool = False):
+        """
+        Ejecuta el job sobre un archivo: cada worker lee directamente su split.
+        El archivo debe estar en la misma ruta para todos los workers.
+
+        Args:
+            file_path: Ruta del archivo de entrada
+            input_format: Cómo dividir y leer el archivo (por defecto TextInputFormat)
+            split_size: Tamaño objetivo de cada split en bytes
+            return_metrics: Si es True, devuelve también las métricas del job
+
+        Returns:
+            Resultados finales, o la tupla (resultados, métricas) con return_metrics
+        """
+        input_format = input_format or TextInputFormat()
+        splits = input_format.get_splits(os.path.abspath(file_path), split_size)
+        return self._run((("split", (input_format, split)) for split in splits), return_metrics)
+
+    def _lose_worker(self, worker: _WorkerHandle, reason: str):
+        if self._workers.pop(worker.worker_id, None) is None:
+            return
+        worker.conn.close()
+        self.metrics.incr("cluster", "workers_lost")
+        self.logger.warning(f"Worker {worker.worker_id} ({worker.host}, pid {worker.pid}) perdido: {reason}")
+
+    def _run(self, map_payloads: Iterable[Tuple[str, Any]], return_metrics: bool = False):
+        total_start = time.time()
+        self.logger.info("Iniciando proceso MapReduce distribuido")
+        self.logger.info("=" * 50)
+        self.metrics = JobMetrics()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+        self.wait_for_workers(self.min_workers)
+
+        num_reducers = self.num_reducers or len(self._workers)
+        self._job_seq += 1
+        self._job_message = ("job", self._job_seq, self.job, num_reducers, self.partitioner,
+                             self.shuffle_mode, self.max_records_in_memory)
+        for worker in list(self._workers.values()):
+            try:
+                worker.conn.send(self._job_message)
+            except OSError as exc:
+                self._lose_worker(worker, repr(exc))
+        self.logger.info(f"{num_reducers} tareas REDUCE en {len(self._workers)} workers")
+
+        try:
+            final_results = self._schedule(map_payloads, num_reducers)
+        finally:
+            self._job_message = None
+
+        total_end = time.time()
+        self.metrics.log_summary(self.logger)
+        if self.quarantine.entries:
+            self.logger.warning(f"{len(self.quarantine)} registros en cuarentena (ver self.quarantine.entries)")
+        self.logger.info(f"Proceso MapReduce distribuido completado en {total_end - total_start:.2f}s!")
+        self.logger.info("=" * 50)
+
+        if return_metrics:
+            return final_results, self.metrics.to_dict()
+        return final_results
+
+    def _schedule(self, map_payloads: Iterable[Tuple[str, Any]], num_reducers: int) -> List[Tuple[Any, Any]]:
+        """
+        Bucle del coordinador: asigna una tarea a cada worker libre (primero
+        las de map, que se toman de map_payloads a medida que se necesitan;
+        las de reduce cuando todas las salidas de map están disponibles),
+        recoge los resultados y aplica la política de reintentos.
+
+        Returns:
+            Pares finales, en orden de partición
+        """
+        spill_dir = tempfile.mkdtemp(prefix="mapreduce_coordinator_")
+        try:
+            return self._schedule_tasks(iter(map_payloads), num_reducers, spill_dir)
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def _schedule_tasks(self, map_source: Iterator[Tuple[str, Any]], num_reducers: int,
+                        spill_dir: str) -> List[Tuple[Any, Any]]:
+        policy = self.retry_policy
+        payloads: Dict[int, Tuple[str, Any]] = {}  # tareas de map ya leídas de la entrada
+        num_maps = None  # se conoce al agotar la entrada
+        pending = {"map": deque(), "reduce": deque(range(num_reducers))}
+        map_done: Dict[int, Tuple[int, int, List[int]]] = {}  # tarea -> (worker, intento, pares por partición)
+        reduce_done: Dict[int, List[Tuple[Any, Any]]] = {}
+        running: Dict[int, Tuple[Tuple[str, int], int, bool, float]] = {}  # worker -> (tarea, intento, skip, inicio)
+        attempts = defaultdict(int)
+        failures = defaultdict(int)
+        phase_start = time.perf_counter()
+        maps_finished = False
+
+        def requeue(key: Tuple[str, int]):
+            pending[key[0]].appendleft(key[1])
+
+        def lose(worker: _WorkerHandle, reason: str):
+            self._lose_worker(worker, reason)
+            if worker.worker_id in running:
+                key = running.pop(worker.worker_id)[0]
+                self.metrics.incr(key[0], "lost_attempts")
+                requeue(key)
+            # Sus salidas de map se pierden con él: se recalculan si algún reducer aún las necesita
+            if len(reduce_done) < num_reducers:
+                for task_id, (worker_id, _, _) in list(map_done.items()):
+                    if worker_id == worker.worker_id:
+                        del map_done[task_id]
+                        pending["map"].append(task_id)
+                        self.metrics.incr("map", "rerun_lost_outputs")
+
+        def fail(key: Tuple[str, int], skip: bool, error: str) -> str:
+            # Cuenta un intento fallido; devuelve qué se hará con la tarea o lanza JobFailedError
+            phase, task_id = key
+            self.metrics.incr(phase, "failed_attempts")
+            failures[key] += 1
+            if failures[key] < policy.max_attempts:
+                self.metrics.incr(phase, "task_retries")
+                return "reintentando"
+            if policy.skip_bad_records and not skip:
+                self.metrics.incr(phase, "skip_mode_tasks")
+                return "se procesa registro a registro con cuarentena"
+            raise JobFailedError(f"Tarea {phase.upper()} {task_id} falló tras {failures[key]} intentos: {error}")
+
+        def next_task() -> Optional[Tuple[str, int]]:
+            nonlocal num_maps
+            if pending["map"]:
+                return "map", pending["map"].popleft()
+            if num_maps is None:
+                payload = next(map_source, None)
+                if payload is not None:
+                    task_id = len(payloads)
+                    payloads[task_id] = payload
+                    return "map", task_id
+                num_maps = len(payloads)
+            if len(map_done) == num_maps and pending["reduce"]:
+                return "reduce", pending["reduce"].popleft()
+            return None
+
+        def payload_for(key: Tuple[str, int]) -> Any:
+            if key[0] == "map":
+                kind, data = payloads[key[1]]
+                # Lote ya procesado y guardado en disco: solo se vuelve a leer si hay que recalcularlo
+                return ("records", list(read_blocks(data))) if kind == "spilled" else (kind, data)
+            return [(task_id, attempt, self._workers[worker_id].shuffle_address)
+                    for task_id, (worker_id, attempt, sizes) in sorted(map_done.items()) if sizes[key[1]]]
+
+        while len(reduce_done) < num_reducers:
+            self._admit_workers()
+            if not self._workers:
+                self.logger.warning("No quedan workers conectados; esperando...")
+                if not self._admit_workers(timeout=self.worker_timeout):
+                    raise JobFailedError("No quedan workers conectados")
+
+            # Asignar una tarea a cada worker libre
+            for worker in list(self._workers.values()):
+                if worker.worker_id in running:
+                    continue
+                key = next_task()
+                if key is None:
+                    break
+                attempts[key] += 1
+                skip = failures[key] >= policy.max_attempts
+                try:
+                    worker.conn.send((key[0], key, attempts[key], skip, payload_for(key)))
+                except OSError as exc:
+                    requeue(key)
+                    lose(worker, repr(exc))
+                    continue
+                running[worker.worker_id] = (key, attempts[key], skip, time.monotonic())
+
+            connections = {worker.conn: worker for worker in self._workers.values() if worker.worker_id in running}
+            for conn in wait(list(connections), timeout=0.5):
+                worker = connections[conn]
+                try:
+                    reply = conn.recv()
+                except (EOFError, OSError) as exc:
+                    lose(worker, repr(exc) if str(exc) else "conexión cerrada")
+                    continue
+                status, key, attempt = reply[0], tuple(reply[1]), reply[2]
+                if running.get(worker.worker_id, (None, None))[:2] != (key, attempt):
+                    continue  # respuesta de un job anterior
+                skip = running.pop(worker.worker_id)[2]
+                phase, task_id = key
+
+                if status == "done":
+                    if phase == "map":
+                        num_records, num_pairs, sizes, quarantined, seconds = reply[3]
+                        map_done[task_id] = (worker.worker_id, attempt, sizes)
+                        kind, data = payloads[task_id]
+                        if kind == "records":
+                            # El lote ya no hace falta en memoria; se guarda por si hay que recalcularlo
+                            path = os.path.join(spill_dir, f"input-{task_id:05d}.bin")
+                            write_blocks(path, data)
+                            payloads[task_id] = ("spilled", path)
+                        self.metrics.add_task("map", task_id, seconds, num_records)
+                        self.metrics.incr("map", "input_records", num_records)
+                        self.metrics.incr("map", "output_records", num_pairs)
+                        self.metrics.incr("map", "tasks")
+                    else:
+                        num_pairs, num_groups, results, remote, quarantined, seconds = reply[3]
+                        reduce_done[task_id] = results
+                        self.metrics.add_task("reduce", task_id, seconds, num_groups)
+                        self.metrics.incr("shuffle", "input_records", num_pairs)
+                        self.metrics.incr("shuffle", "remote_fetches", remote)
+                        self.metrics.incr("reduce", "input_groups", num_groups)
+                        self.metrics.incr("reduce", "output_records", len(results))
+                        self.metrics.incr("reduce", "tasks")
+                    if quarantined:
+                        self.metrics.incr(phase, "quarantined_records", len(quarantined))
+                        self.logger.warning(f"Tarea {phase.upper()} {task_id}: {len(quarantined)} registros "
+                                            f"en cuarentena")
+                        self.quarantine.extend(quarantined)
+                elif status == "fetch_failed":
+                    # El worker que tenía la salida de map no responde: se da por perdido
+                    requeue(key)
+                    self.metrics.incr("shuffle", "fetch_failures")
+                    for other in list(self._workers.values()):
+                        if other.shuffle_address == tuple(reply[3]):
+                            lose(other, reply[4])
+                else:
+                    message = fail(key, skip, reply[3])
+                    self.logger.warning(f"Tarea {phase.upper()} {task_id} falló en el worker {worker.worker_id} "
+                                        f"(intento {failures[key]}): {reply[3]}; {message}")
+                    requeue(key)
+
+            # Un worker colgado no responde ni cierra la conexión: al vencer el plazo se da por perdido
+            if self.task_timeout is not None:
+                now = time.monotonic()
+                for worker_id, (key, _, skip, started) in list(running.items()):
+                    if now - started < self.task_timeout:
+                        continue
+                    self.metrics.incr(key[0], "timed_out_attempts")
+                    error = f"sin respuesta tras {self.task_timeout:.0f}s"
+                    message = fail(key, skip, error)
+                    self.logger.warning(f"Tarea {key[0].upper()} {key[1]} {error} en el worker {worker_id}; {message}")
+                    lose(self._workers[worker_id], f"tarea {key[0].upper()} {key[1]} {error}")
+
+            if not maps_finished and num_maps is not None and len(map_done) == num_maps:
+                maps_finished = True
+                now = time.perf_counter()
+                self.metrics.phase_seconds["map"] = now - phase_start
+                phase_start = now
+                self.logger.info(f"Fase MAP completada: {num_maps} tareas, "
+                                 f"{self.metrics.counters['map'].get('output_records', 0)} pares intermedios")
+
+        # El shuffle ocurre dentro de las tareas de reduce (cada reducer pide su partición por la red)
+        self.metrics.phase_seconds["reduce"] = time.perf_counter() - phase_start
+        self.metrics.incr("shuffle", "partitions", num_reducers)
+        self.logger.info(f"Fase REDUCE completada: {num_reducers} tareas, "
+                         f"{self.metrics.counters['reduce'].get('output_records', 0)} resultados finales")
+        return [pair for partition_num in range(num_reducers) for pair in reduce_done[partition_num]]
+
+
+class LocalCluster:
+    """
+    Lanza N procesos worker en esta máquina conectados a un coordinador, para
+    probar DistributedMapReduce sin un cluster real. Los workers se comunican
+    igual que en varias máquinas: tareas por el socket del coordinador y
+    shuffle por sockets entre workers.
+    """
+
+    def __init__(self, engine: DistributedMapReduce, num_workers: int = None, verbosity: int = INFO):
+        """
+        Args:
+            engine: Coordinador al que se conectan los workers
+            num_workers: Procesos worker (por defecto, CPUs disponibles)
+            verbosity: Verbosidad de los workers
+        """
+        self.engine = engine
+        self.num_workers = num_workers or os.cpu_count()
+        self.verbosity = verbosity
+        self.processes: List[Process] = []
+
+    def __enter__(self) -> "LocalCluster":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """
+        Lanza los workers y espera a que todos se registren.
+        """
+        self.engine.start()
+        for _ in range(self.num_workers):
+            process = Process(target=run_worker, args=(self.engine.address, self.engine.authkey),
+                              kwargs={"verbosity": self.verbosity}, daemon=True)
+            process.start()
+            self.processes.append(process)
+        self.engine.wait_for_workers(self.num_workers)
+
+    def stop(self):
+        """
+        Detiene el coordinador (que pide a los workers terminar) y los procesos.
+        """
+        self.engine.close()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MapReduce distribuido: coordinador de ejemplo o worker")
+    parser.add_argument("--worker", metavar="HOST:PUERTO",
+                        help=f"Ejecutar como worker del coordinador indicado (clave en ${AUTHKEY_ENV})")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Interfaz del servidor de shuffle del worker (alcanzable por los demás workers)")
+    parser.add_argument("--input", default="data/customers-2000000.csv",
+                        help="CSV de clientes del ejemplo (columna 6 = país)")
+    args = parser.parse_args()
+
+    if args.worker:
+        host, port = args.worker.rsplit(":", 1)
+        if AUTHKEY_ENV not in os.environ:
+            parser.error(f"Defina {AUTHKEY_ENV} con la misma clave que el coordinador")
+        run_worker((host, int(port)), default_authkey(), host=args.host)
+    else:
+        from threaded_word_count_csv import ThreadedWordCountMapReduce
+
+        if not os.path.exists(args.input):
+            parser.error(f"No existe {args.input}; puede generarlo con: "
+                         f"python benchmark.py --generate {args.input} --rows 2000000")
+
+        print("EJEMPLO: Contador de países con MapReduce distribuido (cluster local de 3 workers)")
+        print("=" * 60)
+
+        engine = DistributedMapReduce(ThreadedWordCountMapReduce(num_threads=1))
+        with LocalCluster(engine, num_workers=3):
+            results = engine.execute_file(args.input, CSVInputFormat())
+
+        print("\nRESULTADOS FINALES:")
+        print("-" * 30)
+        for country, count in sorted(results, key=lambda x: x[1], reverse=True)[:20]:
+            print(f"{country}: {count}")
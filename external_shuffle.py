@@ -0,0 +1,151 @@
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from map_reduce_utils import batched
+from numeric_aggregation import NumericAggregator
+
+_by_key = itemgetter(0)
+
+# Registros por bloque serializado dentro de una corrida en disco
+_RUN_BLOCK_SIZE = 10000
+
+
+def write_blocks(path: str, pairs: Iterable[Tuple[Any, Any]]):
+    """
+    Escribe pares en un archivo local como bloques serializados con pickle
+    (mucho más rápido que serializar registro a registro).
+    """
+    with open(path, "wb") as f:
+        for block in batched(pairs, _RUN_BLOCK_SIZE):
+            pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_blocks(path: str) -> Iterator[Tuple[Any, Any]]:
+    """
+    Recorre los pares de un archivo escrito con write_blocks, bloque a bloque.
+    """
+    with open(path, "rb") as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+class ExternalShuffle:
+    """
+    Shuffle por ordenamiento externo (sort-merge con volcado a disco).
+
+    Los pares intermedios se acumulan en memoria hasta max_records_in_memory.
+    Al superar ese presupuesto se ordenan por clave y se vuelcan a disco como
+    una corrida ordenada. Al final, groups() mezcla las k corridas (más lo que
+    quede en memoria) con heapq.merge y entrega cada clave con sus valores,
+    en orden, sin tener nunca todo el conjunto de datos en memoria.
+
+    Se usa como reemplazo de la lista de resultados intermedios: soporta
+    extend() y len() igual que una lista.
+    """
+
+    def __init__(self, max_records_in_memory: int = 1000000, spill_dir: str = None):
+        """
+        Args:
+            max_records_in_memory: Presupuesto de pares en memoria antes de volcar una corrida
+            spill_dir: Directorio para los archivos temporales (por defecto, el del sistema)
+        """
+        self.max_records_in_memory = max_records_in_memory
+        self.spill_dir = spill_dir
+        self.buffer = []
+        self.run_paths = []
+        self.total_records = 0
+        self.spill_count = 0
+        self._tmp_dir = None
+
+    def __len__(self) -> int:
+        return self.total_records
+
+    def add(self, key: Any, value: Any):
+        self.buffer.append((key, value))
+        self.total_records += 1
+        if len(self.buffer) >= self.max_records_in_memory:
+            self._spill()
+
+    def extend(self, pairs: Iterable[Tuple[Any, Any]]):
+        for key, value in pairs:
+            self.add(key, value)
+
+    def _spill(self):
+        """
+        Ordena el buffer y lo escribe en disco como una corrida.
+        """
+        if not self.buffer:
+            return
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="shuffle_", dir=self.spill_dir)
+
+        self.buffer.sort(key=_by_key)
+        run_path = os.path.join(self._tmp_dir, f"run_{len(self.run_paths):05d}.bin")
+        write_blocks(run_path, self.buffer)
+
+        self.run_paths.append(run_path)
+        self.spill_count += 1
+        self.buffer = []
+
+    def groups(self) -> Iterator[Tuple[Any, List[Any]]]:
+        """
+        Mezcla todas las corridas y agrupa los valores por clave.
+
+        Returns:
+            Iterador de pares (clave, lista de valores) en orden de clave.
+            Los archivos temporales se eliminan al agotar el iterador.
+        """
+        self.buffer.sort(key=_by_key)
+        sources = [read_blocks(path) for path in self.run_paths]
+        sources.append(iter(self.buffer))
+
+        try:
+            merged = heapq.merge(*sources, key=_by_key)
+            for key, pairs in groupby(merged, key=_by_key):
+                yield key, [value for _, value in pairs]
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        """
+        Elimina las corridas en disco y libera el buffer.
+        """
+        self.buffer = []
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+        self.run_paths = []
+
+
+def new_intermediate_buffer(shuffle_mode: str, max_records_in_memory: int = 1000000,
+                            spill_dir: str = None, aggregation: str = None):
+    """
+    Crea el contenedor de pares intermedios según el modo de shuffle.
+
+    Args:
+        shuffle_mode: "memory" (lista en memoria) o "external" (ExternalShuffle)
+        max_records_in_memory: Presupuesto de pares en memoria para el modo "external"
+        spill_dir: Directorio de volcado para el modo "external"
+        aggregation: Agregación numérica del job (ver NumericAggregator); si se
+            indica, reemplaza al modo de shuffle: ocupa memoria por clave distinta
+
+    Returns:
+        Una lista, un ExternalShuffle o un NumericAggregator; todos admiten extend() y len()
+    """
+    if aggregation is not None:
+        return NumericAggregator(aggregation)
+    if shuffle_mode == "memory":
+        return []
+    if shuffle_mode == "external":
+        return ExternalShuffle(max_records_in_memory, spill_dir)
+    raise ValueError(f"Modo de shuffle desconocido: {shuffle_mode!r} (use 'memory' o 'external')")
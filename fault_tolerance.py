@@ -0,0 +1,355 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from job_metrics import STRAGGLER_FACTOR, JobMetrics
+from map_reduce_interface import MapReduceInterface
+from map_reduce_utils import MapSideCombiner, has_batch_map, iter_record_blocks, map_block, uses_combiner
+
+# Caracteres que se guardan de la clave y el valor de un registro en cuarentena
+_MAX_REPR = 500
+
+
+class JobFailedError(RuntimeError):
+    """
+    El job no pudo completarse: una tarea agotó sus intentos o hubo más
+    registros en cuarentena de los permitidos.
+    """
+    pass
+
+
+class RetryPolicy:
+    """
+    Tolerancia a fallos de un motor, con las mismas ideas que Hadoop:
+
+    - Reintentos: una tarea que falla se vuelve a ejecutar hasta max_attempts
+      veces (mapreduce.map.maxattempts). Sirve para fallos transitorios.
+    - Cuarentena (modo skip, opcional): si la tarea falla en todos sus
+      intentos, se procesa una última vez registro a registro y los registros
+      que fallan se apartan en cuarentena en lugar de perder la tarea
+      completa. Los registros en cuarentena se informan en las métricas y en
+      el log, nunca se descartan en silencio. Está desactivada por defecto:
+      un map_function que falla con todos los registros debe hacer fallar el
+      job, no devolver un resultado vacío.
+    - Ejecución especulativa (motores con pool): al final de una fase, una
+      tarea que lleva más de speculative_factor veces la mediana de las ya
+      terminadas se lanza de nuevo en un trabajador libre y se usa el
+      resultado del intento que termine primero.
+    """
+
+    def __init__(self, max_attempts: int = 3, skip_bad_records: bool = False, max_quarantined: int = None,
+                 speculative: bool = False, speculative_factor: float = STRAGGLER_FACTOR,
+                 speculative_min_seconds: float = 1.0):
+        """
+        Args:
+            max_attempts: Intentos por tarea (en SimpleMapReduce, por registro)
+            skip_bad_records: Si es True, tras agotar los intentos se aíslan los
+                registros que fallan; si es False (por defecto), el job falla
+            max_quarantined: Máximo de registros en cuarentena antes de dar el
+                job por fallido (None = sin límite)
+            speculative: Lanzar intentos especulativos de las tareas rezagadas
+            speculative_factor: Veces la mediana de duración que define una tarea rezagada
+            speculative_min_seconds: Duración mínima antes de especular con una tarea
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts debe ser mayor que 0")
+        self.max_attempts = max_attempts
+        self.skip_bad_records = skip_bad_records
+        self.max_quarantined = max_quarantined
+        self.speculative = speculative
+        self.speculative_factor = speculative_factor
+        self.speculative_min_seconds = speculative_min_seconds
+
+
+def quarantine_entry(phase: str, task_id: Any, key: Any, value: Any, error: BaseException) -> Dict[str, Any]:
+    """
+    Describe un registro en cuarentena con datos serializables (JSON o pickle):
+    la clave y el valor se guardan como repr recortado.
+    """
+    if isinstance(value, memoryview):
+        value = bytes(value)
+    return {"phase": phase, "task": task_id, "key": repr(key)[:_MAX_REPR],
+            "value": repr(value)[:_MAX_REPR], "error": repr(error)}
+
+
+class Quarantine:
+    """
+    Registros que fallaron en todos sus intentos. Seguro entre hilos.
+    """
+
+    def __init__(self, limit: int = None):
+        self.limit = limit
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getstate__(self):
+        # El lock no se puede serializar; se recrea al enviar el job a otro proceso
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def extend(self, entries: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self.entries.extend(entries)
+            if self.limit is not None and len(self.entries) > self.limit:
+                raise JobFailedError(f"Más de {self.limit} registros en cuarentena; se aborta el job")
+
+    def add(self, phase: str, task_id: Any, key: Any, value: Any, error: BaseException):
+        self.extend([quarantine_entry(phase, task_id, key, value, error)])
+
+
+def map_records_skipping(job: MapReduceInterface, records: Iterable[Tuple[Any, Any]],
+                         on_error: Callable[[Any, Any, BaseException], None]) -> List[Tuple[Any, Any]]:
+    """
+    Versión de map_records que mapea registro a registro y entrega a
+    on_error los registros que fallan, sin detener la tarea. Con modo por
+    columnas, cada registro se mapea como un bloque de una sola fila.
+    """
+    combiner = MapSideCombiner(job) if uses_combiner(job) else None
+    batch = has_batch_map(job)
+    results = []
+    for key, value in records:
+        try:
+            if batch:
+                mapped = map_block(job, next(iter_record_blocks([(key, value)])))
+            else:
+                mapped = job.map_function(key, value)
+        except Exception as exc:
+            on_error(key, value, exc)
+            continue
+        if combiner:
+            combiner.add_all(mapped)
+        else:
+            results.extend(mapped)
+    return combiner.results() if combiner else results
+
+
+def reduce_groups_skipping(job: MapReduceInterface, groups: Iterable[Tuple[Any, List[Any]]],
+                           on_error: Callable[[Any, Any, BaseException], None]) -> Iterator[Tuple[Any, Any]]:
+    """
+    Aplica reduce_function grupo a grupo y entrega a on_error los grupos que fallan.
+
+    Returns:
+        Generador de los pares finales de los grupos que se redujeron
+    """
+    for key, values in groups:
+        try:
+            reduced = job.reduce_function(key, values)
+        except Exception as exc:
+            on_error(key, values, exc)
+            continue
+        yield from reduced
+
+
+def run_with_retries(attempt_fn: Callable[[bool], Any], policy: RetryPolicy, phase: str, task_id: Any,
+                     logger: logging.Logger = None, metrics: JobMetrics = None) -> Any:
+    """
+    Ejecuta una tarea en el proceso actual con la política de reintentos:
+    attempt_fn(skip) ejecuta un intento completo (skip=True en el último
+    intento, registro a registro con cuarentena). Para motores secuenciales.
+
+    Returns:
+        El resultado del primer intento que termina bien
+    """
+    logger = logger or logging.getLogger("mapreduce")
+    failures = 0
+    while True:
+        skip = failures >= policy.max_attempts
+        try:
+            return attempt_fn(skip)
+        except JobFailedError:
+            raise
+        except Exception as exc:
+            failures += 1
+            if metrics is not None:
+                metrics.incr(phase, "failed_attempts")
+            if skip or (failures >= policy.max_attempts and not policy.skip_bad_records):
+                raise JobFailedError(f"Tarea {phase.upper()} {task_id} falló tras {failures} intentos") from exc
+            if failures < policy.max_attempts:
+                name, message = "task_retries", "reintentando"
+            else:
+                name, message = "skip_mode_tasks", "se procesa registro a registro con cuarentena"
+            if metrics is not None:
+                metrics.incr(phase, name)
+            logger.warning(f"Tarea {phase.upper()} {task_id} falló (intento {failures}): {exc!r}; {message}")
+
+
+class _Attempt:
+    __slots__ = ("task_id", "payload", "attempt", "skip", "speculative", "submitted", "start")
+
+    def __init__(self, task_id: Any, payload: Any, attempt: int, skip: bool = False, speculative: bool = False):
+        self.task_id = task_id
+        self.payload = payload
+        self.attempt = attempt
+        self.skip = skip
+        self.speculative = speculative
+        self.submitted = time.perf_counter()
+        self.start = None
+
+
+def run_tasks(executor: Executor, fn: Callable[[Any, Any, int], Any], tasks: Iterable[Tuple[Any, Any]],
+              max_pending: int, num_workers: int, policy: RetryPolicy,
+              skip_fn: Callable[[Any, Any, int], Any] = None, phase: str = "map",
+              logger: logging.Logger = None, metrics: JobMetrics = None) -> Iterator[Tuple[Any, Any, float]]:
+    """
+    Como run_bounded, pero con reintentos, modo skip y ejecución especulativa.
+
+    Cada tarea es un par (task_id, payload) y se ejecuta como
+    fn(task_id, payload, intento). Si falla, se reintenta; si agota los
+    intentos, se ejecuta skip_fn(task_id, payload, intento) (el modo registro
+    a registro con cuarentena) y, si tampoco hay skip_fn o también falla, se
+    lanza JobFailedError. Un JobFailedError dentro de una tarea (por ejemplo,
+    por el límite de cuarentena) no se reintenta.
+
+    Los ejecutores atienden las tareas en orden, así que se estima el inicio
+    real de cada intento como el momento en que queda un trabajador libre
+    para él (no el del envío). La especulación solo ocurre cuando ya no hay
+    tareas en cola, es decir, cuando sobra un trabajador para el duplicado.
+
+    Args:
+        executor: ThreadPoolExecutor o ProcessPoolExecutor
+        fn: Función de la tarea (debe ser serializable con un pool de procesos)
+        tasks: Iterable de pares (task_id, payload); se consume de forma perezosa
+        max_pending: Máximo de intentos enviados y aún no recogidos
+        num_workers: Trabajadores del ejecutor
+        policy: Reintentos, modo skip y especulación
+        skip_fn: Versión tolerante de fn para el último intento (None = sin modo skip)
+        phase: Nombre de la fase para el log y los contadores
+        logger: Logger del motor
+        metrics: Métricas del job (contadores de reintentos y especulación)
+
+    Returns:
+        Iterador de (task_id, resultado, segundos del intento ganador), en orden de término
+    """
+    logger = logger or logging.getLogger("mapreduce")
+    tasks = iter(tasks)
+    exhausted = False
+    attempts: Dict[Future, _Attempt] = {}
+    live: Dict[Any, List[Future]] = {}     # intentos en vuelo de cada tarea sin terminar
+    attempt_numbers: Dict[Any, int] = {}   # último número de intento de cada tarea
+    failures: Dict[Any, int] = {}
+    speculated = set()
+    running = set()
+    queued = deque()
+    durations = []
+    skip_fn = skip_fn if policy.skip_bad_records else None
+
+    def incr(name: str):
+        if metrics is not None:
+            metrics.incr(phase, name)
+
+    def submit(task_id: Any, payload: Any, skip: bool = False, speculative: bool = False):
+        # Cada intento tiene su propio número (por ejemplo, para no compartir archivos de salida)
+        attempt_numbers[task_id] = attempt_numbers.get(task_id, 0) + 1
+        attempt = _Attempt(task_id, payload, attempt_numbers[task_id], skip, speculative)
+        future = executor.submit(skip_fn if skip else fn, task_id, payload, attempt.attempt)
+        attempts[future] = attempt
+        live.setdefault(task_id, []).append(future)
+        if len(running) < num_workers:
+            attempt.start = time.perf_counter()
+            running.add(future)
+        else:
+            queued.append(future)
+
+    def start_queued():
+        now = time.perf_counter()
+        while queued and len(running) < num_workers:
+            future = queued.popleft()
+            attempts[future].start = now
+            running.add(future)
+
+    while True:
+        while not exhausted and len(attempts) < max_pending:
+            task = next(tasks, None)
+            if task is None:
+                exhausted = True
+                break
+            submit(*task)
+
+        if not attempts:
+            return
+
+        check_stragglers = policy.speculative and exhausted and not queued and durations
+        timeout = max(policy.speculative_min_seconds / 4, 0.05) if check_stragglers else None
+        done, _ = wait(list(attempts), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            attempt = attempts.pop(future, None)
+            if attempt is None:
+                # Intento descartado: otro intento de la misma tarea ya terminó
+                continue
+            if future in running:
+                running.discard(future)
+            elif future in queued:
+                # Terminó antes de que se estimara su inicio
+                queued.remove(future)
+            siblings = live[attempt.task_id]
+            siblings.remove(future)
+
+            try:
+                result = future.result()
+            except JobFailedError:
+                raise
+            except Exception as exc:
+                incr("failed_attempts")
+                if siblings:
+                    # Queda otro intento de la tarea en vuelo: se espera a ese
+                    continue
+                failures[attempt.task_id] = failed = failures.get(attempt.task_id, 0) + 1
+                if failed < policy.max_attempts:
+                    incr("task_retries")
+                    logger.warning(f"Tarea {phase.upper()} {attempt.task_id} falló (intento {failed}): "
+                                   f"{exc!r}; reintentando")
+                    submit(attempt.task_id, attempt.payload)
+                elif skip_fn is not None and not attempt.skip:
+                    incr("skip_mode_tasks")
+                    logger.warning(f"Tarea {phase.upper()} {attempt.task_id} falló {failed} veces ({exc!r}); "
+                                   f"se procesa registro a registro con cuarentena")
+                    submit(attempt.task_id, attempt.payload, skip=True)
+                else:
+                    raise JobFailedError(f"Tarea {phase.upper()} {attempt.task_id} falló tras "
+                                         f"{failed} intentos") from exc
+                continue
+
+            seconds = time.perf_counter() - (attempt.start if attempt.start is not None else attempt.submitted)
+            durations.append(seconds)
+            del live[attempt.task_id]
+            for sibling in siblings:
+                # El intento que perdió no se espera: se cancela si aún no empezó
+                sibling.cancel()
+                attempts.pop(sibling, None)
+                running.discard(sibling)
+                if sibling in queued:
+                    queued.remove(sibling)
+            if attempt.task_id in speculated:
+                incr("speculative_wins" if attempt.speculative else "speculative_losses")
+            yield attempt.task_id, result, seconds
+
+        start_queued()
+
+        if policy.speculative and exhausted and not queued and durations:
+            threshold = max(statistics.median(durations) * policy.speculative_factor,
+                            policy.speculative_min_seconds)
+            now = time.perf_counter()
+            for future in list(running):
+                attempt = attempts.get(future)
+                if (attempt is None or attempt.task_id in speculated or attempt.start is None
+                        or len(running) >= num_workers):
+                    continue
+                if now - attempt.start > threshold:
+                    speculated.add(attempt.task_id)
+                    incr("speculative_launches")
+                    logger.info(f"Tarea {phase.upper()} {attempt.task_id} rezagada "
+                                f"({now - attempt.start:.1f}s); lanzando intento especulativo")
+                    submit(attempt.task_id, attempt.payload, skip=attempt.skip, speculative=True)
@@ -1,69 +1,400 @@
-from typing import List, Tuple, Any
-import json
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple, Any
+import io
+import logging
+import os
+import shutil
 import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from block_storage import BlockReader, BlockWriter, NameNode
+from job_logging import INFO, get_logger
+from record_formats import RecordFormat, RecordWriter, get_format
+
+# Buffer de E/S para las lecturas y escrituras en streaming
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+class _CountingReader(io.RawIOBase):
+    """
+    Flujo de lectura sin buffer que suma al simulador los bytes que se leen
+    del almacenamiento (antes del buffer, como el contador de HDFS).
+    """
+    
+    def __init__(self, raw: io.RawIOBase, hdfs: "HDFSSimulator"):
+        super().__init__()
+        self.raw = raw
+        self.hdfs = hdfs
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return self.raw.seekable()
+    
+    def tell(self) -> int:
+        return self.raw.tell()
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+    
+    def readinto(self, b) -> int:
+        n = self.raw.readinto(b)
+        if n:
+            self.hdfs._count_bytes(read=n)
+        return n
+    
+    def close(self):
+        self.raw.close()
+        super().close()
+
 class HDFSSimulator:
     """
     Simulador simple de HDFS (Hadoop Distributed File System) usando el sistema de archivos local.
     Simula la escritura de archivos distribuidos en diferentes nodos.
+    
+    Por defecto cada archivo lógico es un archivo local. Con block_size, los
+    archivos se dividen en bloques de tamaño fijo replicados en varios
+    datanodes simulados (datanodes/datanodeN/) y un índice de namenode
+    (namenode/fsimage.json) guarda la ubicación de cada bloque, lo que permite
+    planificar tareas de map por localidad de datos.
     """
     
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, verbosity: int = INFO, block_size: int = None,
+                 num_datanodes: int = 3, replication: int = 3):
         """
         Inicializa el simulador HDFS.
         
         Args:
             base_path: Directorio base para simular HDFS. Si es None, usa el directorio actual.
+            verbosity: 0 (solo errores), 1 (eventos del sistema de archivos)
+                o 2 (una línea por cada archivo escrito)
+            block_size: Tamaño de bloque en bytes. Si es None, no se usan bloques
+                (un archivo local por archivo de HDFS)
+            num_datanodes: Datanodes simulados (solo con block_size)
+            replication: Réplicas de cada bloque, como máximo num_datanodes (solo con block_size)
         """
+        self.logger = get_logger("HDFSSimulator", verbosity)
         if base_path is None:
             self.base_path = Path.cwd() / "hdfs_sim"
         else:
             self.base_path = Path(base_path)
         
         self.base_path.mkdir(parents=True, exist_ok=True)
-        print(f"HDFS Simulado inicializado en: {self.base_path}")
+        # Bytes lógicos leídos y escritos desde que se creó el simulador (sin contar réplicas).
+        # Se actualizan con un lock: la E/S asíncrona (AsyncHDFS) usa otro hilo
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._bytes_lock = threading.Lock()
+        self.namenode = None
+        if block_size is not None:
+            self.namenode = NameNode(self.base_path, num_datanodes, replication, block_size)
+        
+        self.logger.info(f"HDFS Simulado inicializado en: {self.base_path}")
+        if self.namenode is not None:
+            self.logger.info(f"   Bloques de {block_size} bytes, {num_datanodes} datanodes, replicación {replication}")
+    
+    def _count_bytes(self, read: int = 0, written: int = 0):
+        with self._bytes_lock:
+            self.bytes_read += read
+            self.bytes_written += written
     
-    def write_file(self, file_path: str, data: List[Tuple[Any, Any]], step: str = ""):
+    @property
+    def datanodes(self) -> List[str]:
         """
-        Simula la escritura de un archivo en HDFS.
+        Nombres de los datanodes simulados (vacío si no se usan bloques).
+        """
+        return self.namenode.datanodes if self.namenode is not None else []
+    
+    def _open(self, full_path: Path, record_format: RecordFormat, mode: str,
+              buffer_size: int = -1):
+        if record_format.binary:
+            return open(full_path, mode + 'b', buffering=buffer_size)
+        return open(full_path, mode, encoding='utf-8', buffering=buffer_size)
+    
+    def _wrap(self, raw: io.RawIOBase, record_format: RecordFormat, mode: str,
+              buffer_size: int = -1):
+        if buffer_size < 1:
+            buffer_size = io.DEFAULT_BUFFER_SIZE
+        if mode == 'w':
+            f = io.BufferedWriter(raw, buffer_size)
+        else:
+            f = io.BufferedReader(raw, buffer_size)
+        if record_format.binary:
+            return f
+        return io.TextIOWrapper(f, encoding='utf-8')
+    
+    @contextmanager
+    def _open_block_writer(self, file_path: str, step: str, record_format: RecordFormat,
+                           buffer_size: int) -> Iterator[RecordWriter]:
+        # El archivo solo se registra en el namenode al terminar de escribirlo,
+        # de modo que un archivo a medio escribir nunca queda visible
+        raw = BlockWriter(self.namenode)
+        f = self._wrap(raw, record_format, 'w', buffer_size)
+        try:
+            writer = record_format.writer(f)
+            yield writer
+            writer.close()
+            f.close()
+        except BaseException:
+            try:
+                f.close()
+            finally:
+                raw.abort()
+            raise
+        
+        self.namenode.add_file(file_path, raw.blocks, raw.size)
+        self._count_bytes(written=raw.size)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"HDFS: Escribiendo {writer.count} registros en /{file_path} [{step}]")
+            self.logger.debug(f"   Tamaño del archivo: {raw.size} bytes en {len(raw.blocks)} bloques")
+    
+    @contextmanager
+    def open_writer(self, file_path: str, step: str = "", format_name: str = None,
+                    buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[RecordWriter]:
+        """
+        Abre un archivo de HDFS para escribir registros uno a uno.
+        
+        Los registros pasan por un buffer de E/S y se escriben en un archivo
+        temporal que se renombra al cerrar el bloque `with`: un archivo a
+        medio escribir (por un error) nunca queda visible con su nombre final.
         
         Args:
             file_path: Ruta del archivo en HDFS
-            data: Datos a escribir (lista de tuplas)
             step: Nombre del paso para logging
+            format_name: "json" o "binary"; si es None, se deduce de la extensión
+            buffer_size: Tamaño del buffer de escritura en bytes
+            
+        Returns:
+            Context manager que entrega un RecordWriter (write / write_many)
         """
+        record_format = get_format(file_path, format_name)
+        if self.namenode is not None:
+            with self._open_block_writer(file_path, step, record_format, buffer_size) as writer:
+                yield writer
+            return
+        
         full_path = self.base_path / file_path
         full_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = full_path.with_name(full_path.name + ".tmp")
         
-        # Convertir tuplas a formato JSON para persistencia
-        json_data = [{"key": key, "value": value} for key, value in data]
+        try:
+            with self._open(tmp_path, record_format, 'w', buffer_size) as f:
+                writer = record_format.writer(f)
+                yield writer
+                writer.close()
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
+        self._count_bytes(written=full_path.stat().st_size)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"HDFS: Escribiendo {writer.count} registros en /{file_path} [{step}]")
+            self.logger.debug(f"   Tamaño del archivo: {full_path.stat().st_size} bytes")
+    
+    @contextmanager
+    def open_reader(self, file_path: str, format_name: str = None,
+                    buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[Iterator[Tuple[Any, Any]]]:
+        """
+        Abre un archivo de HDFS para recorrer sus registros uno a uno.
         
-        print(f"HDFS: Escribiendo {len(data)} registros en /{file_path} [{step}]")
-        print(f"   Tamaño del archivo: {full_path.stat().st_size} bytes")
+        Con el formato binario solo hay un registro en memoria a la vez.
+        Si el archivo no existe, el iterador entregado está vacío.
+        
+        Args:
+            file_path: Ruta del archivo en HDFS
+            format_name: Formato del archivo; si es None, se deduce de la extensión
+            buffer_size: Tamaño del buffer de lectura en bytes
+            
+        Returns:
+            Context manager que entrega un iterador de tuplas (clave, valor)
+        """
+        if not self.exists(file_path):
+            yield iter(())
+            return
+        
+        record_format = get_format(file_path, format_name)
+        f = self._wrap(self._open_raw(file_path), record_format, 'r', buffer_size)
+        with f:
+            yield (tuple(record) for record in record_format.read_records(f))
     
-    def read_file(self, file_path: str) -> List[Tuple[Any, Any]]:
+    def exists(self, file_path: str) -> bool:
         """
-        Simula la lectura de un archivo desde HDFS.
+        Indica si un archivo existe en HDFS.
+        """
+        if self.namenode is not None:
+            return self.namenode.get_file(file_path) is not None
+        return (self.base_path / file_path).is_file()
+    
+    def get_file_size(self, file_path: str) -> int:
+        """
+        Tamaño lógico de un archivo de HDFS en bytes (sin contar réplicas).
+        """
+        if self.namenode is not None:
+            file_info = self.namenode.get_file(file_path)
+            if file_info is None:
+                raise FileNotFoundError(f"No existe en HDFS: /{file_path}")
+            return file_info["size"]
+        return (self.base_path / file_path).stat().st_size
+    
+    def get_modification_time(self, file_path: str) -> int:
+        """
+        Momento de la última escritura de un archivo de HDFS, en nanosegundos.
+        """
+        if self.namenode is not None:
+            file_info = self.namenode.get_file(file_path)
+            if file_info is None:
+                raise FileNotFoundError(f"No existe en HDFS: /{file_path}")
+            return file_info.get("mtime", 0)
+        return (self.base_path / file_path).stat().st_mtime_ns
+    
+    def get_block_locations(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Bloques de un archivo y los datanodes que guardan cada réplica
+        (equivalente a getFileBlockLocations de HDFS).
         
         Args:
             file_path: Ruta del archivo en HDFS
             
         Returns:
-            Lista de tuplas leídas del archivo
+            Lista de diccionarios con offset, length, block_id y locations.
+            Sin bloques, el archivo completo es un único bloque sin ubicaciones.
         """
-        full_path = self.base_path / file_path
+        if self.namenode is None:
+            size = self.get_file_size(file_path)
+            return [{"offset": 0, "length": size, "block_id": None, "locations": []}]
         
-        if not full_path.exists():
-            return []
+        file_info = self.namenode.get_file(file_path)
+        if file_info is None:
+            raise FileNotFoundError(f"No existe en HDFS: /{file_path}")
+        return [dict(block) for block in file_info["blocks"]]
+    
+    def open_stream(self, file_path: str, preferred_datanode: str = None,
+                    buffer_size: int = DEFAULT_BUFFER_SIZE) -> BinaryIO:
+        """
+        Abre los bytes de un archivo de HDFS para lectura con seek (por ejemplo,
+        para leer un rango de bytes de un archivo de texto).
+        
+        Args:
+            file_path: Ruta del archivo en HDFS
+            preferred_datanode: Datanode desde el que leer las réplicas si las tiene
+                (lectura local de una tarea planificada en ese nodo)
+            buffer_size: Tamaño del buffer de lectura en bytes
+            
+        Returns:
+            Archivo binario de solo lectura
+        """
+        return io.BufferedReader(self._open_raw(file_path, preferred_datanode), buffer_size)
+    
+    def _open_raw(self, file_path: str, preferred_datanode: str = None) -> io.RawIOBase:
+        """
+        Abre los bytes de un archivo sin buffer, contando los bytes leídos.
+        """
+        if self.namenode is None:
+            raw = open(self.base_path / file_path, 'rb', buffering=0)
+        else:
+            file_info = self.namenode.get_file(file_path)
+            if file_info is None:
+                raise FileNotFoundError(f"No existe en HDFS: /{file_path}")
+            raw = BlockReader(self.namenode, file_info, preferred_datanode)
+        return _CountingReader(raw, self)
+    
+    def put_file(self, local_path: str, file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        Copia un archivo local (por ejemplo, un CSV de entrada) a HDFS tal cual,
+        como `hdfs dfs -put`. Con bloques, queda dividido y replicado.
         
-        with open(full_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        Args:
+            local_path: Ruta del archivo local
+            file_path: Ruta de destino en HDFS
+            buffer_size: Tamaño del buffer de copia en bytes
+        """
+        if self.namenode is None:
+            full_path = self.base_path / file_path
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(local_path, full_path)
+        else:
+            raw = BlockWriter(self.namenode)
+            try:
+                with open(local_path, 'rb') as src:
+                    shutil.copyfileobj(src, raw, buffer_size)
+                raw.close()
+            except BaseException:
+                raw.abort()
+                raise
+            self.namenode.add_file(file_path, raw.blocks, raw.size)
+        
+        self._count_bytes(written=self.get_file_size(file_path))
+        self.logger.info(f"HDFS: Copiado {local_path} -> /{file_path} ({self.get_file_size(file_path)} bytes)")
+    
+    def append_file(self, local_path: str, file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        Agrega el contenido de un archivo local al final de un archivo de HDFS,
+        como `hdfs dfs -appendToFile`. Si el archivo no existe, lo crea.
+        
+        Con bloques, los datos nuevos van en bloques nuevos (el último bloque
+        anterior puede quedar incompleto); los bloques existentes no cambian,
+        así que un job incremental puede procesar solo los bloques nuevos.
+        
+        Args:
+            local_path: Ruta del archivo local con los datos a agregar
+            file_path: Ruta del archivo en HDFS
+            buffer_size: Tamaño del buffer de copia en bytes
+        """
+        if not self.exists(file_path):
+            self.put_file(local_path, file_path, buffer_size)
+            return
+        
+        if self.namenode is None:
+            full_path = self.base_path / file_path
+            with open(local_path, 'rb') as src, open(full_path, 'ab') as dst:
+                shutil.copyfileobj(src, dst, buffer_size)
+            appended = os.path.getsize(local_path)
+        else:
+            file_info = self.namenode.get_file(file_path)
+            raw = BlockWriter(self.namenode, offset=file_info["size"])
+            try:
+                with open(local_path, 'rb') as src:
+                    shutil.copyfileobj(src, raw, buffer_size)
+                raw.close()
+            except BaseException:
+                raw.abort()
+                raise
+            self.namenode.add_file(file_path, file_info["blocks"] + raw.blocks, file_info["size"] + raw.size)
+            appended = raw.size
         
-        return [(item["key"], item["value"]) for item in json_data]
+        self._count_bytes(written=appended)
+        self.logger.info(f"HDFS: Agregados {appended} bytes de {local_path} a /{file_path}")
+    
+    def write_file(self, file_path: str, data: Iterable[Tuple[Any, Any]], step: str = "",
+                   format_name: str = None):
+        """
+        Simula la escritura de un archivo en HDFS.
+        
+        Args:
+            file_path: Ruta del archivo en HDFS
+            data: Datos a escribir (lista o iterador de tuplas)
+            step: Nombre del paso para logging
+            format_name: "json" o "binary". Si es None, se elige por la extensión
+                del archivo (.json -> JSON legible, .bin u otra -> binario compacto)
+        """
+        with self.open_writer(file_path, step, format_name) as writer:
+            writer.write_many(data)
+    
+    def read_file(self, file_path: str, format_name: str = None) -> List[Tuple[Any, Any]]:
+        """
+        Simula la lectura de un archivo desde HDFS.
+        
+        Args:
+            file_path: Ruta del archivo en HDFS
+            format_name: Formato del archivo; si es None, se deduce de la extensión
+            
+        Returns:
+            Lista de tuplas leídas del archivo
+        """
+        with self.open_reader(file_path, format_name) as records:
+            return list(records)
     
     def list_files(self, directory: str = "") -> List[str]:
         """
@@ -75,6 +406,9 @@ class HDFSSimulator:
         Returns:
             Lista de archivos en el directorio
         """
+        if self.namenode is not None:
+            return self.namenode.list_files(directory)
+        
         dir_path = self.base_path / directory
         if not dir_path.exists():
             return []
@@ -87,11 +421,29 @@ class HDFSSimulator:
         
         return sorted(files)
     
+    def delete(self, path: str):
+        """
+        Elimina un archivo o un directorio completo de HDFS (como `hdfs dfs -rm -r`).
+        
+        Args:
+            path: Ruta del archivo o directorio en HDFS
+        """
+        if self.namenode is not None:
+            self.namenode.delete_files(self.namenode.list_files(path))
+        else:
+            full_path = self.base_path / path
+            if full_path.is_dir():
+                shutil.rmtree(full_path)
+            else:
+                full_path.unlink(missing_ok=True)
+        self.logger.debug(f"HDFS: Eliminado /{path}")
+    
     def cleanup(self):
         """
         Limpia el sistema de archivos simulado.
         """
-        import shutil
         if self.base_path.exists():
             shutil.rmtree(self.base_path)
-            print(f"HDFS Simulado limpiado: {self.base_path}")
\ No newline at end of file
+            self.logger.info(f"HDFS Simulado limpiado: {self.base_path}")
+        if self.namenode is not None:
+            self.namenode.files = {}
\ No newline at end of file
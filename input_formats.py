@@ -0,0 +1,353 @@
+import csv
+import mmap
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Tuple
+
+# Tamaño por defecto de un input split (como el tamaño de bloque de HDFS)
+DEFAULT_SPLIT_SIZE = 64 * 1024 * 1024
+
+# Bytes examinados por iteración al buscar el límite de un registro CSV
+_SCAN_CHUNK_SIZE = 1024 * 1024
+
+# Tipos de valor sin decodificar que pueden entregar los formatos (raw_values)
+RAW_VALUE_TYPES = ("bytes", "memoryview")
+
+_WHITESPACE = frozenset(b" \t\r\n\x0b\x0c")
+
+
+class InputSplit:
+    """
+    Rango de bytes [start, end) de un archivo que procesa una tarea de map.
+    Solo describe el rango: no contiene datos, así que es barato de crear en
+    el driver y de enviar a un proceso trabajador.
+    """
+
+    def __init__(self, path: str, start: int, end: int):
+        self.path = path
+        self.start = start
+        self.end = end
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"InputSplit({self.path!r}, {self.start}, {self.end})"
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[mmap.mmap]:
+    """
+    Mapea un archivo completo en memoria de solo lectura. Solo se cargan las
+    páginas que se recorren, así que cada tarea lee únicamente su rango.
+    Un archivo vacío se entrega como bytes vacíos (mmap no admite tamaño 0).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            try:
+                mm.close()
+            except BufferError:
+                # Alguien conservó una vista (memoryview) del archivo; el mapeo
+                # se libera cuando el recolector elimina la última vista
+                pass
+
+
+def _content_end(mm, start: int, stop: int) -> int:
+    """
+    Fin del contenido de una línea [start, stop), sin el salto de línea final (\\n o \\r\\n).
+    """
+    if stop > start and mm[stop - 1] == 0x0A:
+        stop -= 1
+    if stop > start and mm[stop - 1] == 0x0D:
+        stop -= 1
+    return stop
+
+
+def _is_blank(mm, start: int, end: int) -> bool:
+    # Solo se copia la línea si empieza con un espacio; el caso común no asigna memoria
+    return start == end or (mm[start] in _WHITESPACE and not mm[start:end].strip())
+
+
+def _check_raw_values(raw_values: str):
+    if raw_values is not None and raw_values not in RAW_VALUE_TYPES:
+        raise ValueError(f"raw_values desconocido: {raw_values!r} (use None, 'bytes' o 'memoryview')")
+
+
+class InputFormat(ABC):
+    """
+    Define cómo se divide un archivo en input splits y cómo se leen los
+    registros de cada split (equivalente al InputFormat de Hadoop).
+
+    El driver solo llama a get_splits(), que trabaja con el tamaño del archivo;
+    cada tarea de map llama a read_split() y lee únicamente su rango de bytes.
+    """
+
+    def get_splits(self, file_path: str, split_size: int = DEFAULT_SPLIT_SIZE) -> List[InputSplit]:
+        """
+        Divide un archivo en rangos de bytes de aproximadamente split_size.
+
+        Args:
+            file_path: Ruta del archivo local
+            split_size: Tamaño objetivo de cada split en bytes
+
+        Returns:
+            Lista de splits que cubren el archivo completo
+        """
+        if split_size < 1:
+            raise ValueError("split_size debe ser mayor que 0")
+        size = os.path.getsize(file_path)
+        return [InputSplit(file_path, start, min(start + split_size, size))
+                for start in range(0, size, split_size)]
+
+    @abstractmethod
+    def read_split(self, split: InputSplit) -> Iterator[Tuple[Any, Any]]:
+        """
+        Lee los registros de un split.
+
+        Returns:
+            Generador de pares (clave, valor) para map_function
+        """
+        pass
+
+    def read_records(self, file_path: str) -> Iterator[Tuple[Any, Any]]:
+        """
+        Lee todos los registros del archivo como un único split, en orden
+        (entrada secuencial para motores que reciben un iterable).
+        """
+        return self.read_split(InputSplit(file_path, 0, os.path.getsize(file_path)))
+
+    def _make_value(self, mm, view, start: int, end: int):
+        if self.raw_values == "memoryview":
+            return view[start:end]
+        if self.raw_values == "bytes":
+            return mm[start:end]
+        return mm[start:end].decode(self.encoding)
+
+
+class TextInputFormat(InputFormat):
+    """
+    Una línea de texto por registro; la clave es el desplazamiento en bytes
+    de la línea dentro del archivo.
+
+    Los splits son rangos de bytes sin alinear: cada split procesa las líneas
+    que empiezan dentro de su rango, aunque terminen en el siguiente (la
+    misma regla que TextInputFormat de Hadoop), así ninguna línea se pierde
+    ni se procesa dos veces.
+
+    Con raw_values, las líneas se entregan sin decodificar: "bytes" copia solo
+    los bytes de la línea y "memoryview" entrega una vista del archivo mapeado
+    sin copiar nada. La vista solo es válida mientras map_function procesa el
+    registro (se libera al pasar al siguiente); para conservarla hay que
+    copiarla con bytes(value). Los motores que agrupan registros en lotes
+    antes de mapearlos (hilos, procesos, HDFS, distribuido) la copian a bytes
+    al armar cada lote (map_reduce_utils.batched_records). La decodificación queda a cargo de map_function
+    (por ejemplo, con as_text o parse_csv_line de input_readers).
+    """
+
+    def __init__(self, encoding: str = "utf-8", skip_header: bool = False, skip_empty: bool = True,
+                 raw_values: str = None):
+        """
+        Args:
+            encoding: Codificación del archivo
+            skip_header: Si es True, descarta la primera línea del archivo
+            skip_empty: Si es True, omite las líneas vacías o con solo espacios
+            raw_values: None (líneas str), "bytes" o "memoryview" (sin decodificar)
+        """
+        _check_raw_values(raw_values)
+        self.encoding = encoding
+        self.skip_header = skip_header
+        self.skip_empty = skip_empty
+        self.raw_values = raw_values
+
+    def read_split(self, split: InputSplit) -> Iterator[Tuple[int, str]]:
+        with _mapped(split.path) as mm:
+            size = len(mm)
+            pos = split.start
+            if pos > 0 and mm[pos - 1:pos] != b"\n":
+                # La línea que cruza el inicio del split pertenece al split anterior
+                newline = mm.find(b"\n", pos)
+                pos = size if newline == -1 else newline + 1
+            if split.start == 0 and self.skip_header:
+                newline = mm.find(b"\n")
+                pos = size if newline == -1 else newline + 1
+
+            view = memoryview(mm) if self.raw_values == "memoryview" else None
+            try:
+                while pos < split.end:
+                    newline = mm.find(b"\n", pos)
+                    stop = size if newline == -1 else newline + 1
+                    end = _content_end(mm, pos, stop)
+                    if not (self.skip_empty and _is_blank(mm, pos, end)):
+                        value = self._make_value(mm, view, pos, end)
+                        yield pos, value
+                        if view is not None:
+                            value.release()
+                    pos = stop
+            finally:
+                if view is not None:
+                    view.release()
+
+
+class CSVInputFormat(InputFormat):
+    """
+    Un registro CSV por clave; el valor es la lista de columnas ya parseada
+    (la misma que entrega read_csv_rows) y la clave es el desplazamiento en
+    bytes del registro.
+
+    Un campo entre comillas puede contener saltos de línea, así que no todo
+    salto de línea termina un registro. get_splits() mueve cada límite al
+    siguiente salto de línea que queda fuera de comillas, contando comillas
+    sobre el archivo mapeado en memoria (búsquedas en C, sin crear objetos
+    Python por registro). Las comillas dobles escapadas ("") no cambian la
+    paridad, por lo que el conteo es exacto para CSV estándar.
+
+    Con raw_values ("bytes" o "memoryview", ver TextInputFormat) el valor es
+    el registro completo sin parsear ni decodificar (puede abarcar varias
+    líneas); map_function lo parsea solo si lo necesita con parse_csv_line.
+    """
+
+    def __init__(self, encoding: str = "utf-8", skip_header: bool = True, raw_values: str = None,
+                 **csv_options):
+        """
+        Args:
+            encoding: Codificación del archivo
+            skip_header: Si es True, descarta el primer registro (encabezado)
+            raw_values: None (columnas parseadas), "bytes" o "memoryview" (registro sin decodificar)
+            **csv_options: Opciones adicionales para csv.reader (delimiter, quotechar...)
+        """
+        _check_raw_values(raw_values)
+        self.encoding = encoding
+        self.skip_header = skip_header
+        self.raw_values = raw_values
+        self.csv_options = csv_options
+        self.quote = csv_options.get("quotechar", '"').encode(encoding)
+
+    def _record_boundary(self, mm, start: int, in_quotes: bool) -> Tuple[int, bool]:
+        """
+        Busca desde start el primer salto de línea fuera de comillas.
+
+        Returns:
+            Posición siguiente a ese salto de línea (o el final del archivo)
+            y el estado de comillas en esa posición
+        """
+        size = len(mm)
+        pos = start
+        while pos < size:
+            newline = mm.find(b"\n", pos)
+            if newline == -1:
+                return size, in_quotes
+            in_quotes ^= mm[pos:newline].count(self.quote) % 2 == 1
+            if not in_quotes:
+                return newline + 1, in_quotes
+            pos = newline + 1
+        return size, in_quotes
+
+    def get_splits(self, file_path: str, split_size: int = DEFAULT_SPLIT_SIZE) -> List[InputSplit]:
+        if split_size < 1:
+            raise ValueError("split_size debe ser mayor que 0")
+
+        splits = []
+        with _mapped(file_path) as mm:
+            size = len(mm)
+            start = 0
+            counted = 0      # hasta dónde se contaron comillas
+            in_quotes = False
+
+            while start < size:
+                target = start + split_size
+                if target >= size:
+                    splits.append(InputSplit(file_path, start, size))
+                    break
+
+                # Paridad de comillas hasta el límite nominal, por tramos acotados
+                while counted < target:
+                    chunk_end = min(counted + _SCAN_CHUNK_SIZE, target)
+                    in_quotes ^= mm[counted:chunk_end].count(self.quote) % 2 == 1
+                    counted = chunk_end
+
+                end, in_quotes = self._record_boundary(mm, target, in_quotes)
+                splits.append(InputSplit(file_path, start, end))
+                start = counted = end
+                in_quotes = False
+
+        return splits
+
+    def _iter_raw_records(self, mm, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+        """
+        Recorre los registros de [start, end) sin decodificarlos: un registro
+        termina en el primer salto de línea fuera de comillas.
+
+        Returns:
+            Generador de (inicio, fin del contenido, inicio del siguiente registro)
+        """
+        pos = start
+        while pos < end:
+            record_start = pos
+            in_quotes = False
+            while True:
+                newline = mm.find(b"\n", pos, end)
+                line_end = end if newline == -1 else newline + 1
+                quote = mm.find(self.quote, pos, line_end)
+                while quote != -1:
+                    in_quotes = not in_quotes
+                    quote = mm.find(self.quote, quote + 1, line_end)
+                pos = line_end
+                if not in_quotes or newline == -1:
+                    break
+            yield record_start, _content_end(mm, record_start, pos), pos
+
+    def _read_raw_split(self, mm, split: InputSplit) -> Iterator[Tuple[int, Any]]:
+        view = memoryview(mm) if self.raw_values == "memoryview" else None
+        try:
+            records = self._iter_raw_records(mm, split.start, split.end)
+            if split.start == 0 and self.skip_header:
+                next(records, None)
+            for start, end, _ in records:
+                if _is_blank(mm, start, end):
+                    continue
+                value = self._make_value(mm, view, start, end)
+                yield start, value
+                if view is not None:
+                    value.release()
+        finally:
+            if view is not None:
+                view.release()
+
+    def read_split(self, split: InputSplit) -> Iterator[Tuple[int, Any]]:
+        with _mapped(split.path) as mm:
+            if self.raw_values is not None:
+                yield from self._read_raw_split(mm, split)
+                return
+
+            # Posición del próximo registro: csv.reader pide las líneas de a una,
+            # así que al pedir un registro nuevo el cursor marca su inicio
+            cursor = [split.start]
+
+            def lines() -> Iterator[str]:
+                pos = split.start
+                while pos < split.end:
+                    newline = mm.find(b"\n", pos, split.end)
+                    stop = split.end if newline == -1 else newline + 1
+                    line = mm[pos:stop].decode(self.encoding)
+                    pos = cursor[0] = stop
+                    yield line
+
+            reader = csv.reader(lines(), **self.csv_options)
+            if split.start == 0 and self.skip_header:
+                next(reader, None)
+
+            while True:
+                offset = cursor[0]
+                row = next(reader, None)
+                if row is None:
+                    return
+                if row:
+                    yield offset, row
@@ -0,0 +1,98 @@
+import csv
+from typing import Any, Iterator, List, Tuple
+
+
+def read_lines(file_path: str, skip_header: bool = True, skip_empty: bool = True,
+               encoding: str = "utf-8") -> Iterator[Tuple[int, str]]:
+    """
+    Lee un archivo de texto/CSV de forma perezosa, una línea a la vez.
+
+    Reemplaza el patrón f.read() + split("\\n") + lista de tuplas: solo hay una
+    línea en memoria en cada momento, sin importar el tamaño del archivo.
+
+    Args:
+        file_path: Ruta del archivo a leer
+        skip_header: Si es True, descarta la primera línea (encabezado del CSV)
+        skip_empty: Si es True, omite las líneas vacías o con solo espacios
+        encoding: Codificación del archivo
+
+    Returns:
+        Generador de pares (índice, línea) sin el salto de línea final.
+        El índice es el número de línea contado después del encabezado.
+    """
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        if skip_header:
+            next(f, None)
+
+        for index, line in enumerate(f):
+            line = line.rstrip("\r\n")
+            if skip_empty and not line.strip():
+                continue
+            yield index, line
+
+
+def read_csv_rows(file_path: str, skip_header: bool = True, encoding: str = "utf-8",
+                  **csv_options) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Lee un CSV completo con un único csv.reader y entrega filas ya parseadas.
+
+    Es el modo de entrada masivo: en lugar de construir un lector por línea
+    dentro de map_function, el archivo se parsea en bloque y map_function
+    recibe directamente la lista de columnas. También respeta los saltos de
+    línea dentro de campos entre comillas, que read_lines no puede detectar.
+
+    Args:
+        file_path: Ruta del archivo CSV
+        skip_header: Si es True, descarta la primera fila (encabezado)
+        encoding: Codificación del archivo
+        **csv_options: Opciones adicionales para csv.reader (delimiter, quotechar...)
+
+    Returns:
+        Generador de pares (índice, columnas), omitiendo filas vacías
+    """
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        reader = csv.reader(f, **csv_options)
+        if skip_header:
+            next(reader, None)
+
+        for index, row in enumerate(reader):
+            if row:
+                yield index, row
+
+
+def as_text(value: Any, encoding: str = "utf-8") -> str:
+    """
+    Devuelve un valor de entrada como texto, decodificándolo solo si llega
+    sin decodificar (bytes o memoryview, ver raw_values en input_formats).
+
+    Args:
+        value: Línea como str, bytes o memoryview
+        encoding: Codificación de los bytes
+
+    Returns:
+        La línea como str
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return str(value, encoding)
+    return value
+
+
+def parse_csv_line(value: Any, encoding: str = "utf-8") -> List[str]:
+    """
+    Devuelve las columnas de un registro CSV.
+
+    Acepta tanto una fila ya parseada (lista, producida por read_csv_rows)
+    como una línea cruda (str, producida por read_lines, o bytes/memoryview
+    sin decodificar, producidos por los InputFormat con raw_values), de modo
+    que el mismo map_function sirve para todos los modos de entrada.
+
+    Args:
+        value: Fila parseada o línea de texto
+        encoding: Codificación de las líneas sin decodificar
+
+    Returns:
+        Lista de columnas (vacía si la línea no tiene contenido)
+    """
+    if isinstance(value, list):
+        return value
+    return next(csv.reader([as_text(value, encoding)]), [])
@@ -0,0 +1,65 @@
+import logging
+import sys
+from typing import Iterable, Iterator, List
+
+# Niveles de verbosidad aceptados por los motores y por HDFSSimulator
+QUIET = 0    # solo advertencias y errores
+INFO = 1     # resumen por fase y contadores de progreso (por defecto)
+DEBUG = 2    # detalle por registro (solo para datos pequeños)
+
+_LEVELS = {QUIET: logging.WARNING, INFO: logging.INFO, DEBUG: logging.DEBUG}
+
+
+def get_logger(name: str, verbosity: int = INFO) -> logging.Logger:
+    """
+    Obtiene el logger de un componente con el nivel que corresponde a la verbosidad.
+
+    Todos los loggers cuelgan de "mapreduce". Si la aplicación no configuró ese
+    logger, se le agrega un handler a stdout con solo el mensaje, para que la
+    salida se vea igual que los antiguos print().
+
+    Args:
+        name: Nombre del componente (por ejemplo, el nombre de la clase)
+        verbosity: QUIET, INFO o DEBUG
+
+    Returns:
+        Logger configurado
+    """
+    parent = logging.getLogger("mapreduce")
+    if not parent.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        parent.addHandler(handler)
+        parent.propagate = False
+
+    logger = parent.getChild(name)
+    logger.setLevel(_LEVELS[max(QUIET, min(verbosity, DEBUG))])
+    return logger
+
+
+class ProgressCounter:
+    """
+    Contador de registros procesados que informa cada `every` registros,
+    en lugar de escribir una línea por registro.
+    """
+
+    def __init__(self, logger: logging.Logger, label: str, every: int = 100000):
+        self.logger = logger
+        self.label = label
+        self.every = every
+        self.count = 0
+        self._next_report = every
+
+    def add(self, n: int = 1):
+        self.count += n
+        if self.count >= self._next_report:
+            self.logger.info(f"   {self.label}: {self.count} registros procesados")
+            self._next_report = (self.count // self.every + 1) * self.every
+
+    def track_batches(self, batches: Iterable[List]) -> Iterator[List]:
+        """
+        Envuelve un iterador de lotes contando sus registros a medida que se consumen.
+        """
+        for batch in batches:
+            self.add(len(batch))
+            yield batch
@@ -0,0 +1,150 @@
+import logging
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# Una tarea es rezagada (straggler) si tarda más que este factor por la mediana de su fase
+STRAGGLER_FACTOR = 1.5
+
+
+def skew_stats(values: Sequence[float]) -> Dict[str, float]:
+    """
+    Resume la distribución de una medida por tarea (duración o registros).
+
+    skew es max / media: 1.0 significa un reparto perfecto entre tareas y
+    valores altos indican que una tarea concentra el trabajo (rezagada o
+    partición con claves calientes).
+
+    Args:
+        values: Una medida por tarea
+
+    Returns:
+        Diccionario con count, min, max, mean, median, p95 y skew
+    """
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    mean = sum(ordered) / len(ordered)
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "skew": ordered[-1] / mean if mean else 1.0,
+    }
+
+
+class RecordCounter:
+    """
+    Iterador que cuenta los registros que lo atraviesan (para entradas
+    perezosas cuyo tamaño no se conoce de antemano).
+    """
+
+    def __init__(self, records: Iterable[Any]):
+        self._records = iter(records)
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        record = next(self._records)
+        self.count += 1
+        return record
+
+
+class JobMetrics:
+    """
+    Contadores y tiempos de una ejecución, al estilo de los counters de Hadoop.
+
+    - Contadores agrupados por fase: counters["map"]["input_records"], etc.
+      (también "hdfs" para los bytes leídos y escritos en el simulador)
+    - Tiempo de pared de cada fase
+    - Duración y registros de cada tarea, con estadísticas de sesgo y la
+      lista de tareas rezagadas de cada fase
+
+    Los motores actualizan los contadores desde el hilo principal; add_task
+    solo agrega a una lista, así que también puede llamarse desde los hilos
+    de un pool.
+    """
+
+    def __init__(self):
+        # partial y no lambda: las métricas viajan con el job cuando este se
+        # serializa para otro proceso (ProcessPoolMapReduce con spawn, workers)
+        self.counters = defaultdict(partial(defaultdict, int))
+        self.phase_seconds = {}
+        self.tasks = defaultdict(list)
+
+    def incr(self, group: str, name: str, n: int = 1):
+        self.counters[group][name] += n
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Mide el tiempo de pared de un bloque `with` y lo suma al de la fase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def add_task(self, phase: str, task_id: Any, seconds: float, records: int = 0):
+        """
+        Registra una tarea terminada.
+
+        Args:
+            phase: Fase de la tarea ("map" o "reduce")
+            task_id: Identificador de la tarea dentro de la fase
+            seconds: Duración de la tarea
+            records: Registros (o grupos) que procesó la tarea
+        """
+        self.tasks[phase].append((task_id, seconds, records))
+
+    def stragglers(self, phase: str) -> List[Any]:
+        """
+        Tareas de la fase que tardaron más de STRAGGLER_FACTOR veces la mediana.
+        """
+        tasks = self.tasks.get(phase, [])
+        if len(tasks) < 2:
+            return []
+        median = statistics.median(seconds for _, seconds, _ in tasks)
+        return [task_id for task_id, seconds, _ in tasks if seconds > median * STRAGGLER_FACTOR]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Métricas como diccionario serializable a JSON (se devuelve con
+        execute(..., return_metrics=True) y se guarda en job_metadata.json).
+        """
+        tasks = {}
+        for phase, phase_tasks in self.tasks.items():
+            tasks[phase] = {
+                "durations": skew_stats([seconds for _, seconds, _ in phase_tasks]),
+                "records": skew_stats([records for _, _, records in phase_tasks]),
+                "stragglers": self.stragglers(phase),
+                "tasks": [{"task": task_id, "seconds": round(seconds, 6), "records": records}
+                          for task_id, seconds, records in phase_tasks],
+            }
+        return {
+            "counters": {group: dict(values) for group, values in self.counters.items()},
+            "phase_seconds": {phase: round(seconds, 6) for phase, seconds in self.phase_seconds.items()},
+            "tasks": tasks,
+        }
+
+    def log_summary(self, logger: logging.Logger):
+        """
+        Informa el tiempo de cada fase y las tareas rezagadas, si las hay.
+        """
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phase_seconds.items())
+        logger.info(f"Tiempo por fase: {phases}")
+        for phase in self.tasks:
+            stragglers = self.stragglers(phase)
+            if stragglers:
+                logger.info(f"Tareas {phase.upper()} rezagadas (> {STRAGGLER_FACTOR}x la mediana): {stragglers}")
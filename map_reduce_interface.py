@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
 
 
 class MapReduceInterface(ABC):
@@ -8,6 +8,15 @@ class MapReduceInterface(ABC):
     Los estudiantes deben heredar de esta clase e implementar los métodos abstractos.
     """
 
+    # Columnas que necesita map_batch_function (modo por columnas, opcional)
+    input_columns = None
+    # True para recibir las columnas como np.ndarray si NumPy está instalado
+    columns_as_arrays = False
+    # "sum", "count", "min" o "max" si reduce_function equivale a esa agregación
+    # numérica: el shuffle acumula un valor por clave (ver NumericAggregator)
+    # en lugar de listas de valores, y reemplaza a reduce_function
+    numeric_aggregation = None
+
     @abstractmethod
     def map_function(self, key: Any, value: Any) -> List[Tuple[Any, Any]]:
         """
@@ -37,3 +46,42 @@ class MapReduceInterface(ABC):
             Lista de tuplas (clave_final, valor_final)
         """
         pass
+
+    def combine_function(self, key: Any, values: List[Any]) -> List[Tuple[Any, Any]]:
+        """
+        Función de combinación (opcional) que pre-agrega, del lado del map,
+        los valores intermedios de una clave producidos por una misma tarea.
+
+        Solo es válida si reduce_function es asociativa y conmutativa (sumas,
+        conteos, máximos...). Debe devolver pares con la misma clave recibida.
+        Por defecto no combina: los motores solo la aplican si la subclase
+        la sobrescribe.
+
+        Args:
+            key: Clave intermedia
+            values: Valores parciales de la clave dentro de una tarea de map
+
+        Returns:
+            Lista de tuplas (clave_intermedia, valor_combinado)
+        """
+        return [(key, value) for value in values]
+
+    def map_batch_function(self, columns: Dict[int, Sequence[Any]]) -> List[Tuple[Any, Any]]:
+        """
+        Versión por columnas de map_function (opcional) para jobs que solo
+        proyectan columnas de un CSV. Recibe un bloque completo de filas como
+        buffers por columna (solo las de input_columns) y devuelve los pares
+        intermedios del bloque, por ejemplo con un kernel de conteo como
+        columnar.value_counts.
+
+        Los motores la usan en lugar de map_function cuando la subclase la
+        sobrescribe y define input_columns.
+
+        Args:
+            columns: Índice de columna -> valores de esa columna en el bloque
+                (lista, o np.ndarray con columns_as_arrays)
+
+        Returns:
+            Lista de tuplas (clave_intermedia, valor_intermedio) del bloque
+        """
+        raise NotImplementedError
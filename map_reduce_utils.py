@@ -0,0 +1,218 @@
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Executor, as_completed, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from columnar import DEFAULT_BLOCK_ROWS, parse_rows, rows_to_columns
+from map_reduce_interface import MapReduceInterface
+
+
+def batched(iterable: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """
+    Divide un iterable en lotes de tamaño fijo sin materializarlo completo.
+
+    Args:
+        iterable: Fuente de registros (lista, generador, archivo...)
+        batch_size: Número máximo de registros por lote
+
+    Returns:
+        Iterador de listas con a lo sumo batch_size elementos
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size debe ser mayor que 0")
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def batched_records(records: Iterable[Tuple[Any, Any]], batch_size: int) -> Iterator[List[Tuple[Any, Any]]]:
+    """
+    Divide registros de entrada en lotes (ver batched) copiando a bytes los
+    valores memoryview (raw_values="memoryview" en input_formats): la vista
+    deja de ser válida cuando el lector avanza al siguiente registro, y un
+    lote conserva sus registros después de eso.
+    """
+    pairs = ((key, bytes(value)) if isinstance(value, memoryview) else (key, value) for key, value in records)
+    return batched(pairs, batch_size)
+
+
+def run_bounded(
+    executor: Executor,
+    fn: Callable[[Any], Any],
+    tasks: Iterable[Any],
+    max_pending: int,
+) -> Iterator[Any]:
+    """
+    Envía tareas a un executor manteniendo un número acotado de futuros en vuelo.
+
+    Las tareas se consumen de forma perezosa y los resultados se entregan a
+    medida que terminan (sin orden garantizado), de modo que la memoria usada
+    depende de max_pending y no del tamaño de la entrada.
+
+    Args:
+        executor: ThreadPoolExecutor o ProcessPoolExecutor
+        fn: Función a ejecutar sobre cada tarea
+        tasks: Iterable de tareas (por ejemplo, lotes de registros)
+        max_pending: Máximo de tareas enviadas y aún no recogidas
+
+    Returns:
+        Iterador con el resultado de cada tarea
+    """
+    pending = set()
+
+    for task in tasks:
+        pending.add(executor.submit(fn, task))
+
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    for future in as_completed(pending):
+        yield future.result()
+
+
+def has_combiner(job: MapReduceInterface) -> bool:
+    """
+    Indica si el job sobrescribe combine_function (la implementación base no combina).
+    """
+    return type(job).combine_function is not MapReduceInterface.combine_function
+
+
+def uses_combiner(job: MapReduceInterface) -> bool:
+    """
+    Indica si la salida de map se pre-agrega con combine_function: no cuando
+    el job declara numeric_aggregation, porque el shuffle ya acumula un valor
+    por clave (y con "count" contaría una sola vez cada par ya combinado).
+    """
+    return has_combiner(job) and getattr(job, "numeric_aggregation", None) is None
+
+
+class MapSideCombiner:
+    """
+    Combinador en memoria para una tarea de map (in-mapper combining).
+
+    Acumula los pares emitidos por map_function agrupados por clave y, cada vez
+    que una clave junta flush_every valores, los compacta con combine_function.
+    Así la memoria de la tarea crece con las claves distintas y no con los registros.
+    """
+
+    def __init__(self, job: MapReduceInterface, flush_every: int = 64):
+        self.job = job
+        self.flush_every = flush_every
+        self.buffer = defaultdict(list)
+
+    def add_all(self, pairs: Iterable[Tuple[Any, Any]]):
+        for key, value in pairs:
+            values = self.buffer[key]
+            values.append(value)
+            if len(values) >= self.flush_every:
+                self.buffer[key] = [v for _, v in self.job.combine_function(key, values)]
+
+    def results(self) -> List[Tuple[Any, Any]]:
+        """
+        Devuelve los pares combinados de la tarea y vacía el buffer.
+        """
+        combined = []
+        for key, values in self.buffer.items():
+            combined.extend(self.job.combine_function(key, values))
+        self.buffer = defaultdict(list)
+        return combined
+
+
+def has_batch_map(job: MapReduceInterface) -> bool:
+    """
+    Indica si el job tiene modo por columnas (sobrescribe map_batch_function y define input_columns).
+    """
+    return (type(job).map_batch_function is not MapReduceInterface.map_batch_function
+            and bool(job.input_columns))
+
+
+def iter_record_blocks(records: Iterable[Tuple[Any, Any]],
+                       block_rows: int = DEFAULT_BLOCK_ROWS) -> Iterator[List[Tuple[Any, Any]]]:
+    """
+    Agrupa los registros en bloques para el modo por columnas (los valores
+    memoryview se copian a bytes, ver batched_records).
+    """
+    return batched_records(records, block_rows)
+
+
+def map_block(job: MapReduceInterface, block: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """
+    Mapea un bloque de registros con map_batch_function: el bloque se parsea
+    con un único csv.reader y se proyecta en columnas.
+    """
+    rows = parse_rows([value for _, value in block])
+    return job.map_batch_function(rows_to_columns(rows, job.input_columns, job.columns_as_arrays))
+
+
+def iter_batch_map(job: MapReduceInterface, records: Iterable[Tuple[Any, Any]],
+                   block_rows: int = DEFAULT_BLOCK_ROWS) -> Iterator[Tuple[int, List[Tuple[Any, Any]]]]:
+    """
+    Aplica map_batch_function por bloques (ver iter_record_blocks y map_block).
+
+    Returns:
+        Generador de (registros del bloque, pares intermedios del bloque)
+    """
+    for block in iter_record_blocks(records, block_rows):
+        yield len(block), map_block(job, block)
+
+
+def map_batch_records(job: MapReduceInterface, records: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """
+    Modo por columnas de map_records: mapea los registros por bloques y, si
+    el job usa combinador (ver uses_combiner), combina las salidas de los
+    bloques entre sí.
+    """
+    results = []
+    for _, pairs in iter_batch_map(job, records):
+        results.extend(pairs)
+    if not uses_combiner(job):
+        return results
+
+    combiner = MapSideCombiner(job)
+    combiner.add_all(results)
+    return combiner.results()
+
+
+def map_records(job: MapReduceInterface, records: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """
+    Aplica map_function a un lote de registros y, si el job usa combinador
+    (ver uses_combiner), pre-agrega la salida del lote antes del shuffle. Si el job
+    tiene modo por columnas, usa map_batch_function.
+
+    Args:
+        job: Job cuyas funciones se aplican
+        records: Pares (clave, valor) de entrada de una tarea de map
+
+    Returns:
+        Pares intermedios (combinados si corresponde)
+    """
+    if has_batch_map(job):
+        return map_batch_records(job, records)
+
+    if not uses_combiner(job):
+        results = []
+        for key, value in records:
+            results.extend(job.map_function(key, value))
+        return results
+
+    combiner = MapSideCombiner(job)
+    for key, value in records:
+        combiner.add_all(job.map_function(key, value))
+    return combiner.results()
+
+
+def iter_groups(grouped_data: Union[Dict[Any, List[Any]], Iterable[Tuple[Any, List[Any]]]]
+                ) -> Iterator[Tuple[Any, List[Any]]]:
+    """
+    Recorre la salida del shuffle como pares (clave, valores), tanto si es un
+    diccionario en memoria como un iterador producido por ExternalShuffle.
+    """
+    if isinstance(grouped_data, dict):
+        return iter(grouped_data.items())
+    return iter(grouped_data)
@@ -0,0 +1,133 @@
+from array import array
+from numbers import Number
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from map_reduce_interface import MapReduceInterface
+
+# Reducciones numéricas asociativas que puede declarar un job (numeric_aggregation)
+AGGREGATIONS = ("sum", "count", "min", "max")
+
+
+def get_aggregation(job: MapReduceInterface) -> Optional[str]:
+    """
+    Agregación numérica declarada por el job (None si no declara ninguna).
+    """
+    aggregation = getattr(job, "numeric_aggregation", None)
+    if aggregation is not None and aggregation not in AGGREGATIONS:
+        raise ValueError(f"Agregación numérica desconocida: {aggregation!r} (use una de {AGGREGATIONS})")
+    return aggregation
+
+
+class NumericAggregator:
+    """
+    Shuffle compacto para reducciones numéricas asociativas (sum, count, min, max).
+
+    En lugar de agrupar los valores de cada clave en una lista (un puntero
+    por par intermedio, más la lista), cada clave se interna como un entero
+    (su posición en keys) y su valor se acumula en un array de enteros de 64
+    bits: la memoria crece con las claves distintas y no con los registros.
+
+    Una clave cuyo valor no cabe en el array (un float o un entero de más de
+    64 bits) pasa a acumularse como número de Python en overflow, en el orden
+    de llegada; las demás claves siguen en el array. Así cada resultado es el
+    mismo que daría sum(), min() o max() sobre los valores de la clave.
+
+    Admite extend() y len() como los demás contenedores intermedios (ver
+    external_shuffle.new_intermediate_buffer); len() es el número de pares
+    recibidos y num_keys el de claves distintas.
+    """
+
+    def __init__(self, aggregation: str):
+        """
+        Args:
+            aggregation: "sum", "count" (cuenta pares, ignora el valor), "min" o "max"
+        """
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Agregación numérica desconocida: {aggregation!r} (use una de {AGGREGATIONS})")
+        self.aggregation = aggregation
+        self.key_ids: Dict[Any, int] = {}
+        self.keys: List[Any] = []
+        self.values = array("q")
+        # Posición de la clave -> valor acumulado, para las que no caben en values
+        self.overflow: Dict[int, Any] = {}
+        self.num_pairs = 0
+
+    def __len__(self) -> int:
+        return self.num_pairs
+
+    @property
+    def num_keys(self) -> int:
+        return len(self.keys)
+
+    def extend(self, pairs: Iterable[Tuple[Any, Any]]):
+        """
+        Acumula pares (clave, valor) intermedios.
+        """
+        aggregation = self.aggregation
+        key_ids = self.key_ids
+        keys = self.keys
+        values = self.values
+        overflow = self.overflow
+        num_pairs = 0
+        try:
+            for key, value in pairs:
+                num_pairs += 1
+                if aggregation == "count":
+                    value = 1
+                index = key_ids.get(key)
+                if index is None:
+                    index = len(keys)
+                    key_ids[key] = index
+                    keys.append(key)
+                    try:
+                        values.append(value)
+                    except (TypeError, OverflowError):
+                        values.append(0)
+                        overflow[index] = _check_number(value, aggregation)
+                    continue
+                if overflow and index in overflow:
+                    overflow[index] = _combine(aggregation, overflow[index], _check_number(value, aggregation))
+                    continue
+                try:
+                    if aggregation == "sum" or aggregation == "count":
+                        values[index] += value
+                    elif aggregation == "min":
+                        if value < values[index]:
+                            values[index] = value
+                    elif value > values[index]:
+                        values[index] = value
+                except (TypeError, OverflowError):
+                    # Solo esta clave deja el array: se sigue acumulando con números de Python
+                    overflow[index] = _combine(aggregation, values[index], _check_number(value, aggregation))
+        finally:
+            self.num_pairs += num_pairs
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        """
+        Pares (clave, valor agregado), ordenados por clave como el shuffle en memoria.
+        """
+        values = self.values
+        overflow = self.overflow
+        for key, index in sorted(self.key_ids.items()):
+            yield key, overflow[index] if index in overflow else values[index]
+
+    def results(self) -> List[Tuple[Any, Any]]:
+        """
+        Resultados finales del job: reemplazan a reduce_function.
+        """
+        return list(self.items())
+
+
+def _check_number(value: Any, aggregation: str) -> Any:
+    if not isinstance(value, Number):
+        raise TypeError(f"Valor no agregable con {aggregation!r}: {value!r}")
+    return value
+
+
+def _combine(aggregation: str, current: Any, value: Any) -> Any:
+    # Misma regla que sum(), min() y max() al recorrer los valores en orden
+    if aggregation == "sum" or aggregation == "count":
+        return current + value
+    if aggregation == "min":
+        return value if value < current else current
+    return value if value > current else current
@@ -0,0 +1,98 @@
+import zlib
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from numbers import Number
+from typing import Any, Dict, List
+
+
+class Partitioner(ABC):
+    """
+    Decide a qué reducer va cada clave intermedia.
+    Todas las apariciones de una clave deben caer siempre en la misma partición.
+    """
+
+    @abstractmethod
+    def get_partition(self, key: Any, num_partitions: int) -> int:
+        """
+        Calcula la partición de una clave.
+
+        Args:
+            key: Clave intermedia
+            num_partitions: Número de reducers del job
+
+        Returns:
+            Índice de partición entre 0 y num_partitions - 1
+        """
+        pass
+
+
+def describe_partitioner(partitioner: Partitioner) -> Dict[str, str]:
+    """
+    Descripción del partitioner (clase y parámetros) para los metadatos de un
+    job: dos partitioners con la misma descripción reparten las claves igual.
+    Los parámetros se guardan con repr para que la descripción sobreviva
+    intacta a JSON.
+    """
+    cls = type(partitioner)
+    params = sorted(getattr(partitioner, "__dict__", {}).items())
+    return {"class": f"{cls.__module__}.{cls.__qualname__}", "params": repr(params)}
+
+
+class HashPartitioner(Partitioner):
+    """
+    Partitioner por defecto: reparte las claves según un hash estable.
+
+    No usa hash() de Python porque para cadenas cambia en cada proceso
+    (PYTHONHASHSEED); con crc32 la misma clave cae en la misma partición
+    en cualquier proceso o ejecución.
+
+    El hash se calcula sobre repr de la clave normalizada (ver
+    _normalize_key), porque claves iguales pueden tener repr distinto:
+    1, 1.0 y True son la misma clave para el shuffle y deben ir al mismo
+    reducer.
+    """
+
+    def get_partition(self, key: Any, num_partitions: int) -> int:
+        if type(key) is not str and type(key) is not int:
+            key = _normalize_key(key)
+        return zlib.crc32(repr(key).encode("utf-8")) % num_partitions
+
+
+def _normalize_key(key: Any) -> Any:
+    # Un representante común para las claves iguales entre sí: los números
+    # enteros de cualquier tipo (True, 1.0, Fraction(1), Decimal("1")) pasan
+    # a int y los demás a float; las tuplas (y namedtuples) se normalizan
+    # elemento a elemento
+    if isinstance(key, tuple):
+        return tuple(_normalize_key(item) for item in key)
+    if isinstance(key, Number) and type(key) is not int:
+        try:
+            integral = int(key)
+        except (TypeError, ValueError, OverflowError):
+            return key  # complejos, infinitos y NaN
+        if integral == key:
+            return integral
+        try:
+            return float(key)
+        except (TypeError, ValueError, OverflowError):
+            return key
+    return key
+
+
+class RangePartitioner(Partitioner):
+    """
+    Reparte las claves por rangos ordenados: la partición i recibe las claves
+    entre boundaries[i - 1] y boundaries[i]. Concatenar las salidas de los
+    reducers en orden produce un resultado ordenado globalmente.
+    """
+
+    def __init__(self, boundaries: List[Any]):
+        """
+        Args:
+            boundaries: Límites superiores (exclusivos) ordenados; con n límites
+                se usan n + 1 particiones
+        """
+        self.boundaries = sorted(boundaries)
+
+    def get_partition(self, key: Any, num_partitions: int) -> int:
+        return min(bisect_right(self.boundaries, key), num_partitions - 1)
@@ -0,0 +1,460 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from external_shuffle import ExternalShuffle, read_blocks, write_blocks
+from fault_tolerance import (Quarantine, RetryPolicy, map_records_skipping, quarantine_entry,
+                             reduce_groups_skipping, run_tasks)
+from input_formats import DEFAULT_SPLIT_SIZE, CSVInputFormat, InputFormat, InputSplit, TextInputFormat
+from job_logging import INFO, ProgressCounter, get_logger
+from job_metrics import JobMetrics, RecordCounter
+from map_reduce_interface import MapReduceInterface
+from map_reduce_utils import batched_records, map_records
+from numeric_aggregation import NumericAggregator, get_aggregation
+from partitioners import HashPartitioner, Partitioner
+from record_formats import get_format
+
+
+# Job asignado a cada proceso trabajador. Se envía una sola vez por proceso
+# (en el initializer) en lugar de serializarlo con cada tarea.
+_worker_job = None
+# Configuración del shuffle de cada proceso: (directorio de trabajo, reducers, partitioner)
+_worker_shuffle = None
+
+
+def _init_worker(job: MapReduceInterface, shuffle: Tuple[str, int, Partitioner]):
+    global _worker_job, _worker_shuffle
+    _worker_job = job
+    _worker_shuffle = shuffle
+
+
+def _write_map_output(task_id: int, attempt: int, pairs: List[Tuple[Any, Any]]) -> Tuple[int, List[Optional[str]]]:
+    """
+    Reparte la salida de una tarea de map en un archivo por partición, dentro
+    del proceso trabajador: los pares intermedios nunca pasan por el proceso
+    principal. Cada intento de la tarea escribe sus propios archivos, así un
+    reintento o un intento especulativo no pisa la salida de otro.
+
+    Returns:
+        Número de pares y ruta del archivo de cada partición (None si quedó vacía)
+    """
+    work_dir, num_reducers, partitioner = _worker_shuffle
+    buckets = [[] for _ in range(num_reducers)]
+    get_partition = partitioner.get_partition
+    for key, value in pairs:
+        buckets[get_partition(key, num_reducers)].append((key, value))
+
+    paths = []
+    for partition_num, bucket in enumerate(buckets):
+        if not bucket:
+            paths.append(None)
+            continue
+        path = os.path.join(work_dir, f"map-{task_id:05d}-{attempt}-p{partition_num:05d}.bin")
+        write_blocks(path, bucket)
+        paths.append(path)
+    return len(pairs), paths
+
+
+def _run_map_task(task_id: int, records: Iterable[Tuple[Any, Any]], attempt: int,
+                  skip: bool) -> Tuple[int, int, List[Optional[str]], List[Dict[str, Any]], float]:
+    """
+    Mapea los registros de una tarea y escribe su salida particionada.
+    Con skip=True (último intento), mapea registro a registro y aparta los
+    registros que fallan en lugar de fallar la tarea.
+
+    Returns:
+        Registros leídos, pares escritos, archivo de cada partición,
+        registros en cuarentena y duración de la tarea en segundos
+    """
+    start = time.perf_counter()
+    records = RecordCounter(records)
+    quarantined = []
+    if skip:
+        pairs = map_records_skipping(_worker_job, records, lambda key, value, exc: quarantined.append(
+            quarantine_entry("map", task_id, key, value, exc)))
+    else:
+        pairs = map_records(_worker_job, records)
+    num_pairs, paths = _write_map_output(task_id, attempt, pairs)
+    return records.count, num_pairs, paths, quarantined, time.perf_counter() - start
+
+
+def _map_batch(task_id: int, batch: List[Tuple[Any, Any]], attempt: int, skip: bool = False
+               ) -> Tuple[int, int, List[Optional[str]], List[Dict[str, Any]], float]:
+    """
+    Aplica map_function del job a un lote completo de registros dentro del proceso
+    trabajador. Si el job usa combinador (ver uses_combiner), el lote se pre-agrega
+    antes de escribirse, reduciendo lo que se escribe en disco para el shuffle.
+    """
+    return _run_map_task(task_id, batch, attempt, skip)
+
+
+def _map_split(task_id: int, task: Tuple[InputFormat, InputSplit], attempt: int, skip: bool = False
+               ) -> Tuple[int, int, List[Optional[str]], List[Dict[str, Any]], float]:
+    """
+    Lee un input split directamente del archivo (solo su rango de bytes) y le
+    aplica map_function dentro del proceso trabajador. Al proceso solo viaja
+    la descripción del split, nunca los registros.
+    """
+    input_format, split = task
+    return _run_map_task(task_id, input_format.read_split(split), attempt, skip)
+
+
+def _reduce_partition(partition_num: int, task: Tuple[List[str], str, str, int], attempt: int,
+                      skip: bool = False) -> Tuple[str, int, int, int, int, List[Dict[str, Any]], float]:
+    """
+    Tarea de reduce de una partición completa: lee en streaming los archivos
+    de esa partición escritos por todas las tareas de map, agrupa por clave
+    (en memoria u ordenando por corridas en disco), aplica reduce_function y
+    escribe su propio archivo de salida.
+
+    Cada intento escribe en un archivo propio del directorio de trabajo; el
+    proceso principal mueve a output_path el del intento que termina primero.
+    Con skip=True, los grupos que fallan se apartan en cuarentena.
+
+    Returns:
+        Archivo escrito por el intento, pares leídos, grupos reducidos,
+        registros escritos, corridas volcadas a disco, grupos en cuarentena
+        y duración de la tarea en segundos
+    """
+    start = time.perf_counter()
+    input_paths, output_path, shuffle_mode, max_records_in_memory = task
+    pairs = (pair for path in input_paths for pair in read_blocks(path))
+
+    spills = 0
+    aggregation = get_aggregation(_worker_job)
+    if aggregation is not None:
+        # Un valor acumulado por clave en lugar de la lista de valores de cada clave
+        aggregator = NumericAggregator(aggregation)
+        aggregator.extend(pairs)
+        num_pairs = len(aggregator)
+        groups = aggregator.items()
+    elif shuffle_mode == "external":
+        shuffle = ExternalShuffle(max_records_in_memory, spill_dir=_worker_shuffle[0])
+        shuffle.extend(pairs)
+        num_pairs = len(shuffle)
+        spills = shuffle.spill_count
+        groups = shuffle.groups()
+    else:
+        grouped = defaultdict(list)
+        for key, value in pairs:
+            grouped[key].append(value)
+        num_pairs = sum(map(len, grouped.values()))
+        groups = iter(sorted(grouped.items()))
+
+    groups = RecordCounter(groups)
+    quarantined = []
+    if aggregation is not None:
+        # Los pares (clave, valor agregado) reemplazan a reduce_function
+        reduced = groups
+    elif skip:
+        reduced = reduce_groups_skipping(_worker_job, groups, lambda key, values, exc: quarantined.append(
+            quarantine_entry("reduce", partition_num, key, values, exc)))
+    else:
+        reduce_function = _worker_job.reduce_function
+        reduced = (pair for key, values in groups for pair in reduce_function(key, values))
+
+    # Misma extensión que la salida final: define el formato de los registros
+    attempt_path = os.path.join(_worker_shuffle[0], f"reduce-{partition_num:05d}-{attempt}"
+                                                    f"{os.path.splitext(output_path)[1]}")
+    with open(attempt_path, "wb") as f:
+        writer = get_format(output_path).writer(f)
+        writer.write_many(reduced)
+        writer.close()
+
+    return (attempt_path, num_pairs, groups.count, writer.count, spills, quarantined,
+            time.perf_counter() - start)
+
+
+class ProcessPoolMapReduce(MapReduceInterface):
+    """
+    Motor MapReduce que ejecuta las funciones map/reduce de cualquier job
+    (subclase de MapReduceInterface) en varios procesos.
+
+    A diferencia de ThreadedWordCountMapReduce, el trabajo de CPU no queda
+    limitado por el GIL. Los registros se envían en lotes para que el costo
+    de serializar cada tarea se reparta entre muchos registros.
+
+    El shuffle sigue el esquema de Hadoop: cada tarea de map escribe su salida
+    repartida en un archivo por partición, y cada reducer es una tarea del
+    pool que procesa una partición completa y escribe su propio archivo de
+    salida. El proceso principal solo coordina rutas de archivos.
+    """
+
+    def __init__(self, job: MapReduceInterface, num_workers: int = None, batch_size: int = 10000,
+                 verbosity: int = INFO, shuffle_mode: str = "memory", max_records_in_memory: int = 1000000,
+                 num_reducers: int = None, partitioner: Partitioner = None, output_dir: str = None,
+                 retry_policy: RetryPolicy = None):
+        """
+        Inicializa el motor con un pool de procesos.
+
+        Args:
+            job: Instancia de MapReduceInterface cuyas funciones se ejecutarán
+            num_workers: Número de procesos trabajadores (por defecto, CPUs disponibles)
+            batch_size: Registros enviados por tarea de map (en execute)
+            verbosity: 0 (solo errores), 1 (resumen y progreso) o 2 (detalle)
+            shuffle_mode: Cómo agrupa cada reducer su partición: "memory" o
+                "external" (corridas ordenadas en disco)
+            max_records_in_memory: Pares en memoria por reducer antes de volcar una corrida ("external")
+            num_reducers: Número de particiones y tareas de reduce (por defecto, num_workers)
+            partitioner: Estrategia de partición de claves (por defecto HashPartitioner)
+            output_dir: Directorio donde se conservan las salidas de los reducers
+                (part-r-NNNNN.bin). Si es None, se usan archivos temporales
+            retry_policy: Reintentos de tareas, cuarentena de registros y
+                ejecución especulativa (por defecto RetryPolicy())
+        """
+        if shuffle_mode not in ("memory", "external"):
+            raise ValueError(f"Modo de shuffle desconocido: {shuffle_mode!r} (use 'memory' o 'external')")
+        self.job = job
+        self.num_workers = num_workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.shuffle_mode = shuffle_mode
+        self.max_records_in_memory = max_records_in_memory
+        self.num_reducers = num_reducers or self.num_workers
+        self.partitioner = partitioner or HashPartitioner()
+        self.output_dir = output_dir
+        self.reducer_outputs = []
+        self.metrics = JobMetrics()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+        self.logger = get_logger(type(self).__name__, verbosity)
+        self.logger.info(f"Usando {self.num_workers} procesos (CPUs detectadas: {os.cpu_count()})")
+
+    def map_function(self, key: Any, value: Any) -> List[Tuple[Any, Any]]:
+        return self.job.map_function(key, value)
+
+    def reduce_function(self, key: Any, values: List[Any]) -> List[Tuple[Any, Any]]:
+        return self.job.reduce_function(key, values)
+
+    def combine_function(self, key: Any, values: List[Any]) -> List[Tuple[Any, Any]]:
+        return self.job.combine_function(key, values)
+
+    def _max_pending(self) -> int:
+        # Dos tareas por proceso mantienen a los trabajadores ocupados sin acumular lotes en memoria
+        return self.num_workers * 2
+
+    def _run_tasks(self, executor: ProcessPoolExecutor, phase: str, fn, tasks: Iterable[Tuple[int, Any]]
+                   ) -> Iterator[Tuple[int, Any]]:
+        """
+        Ejecuta las tareas de una fase en el pool con la política de
+        reintentos; el último intento de una tarea usa fn(..., skip=True).
+        Los registros en cuarentena que devuelven las tareas se acumulan en
+        self.quarantine.
+
+        Returns:
+            Generador de (id de la tarea, resultado), en orden de término
+        """
+        for task_id, result, _ in run_tasks(executor, fn, tasks, self._max_pending(), self.num_workers,
+                                            self.retry_policy, partial(fn, skip=True), phase, self.logger,
+                                            self.metrics):
+            quarantined = result[-2]
+            if quarantined:
+                self.metrics.incr(phase, "quarantined_records", len(quarantined))
+                self.logger.warning(f"Tarea {phase.upper()} {task_id}: {len(quarantined)} registros en cuarentena")
+                self.quarantine.extend(quarantined)
+            yield task_id, result
+
+    def _collect_map_outputs(self, map_results: Iterable[Tuple[int, Tuple[int, int, List[Optional[str]],
+                                                                           List[Dict[str, Any]], float]]]
+                             ) -> Tuple[List[List[str]], int]:
+        """
+        Arma, a partir de lo que devuelve cada tarea de map, la lista de
+        archivos de entrada de cada partición (la fase SHUFFLE), y registra
+        las métricas de cada tarea.
+
+        Returns:
+            Archivos por partición y total de pares intermedios
+        """
+        partition_inputs = [[] for _ in range(self.num_reducers)]
+        total_pairs = 0
+        for task_id, (num_records, num_pairs, paths, _, seconds) in map_results:
+            self.metrics.add_task("map", task_id, seconds, num_records)
+            self.metrics.incr("map", "input_records", num_records)
+            self.metrics.incr("map", "tasks")
+            total_pairs += num_pairs
+            for partition_num, path in enumerate(paths):
+                if path is not None:
+                    partition_inputs[partition_num].append(path)
+        self.metrics.incr("map", "output_records", total_pairs)
+        return partition_inputs, total_pairs
+
+    def _parallel_map_phase(self, executor: ProcessPoolExecutor,
+                            input_data: Iterable[Tuple[Any, Any]]) -> List[List[str]]:
+        start_time = time.time()
+        self.logger.info("Iniciando fase MAP con procesos...")
+
+        progress = ProgressCounter(self.logger, "MAP")
+        tasks = enumerate(progress.track_batches(batched_records(input_data, self.batch_size)))
+        partition_inputs, total_pairs = self._collect_map_outputs(
+            self._run_tasks(executor, "map", _map_batch, tasks))
+
+        end_time = time.time()
+        self.logger.info(f"Fase MAP completada en {end_time - start_time:.2f}s. {progress.count} registros, {total_pairs} pares intermedios generados.\n")
+        return partition_inputs
+
+    def _parallel_map_splits_phase(self, executor: ProcessPoolExecutor, input_format: InputFormat,
+                                   splits: List[InputSplit]) -> List[List[str]]:
+        start_time = time.time()
+        self.logger.info(f"Iniciando fase MAP con procesos sobre {len(splits)} splits...")
+
+        tasks = ((task_id, (input_format, split)) for task_id, split in enumerate(splits))
+        partition_inputs, total_pairs = self._collect_map_outputs(
+            self._run_tasks(executor, "map", _map_split, tasks))
+
+        end_time = time.time()
+        self.logger.info(f"Fase MAP completada en {end_time - start_time:.2f}s. {total_pairs} pares intermedios generados.\n")
+        return partition_inputs
+
+    def _parallel_reduce_phase(self, executor: ProcessPoolExecutor, partition_inputs: List[List[str]],
+                               output_dir: str) -> List[str]:
+        start_time = time.time()
+        self.logger.info(f"Iniciando fase REDUCE con procesos ({self.num_reducers} particiones)...")
+
+        output_paths = [os.path.join(output_dir, f"part-r-{partition_num:05d}.bin")
+                        for partition_num in range(self.num_reducers)]
+        # Una tarea por partición: cada reducer trabaja solo y escribe su propia salida
+        tasks = [(partition_num, (input_paths, output_paths[partition_num],
+                                  self.shuffle_mode, self.max_records_in_memory))
+                 for partition_num, input_paths in enumerate(partition_inputs)]
+
+        total_groups = 0
+        total_records = 0
+        for partition_num, result in self._run_tasks(executor, "reduce", _reduce_partition, tasks):
+            attempt_path, num_pairs, num_groups, num_records, spills, _, seconds = result
+            # Solo la salida del intento ganador pasa a ser la del reducer
+            shutil.move(attempt_path, output_paths[partition_num])
+            self.logger.debug(f"   REDUCER {partition_num}: {num_groups} grupos -> {output_paths[partition_num]}")
+            self.metrics.add_task("reduce", partition_num, seconds, num_groups)
+            self.metrics.incr("shuffle", "input_records", num_pairs)
+            self.metrics.incr("shuffle", "spills", spills)
+            total_groups += num_groups
+            total_records += num_records
+
+        # Cada reducer agrupa su propia partición: los grupos del shuffle son los de REDUCE
+        self.metrics.incr("shuffle", "groups", total_groups)
+        self.metrics.incr("reduce", "input_groups", total_groups)
+        self.metrics.incr("reduce", "output_records", total_records)
+        self.metrics.incr("reduce", "tasks", len(tasks))
+
+        end_time = time.time()
+        self.logger.info(f"Fase REDUCE completada en {end_time - start_time:.2f}s. {total_groups} grupos, {total_records} resultados finales.\n")
+        return output_paths
+
+    def read_output(self) -> Iterator[Tuple[Any, Any]]:
+        """
+        Recorre de forma perezosa las salidas de los reducers de la última ejecución
+        (solo disponibles si se indicó output_dir).
+        """
+        for path in self.reducer_outputs:
+            with open(path, "rb") as f:
+                yield from get_format(path).read_records(f)
+
+    def execute(self, input_data: Iterable[Tuple[Any, Any]], return_metrics: bool = False):
+        """
+        Ejecuta el pipeline completo de MapReduce usando procesos.
+
+        Args:
+            input_data: Datos de entrada como pares (clave, valor)
+            return_metrics: Si es True, devuelve también las métricas del job
+
+        Returns:
+            Resultados finales como lista de pares (clave, valor), o la tupla
+            (resultados, métricas) con return_metrics (ver JobMetrics.to_dict)
+        """
+        return self._run(lambda executor: self._parallel_map_phase(executor, input_data), return_metrics)
+
+    def execute_file(self, file_path: str, input_format: InputFormat = None,
+                     split_size: int = DEFAULT_SPLIT_SIZE, return_metrics: bool = False):
+        """
+        Ejecuta el job sobre un archivo sin que el proceso principal lea los datos:
+        el archivo se divide en splits por rangos de bytes y cada proceso
+        trabajador lee su propio rango (con mmap). El número de tareas de map
+        crece con el tamaño del archivo.
+
+        Args:
+            file_path: Ruta del archivo de entrada
+            input_format: Cómo dividir y leer el archivo (por defecto TextInputFormat;
+                CSVInputFormat para CSV con saltos de línea entre comillas)
+            split_size: Tamaño objetivo de cada split en bytes
+            return_metrics: Si es True, devuelve también las métricas del job
+
+        Returns:
+            Resultados finales como lista de pares (clave, valor), o la tupla
+            (resultados, métricas) con return_metrics
+        """
+        input_format = input_format or TextInputFormat()
+        splits = input_format.get_splits(file_path, split_size)
+        return self._run(lambda executor: self._parallel_map_splits_phase(executor, input_format, splits),
+                         return_metrics)
+
+    def _run(self, map_phase, return_metrics: bool = False):
+        total_start = time.time()
+        self.logger.info("Iniciando proceso MapReduce con procesos")
+        self.logger.info("=" * 50)
+        self.metrics = JobMetrics()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+
+        # Salidas de map por partición (y corridas del shuffle externo); se borran al terminar
+        work_dir = tempfile.mkdtemp(prefix="mapreduce_")
+        output_dir = self.output_dir or work_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        executor = ProcessPoolExecutor(max_workers=self.num_workers,
+                                       initializer=_init_worker,
+                                       initargs=(self.job, (work_dir, self.num_reducers, self.partitioner)))
+        try:
+            # Fase 1: Map en paralelo (con el particionado del shuffle en cada tarea)
+            with self.metrics.phase("map"):
+                partition_inputs = map_phase(executor)
+
+            # Fase 2: Shuffle: cada reducer recibe los archivos de su partición
+            num_files = sum(map(len, partition_inputs))
+            self.metrics.incr("shuffle", "files", num_files)
+            self.metrics.incr("shuffle", "partitions", self.num_reducers)
+            self.logger.info(f"SHUFFLE: {num_files} archivos en {self.num_reducers} particiones\n")
+
+            # Fase 3: Reduce en paralelo, una tarea por partición (incluye el agrupamiento)
+            with self.metrics.phase("reduce"):
+                self.reducer_outputs = self._parallel_reduce_phase(executor, partition_inputs, output_dir)
+
+            final_results = list(self.read_output())
+        finally:
+            # Los intentos especulativos que perdieron no se esperan
+            executor.shutdown(wait=False, cancel_futures=True)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if self.output_dir is None:
+                self.reducer_outputs = []
+
+        total_end = time.time()
+        self.metrics.log_summary(self.logger)
+        if self.quarantine.entries:
+            self.logger.warning(f"{len(self.quarantine)} registros en cuarentena (ver self.quarantine.entries)")
+        self.logger.info(f"Proceso MapReduce con procesos completado en {total_end - total_start:.2f}s!")
+        self.logger.info("=" * 50)
+
+        if return_metrics:
+            return final_results, self.metrics.to_dict()
+        return final_results
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    from threaded_word_count_csv import ThreadedWordCountMapReduce
+
+    print("EJEMPLO: Contador de países con MapReduce usando procesos")
+    print("=" * 60)
+
+    # El job define map/reduce; el motor decide cómo ejecutarlos
+    engine = ProcessPoolMapReduce(ThreadedWordCountMapReduce(num_threads=1))
+
+    # Cada proceso lee y parsea su propio rango del CSV
+    results = engine.execute_file("data/customers-2000000.csv", CSVInputFormat())
+
+    print("\nRESULTADOS FINALES:")
+    print("-" * 30)
+    for word, count in sorted(results, key=lambda x: x[1], reverse=True):
+        print(f"{word}: {count}")
@@ -0,0 +1,156 @@
+import json
+import pickle
+import struct
+from abc import ABC, abstractmethod
+from pathlib import PurePath
+from typing import Any, BinaryIO, Dict, IO, Iterable, Iterator, Tuple
+
+
+class RecordWriter(ABC):
+    """
+    Escribe registros (clave, valor) uno a uno sobre un archivo abierto.
+    """
+
+    def __init__(self, f: IO):
+        self.f = f
+        self.count = 0
+
+    @abstractmethod
+    def write(self, key: Any, value: Any):
+        pass
+
+    def write_many(self, records: Iterable[Tuple[Any, Any]]):
+        for key, value in records:
+            self.write(key, value)
+
+    def close(self):
+        """
+        Escribe el cierre del formato (si lo tiene). No cierra el archivo.
+        """
+        pass
+
+
+class RecordFormat(ABC):
+    """
+    Formato de serialización de los archivos de HDFSSimulator.
+    """
+
+    # True si el archivo se abre en modo binario ("rb"/"wb")
+    binary = True
+
+    @abstractmethod
+    def writer(self, f: IO) -> RecordWriter:
+        pass
+
+    @abstractmethod
+    def read_records(self, f: IO) -> Iterator[Tuple[Any, Any]]:
+        pass
+
+
+class _JSONRecordWriter(RecordWriter):
+
+    def __init__(self, f: IO):
+        super().__init__(f)
+        f.write("[")
+
+    def write(self, key: Any, value: Any):
+        separator = "\n  " if self.count == 0 else ",\n  "
+        self.f.write(separator + json.dumps({"key": key, "value": value}, ensure_ascii=False))
+        self.count += 1
+
+    def close(self):
+        self.f.write("\n]\n" if self.count else "]\n")
+
+
+class JSONRecordFormat(RecordFormat):
+    """
+    Arreglo JSON de objetos {"key": ..., "value": ...}, legible por personas.
+    Pensado para la salida final; para leerlo hay que parsear el archivo completo.
+    """
+
+    binary = False
+
+    def writer(self, f: IO) -> RecordWriter:
+        return _JSONRecordWriter(f)
+
+    def read_records(self, f: IO) -> Iterator[Tuple[Any, Any]]:
+        for item in json.load(f):
+            yield item["key"], item["value"]
+
+
+_MAGIC = b"MRB1"
+_LENGTH = struct.Struct("<I")
+
+
+class _BinaryRecordWriter(RecordWriter):
+
+    def __init__(self, f: BinaryIO):
+        super().__init__(f)
+        f.write(_MAGIC)
+
+    def write(self, key: Any, value: Any):
+        payload = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        self.f.write(_LENGTH.pack(len(payload)) + payload)
+        self.count += 1
+
+
+class BinaryRecordFormat(RecordFormat):
+    """
+    Registros con prefijo de longitud: 4 bytes (little endian) con el tamaño
+    y luego la tupla (clave, valor) serializada con pickle.
+
+    Es mucho más compacto y rápido que el JSON indentado y se puede leer
+    registro a registro. Al usar pickle, solo debe leerse desde archivos
+    generados por el propio simulador.
+    """
+
+    binary = True
+
+    def writer(self, f: BinaryIO) -> RecordWriter:
+        return _BinaryRecordWriter(f)
+
+    def read_records(self, f: BinaryIO) -> Iterator[Tuple[Any, Any]]:
+        magic = f.read(len(_MAGIC))
+        if magic != _MAGIC:
+            raise ValueError("El archivo no tiene el formato binario de registros esperado")
+
+        while True:
+            header = f.read(_LENGTH.size)
+            if not header:
+                return
+            (length,) = _LENGTH.unpack(header)
+            yield pickle.loads(f.read(length))
+
+
+# Formatos registrados por nombre y por extensión de archivo
+RECORD_FORMATS: Dict[str, RecordFormat] = {
+    "json": JSONRecordFormat(),
+    "binary": BinaryRecordFormat(),
+}
+EXTENSION_FORMATS: Dict[str, str] = {
+    ".json": "json",
+    ".bin": "binary",
+}
+
+
+def register_format(name: str, record_format: RecordFormat, extension: str = None):
+    """
+    Registra un formato adicional (por ejemplo, msgpack) y opcionalmente la
+    extensión de archivo que lo selecciona automáticamente.
+    """
+    RECORD_FORMATS[name] = record_format
+    if extension:
+        EXTENSION_FORMATS[extension] = name
+
+
+def get_format(file_path: str, format_name: str = None) -> RecordFormat:
+    """
+    Elige el formato de un archivo: el indicado explícitamente o, si no,
+    el que corresponde a su extensión (binario para extensiones desconocidas).
+    """
+    if format_name is None:
+        format_name = EXTENSION_FORMATS.get(PurePath(file_path).suffix, "binary")
+    try:
+        return RECORD_FORMATS[format_name]
+    except KeyError:
+        raise ValueError(f"Formato de registros desconocido: {format_name!r}") from None
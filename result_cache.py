@@ -0,0 +1,193 @@
+import hashlib
+import inspect
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from hdfs_simulator import HDFSSimulator
+from job_logging import INFO, get_logger
+
+# Índice de la caché dentro del HDFS simulado (fuera de los directorios de los jobs)
+INDEX_PATH = "jobs/_result_cache.json"
+
+# Bytes leídos por iteración al calcular el hash de un bloque
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def job_source_hash(job: Any) -> str:
+    """
+    Hash de la definición del job: el código fuente de su clase y de las
+    clases de las que hereda (incluido el motor). Cualquier cambio en
+    map_function, reduce_function o en el motor invalida los resultados.
+    Si el código fuente no está disponible (clases definidas en un intérprete
+    interactivo), se usa el bytecode de sus métodos.
+    """
+    digest = hashlib.sha256()
+    for cls in type(job).__mro__:
+        if cls is object or cls.__module__ == "abc":
+            continue
+        digest.update(cls.__qualname__.encode())
+        try:
+            digest.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            for name, member in sorted(vars(cls).items()):
+                code = getattr(member, "__code__", None)
+                if code is not None:
+                    digest.update(name.encode() + code.co_code + repr(code.co_consts).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Caché de resultados de jobs guardada en el HDFS simulado.
+
+    La clave de cada resultado combina:
+        - la definición del job (job_source_hash) y su configuración
+        - el tamaño del archivo de entrada y el hash del contenido de cada bloque
+
+    Recalcular el hash de un bloque exige leerlo, así que cada hash se
+    recuerda junto con lo que identifica al bloque sin leerlo: su block_id
+    (los bloques no cambian una vez escritos) o, sin bloques, la ruta, el
+    tamaño y la fecha de modificación del archivo. Una entrada copiada de
+    nuevo con el mismo contenido produce la misma clave.
+
+    Cada entrada apunta al directorio jobs/<job_id>/ que contiene las salidas
+    de los reducers. Al superar max_entries o max_bytes se eliminan los
+    directorios de los jobs usados hace más tiempo (LRU).
+    """
+
+    def __init__(self, hdfs: HDFSSimulator, max_entries: int = 20, max_bytes: int = None,
+                 verbosity: int = INFO):
+        """
+        Args:
+            hdfs: Simulador HDFS donde viven los jobs y el índice de la caché
+            max_entries: Máximo de resultados guardados
+            max_bytes: Máximo de bytes entre todos los directorios de jobs en caché
+                (None = sin límite de tamaño)
+            verbosity: 0 (solo errores), 1 (aciertos y desalojos) o 2 (detalle)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries debe ser mayor que 0")
+        self.hdfs = hdfs
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = get_logger("ResultCache", verbosity)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.hdfs.exists(INDEX_PATH):
+            return {}
+        return dict(self.hdfs.read_file(INDEX_PATH))
+
+    def _save(self, index: Dict[str, Dict[str, Any]]):
+        self.hdfs.write_file(INDEX_PATH, index.items(), "CACHE_INDEX")
+
+    def _block_hash(self, file_path: str, block: Dict[str, Any]) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        remaining = block["length"]
+        with self.hdfs.open_stream(file_path) as f:
+            f.seek(block["offset"])
+            while remaining > 0:
+                chunk = f.read(min(_HASH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest.hexdigest()
+
+    def input_fingerprint(self, file_path: str, index: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Huella de un archivo de HDFS: tamaño y hash del contenido de cada bloque.
+
+        Returns:
+            Diccionario con size y blocks, una lista de [identidad del bloque, hash]
+        """
+        index = self._load() if index is None else index
+        known = {identity: digest for entry in index.values() for identity, digest in entry["blocks"]}
+
+        size = self.hdfs.get_file_size(file_path)
+        mtime = self.hdfs.get_modification_time(file_path)
+        blocks = []
+        for block in self.hdfs.get_block_locations(file_path):
+            identity = block["block_id"] or f"{file_path}:{size}:{mtime}:{block['offset']}"
+            digest = known.get(identity)
+            if digest is None:
+                digest = self._block_hash(file_path, block)
+            blocks.append([identity, digest])
+        return {"size": size, "blocks": blocks}
+
+    def make_key(self, job: Any, config: Dict[str, Any], fingerprint: Dict[str, Any]) -> str:
+        """
+        Clave de un resultado: definición y configuración del job más el
+        contenido de la entrada (no las identidades de los bloques).
+        """
+        payload = {
+            "job": job_source_hash(job),
+            "config": config,
+            "size": fingerprint["size"],
+            "blocks": [digest for _, digest in fingerprint["blocks"]],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=repr).encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca un resultado y, si existe, lo marca como usado recientemente.
+
+        Returns:
+            Metadatos del job que produjo el resultado, o None si no está en caché
+        """
+        index = self._load()
+        entry = index.get(key)
+        if entry is None:
+            return None
+
+        metadata_path = f"jobs/{entry['job_id']}/job_metadata.json"
+        metadata = dict(self.hdfs.read_file(metadata_path)) if self.hdfs.exists(metadata_path) else {}
+        if metadata.get("cache_key") != key or metadata.get("status") != "COMPLETED":
+            # El directorio fue sobrescrito por otra ejecución con el mismo job_id
+            # (o esa ejecución quedó a medias)
+            del index[key]
+            self._save(index)
+            return None
+
+        entry["last_used"] = time.time()
+        self._save(index)
+        self.logger.info(f"Resultado en caché: job {entry['job_id']}")
+        return metadata
+
+    def store(self, key: str, job_id: str, fingerprint: Dict[str, Any]):
+        """
+        Registra el resultado de un job terminado y desaloja los más antiguos
+        si se superan los límites.
+        """
+        index = self._load()
+        # Un job_id reutilizado invalida lo que hubiera en caché con ese directorio
+        for other_key in [k for k, entry in index.items() if entry["job_id"] == job_id]:
+            del index[other_key]
+
+        job_dir = f"jobs/{job_id}"
+        size = sum(self.hdfs.get_file_size(path) for path in self.hdfs.list_files(job_dir))
+        now = time.time()
+        index[key] = {"job_id": job_id, "bytes": size, "created": now, "last_used": now,
+                      "blocks": fingerprint["blocks"]}
+        self._evict(index, keep=key)
+        self._save(index)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep: str):
+        by_age = sorted((k for k in index if k != keep), key=lambda k: index[k]["last_used"])
+        total = sum(entry["bytes"] for entry in index.values())
+        for key in by_age:
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if len(index) <= self.max_entries and not over_bytes:
+                break
+            entry = index.pop(key)
+            total -= entry["bytes"]
+            self.hdfs.delete(f"jobs/{entry['job_id']}")
+            self.logger.info(f"Caché: desalojado job {entry['job_id']} ({entry['bytes']} bytes)")
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Entradas de la caché, de la más reciente a la más antigua.
+        """
+        index = self._load()
+        return sorted(({"key": key, **entry} for key, entry in index.items()),
+                      key=lambda entry: entry["last_used"], reverse=True)
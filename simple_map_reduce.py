@@ -1,9 +1,21 @@
-import csv
+import logging
 from collections import defaultdict
-from io import StringIO
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
+from external_shuffle import ExternalShuffle, new_intermediate_buffer
+from fault_tolerance import JobFailedError, Quarantine, RetryPolicy
+from job_logging import INFO, ProgressCounter, get_logger
+from job_metrics import JobMetrics
 from map_reduce_interface import MapReduceInterface
+from map_reduce_utils import (
+    MapSideCombiner,
+    has_batch_map,
+    iter_groups,
+    iter_record_blocks,
+    map_block,
+    uses_combiner,
+)
+from numeric_aggregation import NumericAggregator, get_aggregation
 
 
 class SimpleMapReduce(MapReduceInterface):
@@ -12,11 +24,33 @@ class SimpleMapReduce(MapReduceInterface):
     Esta clase demuestra los conceptos básicos sin usar Hadoop.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        verbosity: int = INFO,
+        shuffle_mode: str = "memory",
+        max_records_in_memory: int = 1000000,
+        retry_policy: RetryPolicy = None,
+    ):
         """
         Inicializa el framework MapReduce.
+
+        Args:
+            verbosity: 0 (solo errores), 1 (resumen por fase y progreso)
+                o 2 (detalle por registro, solo para datos pequeños)
+            shuffle_mode: "memory" agrupa todo en un diccionario; "external"
+                ordena por corridas en disco y las mezcla (datos mayores que la RAM)
+            max_records_in_memory: Pares intermedios en memoria antes de volcar
+                una corrida a disco (solo en modo "external")
+            retry_policy: Reintentos por registro y cuarentena de los registros
+                que fallan en todos sus intentos (por defecto RetryPolicy())
         """
-        pass
+        self.verbosity = verbosity
+        self.logger = get_logger(type(self).__name__, verbosity)
+        self.shuffle_mode = shuffle_mode
+        self.max_records_in_memory = max_records_in_memory
+        self.metrics = JobMetrics()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
 
     def map_function(self, key: Any, value: Any) -> List[Tuple[Any, Any]]:
         """
@@ -33,41 +67,116 @@ class SimpleMapReduce(MapReduceInterface):
         suma = sum(values)
         return [(key, suma)]
 
-    def _map_phase(self, input_data: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    def _retry_record(
+        self, phase: str, fn, key: Any, value: Any, error: Exception
+    ) -> List[Tuple[Any, Any]]:
+        """
+        Reintenta fn(key, value) tras un primer fallo. Si agota los intentos,
+        aparta el registro en cuarentena y devuelve una lista vacía (o lanza
+        JobFailedError si la política no permite saltar registros).
+        """
+        policy = self.retry_policy
+        failures = 1
+        while True:
+            self.metrics.incr(phase, "failed_attempts")
+            if failures >= policy.max_attempts:
+                break
+            self.metrics.incr(phase, "task_retries")
+            try:
+                return fn(key, value)
+            except JobFailedError:
+                raise
+            except Exception as exc:
+                error = exc
+                failures += 1
+
+        if not policy.skip_bad_records:
+            raise JobFailedError(
+                f"{phase.upper()} falló para {key!r} tras {failures} intentos"
+            ) from error
+        self.logger.warning(
+            f"{phase.upper()} falló para {key!r} ({error!r}); registro en cuarentena"
+        )
+        self.metrics.incr(phase, "quarantined_records")
+        self.quarantine.add(phase, 0, key, value, error)
+        return []
+
+    def _map_record(self, key: Any, value: Any) -> List[Tuple[Any, Any]]:
+        try:
+            return self.map_function(key, value)
+        except Exception as exc:
+            return self._retry_record("map", self.map_function, key, value, exc)
+
+    def _map_batch_block(self, block: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+        try:
+            return map_block(self, block)
+        except Exception:
+            # Se repite el bloque fila a fila para aislar las filas que fallan
+            def map_row(key: Any, value: Any) -> List[Tuple[Any, Any]]:
+                return map_block(self, [(key, value)])
+
+            mapped = []
+            for key, value in block:
+                try:
+                    mapped.extend(map_row(key, value))
+                except Exception as exc:
+                    mapped.extend(self._retry_record("map", map_row, key, value, exc))
+            return mapped
+
+    def _map_phase(self, input_data: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
         """
         Ejecuta la fase de mapeo sobre los datos de entrada.
 
         Args:
-            input_data: Lista de pares (clave, valor) de entrada
+            input_data: Pares (clave, valor) de entrada; puede ser un generador,
+                se consume una sola vez y de forma perezosa. Cada par se pasa
+                tal cual a map_function (por ejemplo, filas de read_csv_rows)
 
         Returns:
             Lista de pares (clave, valor) intermedios
         """
-        print("Iniciando fase MAP...")
-
-        intermediate_results = []
-
-        # Procesamiento secuencial
-        for key, value in input_data:
-            print(f"Procesando entrada: ({key}, {value})")
-
-            if value:
-
-                reader = csv.reader(
-                    StringIO(value.lower()), quotechar='"', skipinitialspace=True
-                )
-                row = next(reader)  # Obtener la primera (y única) fila
-                country = row[6]
-
-                print("country: ", country)
-                mapped = [(country, 1)]  # Usar la columna 6 como ejemplo
+        self.logger.info("Iniciando fase MAP...")
 
-                print("mapped:", mapped)
-                intermediate_results.extend(mapped)
-                print(f"   MAP: ({key}, {value}) -> {mapped}")
-
-        print(
-            f"Fase MAP completada. {len(intermediate_results)} pares intermedios generados.\n"
+        aggregation = get_aggregation(self)
+        intermediate_results = new_intermediate_buffer(
+            self.shuffle_mode, self.max_records_in_memory, aggregation=aggregation
+        )
+        # Con combine_function definida, los pares se pre-agregan por clave
+        # (con una agregación numérica ya se acumula un valor por clave)
+        combiner = MapSideCombiner(self) if uses_combiner(self) else None
+        progress = ProgressCounter(self.logger, "MAP")
+        # Se evalúa una sola vez para no formatear mensajes que no se van a mostrar
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+
+        if has_batch_map(self):
+            # Modo por columnas: un bloque de filas por llamada a map_batch_function
+            for block in iter_record_blocks(input_data):
+                progress.add(len(block))
+                intermediate_results.extend(self._map_batch_block(block))
+        else:
+            # Procesamiento secuencial
+            for key, value in input_data:
+                progress.add()
+                if debug:
+                    self.logger.debug(f"Procesando entrada: ({key}, {value})")
+
+                mapped = self._map_record(key, value)
+
+                if combiner:
+                    combiner.add_all(mapped)
+                else:
+                    intermediate_results.extend(mapped)
+                if debug:
+                    self.logger.debug(f"   MAP: ({key}, {value}) -> {mapped}")
+
+        if combiner:
+            intermediate_results.extend(combiner.results())
+
+        self.metrics.incr("map", "input_records", progress.count)
+        self.metrics.incr("map", "output_records", len(intermediate_results))
+        self.logger.info(
+            f"Fase MAP completada. {progress.count} registros, "
+            f"{len(intermediate_results)} pares intermedios generados.\n"
         )
         return intermediate_results
 
@@ -78,12 +187,33 @@ class SimpleMapReduce(MapReduceInterface):
         Ejecuta la fase de shuffle/sort, agrupando valores por clave.
 
         Args:
-            intermediate_data: Lista de pares (clave, valor) intermedios
+            intermediate_data: Lista de pares (clave, valor) intermedios, o el
+                ExternalShuffle que los acumuló en modo "external"
 
         Returns:
-            Diccionario con claves como keys y listas de valores como values
+            Diccionario con claves como keys y listas de valores como values.
+            En modo "external", un iterador ordenado de pares (clave, valores)
+            que se consume durante la fase REDUCE
         """
-        print("Iniciando fase SHUFFLE...")
+        self.logger.info("Iniciando fase SHUFFLE...")
+
+        self.metrics.incr("shuffle", "input_records", len(intermediate_data))
+        if isinstance(intermediate_data, ExternalShuffle):
+            # Los grupos se cuentan en REDUCE, que consume la mezcla
+            self.metrics.incr("shuffle", "spills", intermediate_data.spill_count)
+            self.logger.info(
+                f"Fase SHUFFLE externa: {intermediate_data.spill_count} corridas "
+                f"en disco, mezcla diferida hasta REDUCE.\n"
+            )
+            return intermediate_data.groups()
+        if isinstance(intermediate_data, NumericAggregator):
+            # Los valores ya están acumulados por clave durante MAP
+            self.metrics.incr("shuffle", "groups", intermediate_data.num_keys)
+            self.logger.info(
+                f"Fase SHUFFLE completada. {intermediate_data.num_keys} claves "
+                f"agregadas ({intermediate_data.aggregation}).\n"
+            )
+            return intermediate_data
 
         grouped_data = defaultdict(list)
 
@@ -92,11 +222,15 @@ class SimpleMapReduce(MapReduceInterface):
 
         # Ordenar las claves para consistencia
         sorted_groups = dict(sorted(grouped_data.items()))
+        self.metrics.incr("shuffle", "groups", len(sorted_groups))
 
-        for key, values in sorted_groups.items():
-            print(f"   SHUFFLE: {key} -> {values}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for key, values in sorted_groups.items():
+                self.logger.debug(f"   SHUFFLE: {key} -> {values}")
 
-        print(f"Fase SHUFFLE completada. {len(sorted_groups)} grupos creados.\n")
+        self.logger.info(
+            f"Fase SHUFFLE completada. {len(sorted_groups)} grupos creados.\n"
+        )
         return sorted_groups
 
     def _reduce_phase(
@@ -106,46 +240,88 @@ class SimpleMapReduce(MapReduceInterface):
         Ejecuta la fase de reducción sobre los datos agrupados.
 
         Args:
-            grouped_data: Diccionario con datos agrupados por clave
+            grouped_data: Diccionario con datos agrupados por clave (o iterador
+                de pares (clave, valores) en modo "external", o el
+                NumericAggregator cuyos valores reemplazan a reduce_function)
 
         Returns:
             Lista de pares (clave, valor) finales
         """
-        print("Iniciando fase REDUCE...")
+        self.logger.info("Iniciando fase REDUCE...")
+
+        if isinstance(grouped_data, NumericAggregator):
+            final_results = grouped_data.results()
+            self.metrics.incr("reduce", "input_groups", len(final_results))
+            self.metrics.incr("reduce", "output_records", len(final_results))
+            self.logger.info(
+                f"Fase REDUCE completada. {len(final_results)} resultados finales.\n"
+            )
+            return final_results
 
         final_results = []
+        debug = self.logger.isEnabledFor(logging.DEBUG)
 
-        for key, values in grouped_data.items():
-            reduced = [(key, sum(values))]
-            final_results.extend(reduced)
-            print(f"   REDUCE: {key}, {sum(values)} -> {reduced}")
+        num_groups = 0
 
-        print(f"Fase REDUCE completada. {len(final_results)} resultados finales.\n")
+        for key, values in iter_groups(grouped_data):
+            try:
+                reduced = self.reduce_function(key, values)
+            except Exception as exc:
+                reduced = self._retry_record(
+                    "reduce", self.reduce_function, key, values, exc
+                )
+            final_results.extend(reduced)
+            num_groups += 1
+            if debug:
+                self.logger.debug(f"   REDUCE: {key}, {values} -> {reduced}")
+
+        self.metrics.incr("reduce", "input_groups", num_groups)
+        self.metrics.incr("reduce", "output_records", len(final_results))
+        self.logger.info(
+            f"Fase REDUCE completada. {len(final_results)} resultados finales.\n"
+        )
         return final_results
 
-    def execute(self, input_data: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    def execute(
+        self, input_data: Iterable[Tuple[Any, Any]], return_metrics: bool = False
+    ):
         """
         Ejecuta el pipeline completo de MapReduce.
 
         Args:
-            input_data: Datos de entrada como lista de pares (clave, valor)
+            input_data: Datos de entrada como pares (clave, valor) (lista o generador)
+            return_metrics: Si es True, devuelve también las métricas del job
 
         Returns:
-            Resultados finales como lista de pares (clave, valor)
+            Resultados finales como lista de pares (clave, valor), o la tupla
+            (resultados, métricas) con return_metrics (ver JobMetrics.to_dict)
         """
-        print("Iniciando proceso MapReduce")
-        print("=" * 50)
+        self.logger.info("Iniciando proceso MapReduce")
+        self.logger.info("=" * 50)
+        self.metrics = JobMetrics()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
 
         # Fase 1: Map
-        intermediate_data = self._map_phase(input_data)
+        with self.metrics.phase("map"):
+            intermediate_data = self._map_phase(input_data)
 
         # Fase 2: Shuffle/Sort
-        grouped_data = self._shuffle_phase(intermediate_data)
-
-        # Fase 3: Reduce
-        final_results = self._reduce_phase(grouped_data)
-
-        print("Proceso MapReduce completado!")
-        print("=" * 50)
-
+        with self.metrics.phase("shuffle"):
+            grouped_data = self._shuffle_phase(intermediate_data)
+
+        # Fase 3: Reduce (en modo "external" incluye la mezcla de corridas)
+        with self.metrics.phase("reduce"):
+            final_results = self._reduce_phase(grouped_data)
+
+        self.metrics.log_summary(self.logger)
+        if self.quarantine.entries:
+            self.logger.warning(
+                f"{len(self.quarantine)} registros en cuarentena "
+                f"(ver self.quarantine.entries)"
+            )
+        self.logger.info("Proceso MapReduce completado!")
+        self.logger.info("=" * 50)
+
+        if return_metrics:
+            return final_results, self.metrics.to_dict()
         return final_results
@@ -1,23 +1,166 @@
+import asyncio
+import copy
+import heapq
+import logging
+import threading
+import time
+import uuid
+import zlib
 from collections import defaultdict
-from typing import Dict, List, Tuple, Any
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from itertools import chain, groupby
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Any
 
+from async_hdfs import AsyncHDFS
+from external_shuffle import ExternalShuffle
+from fault_tolerance import Quarantine, RetryPolicy, map_records_skipping, reduce_groups_skipping, run_with_retries
 from hdfs_simulator import HDFSSimulator
+from job_logging import INFO, ProgressCounter, get_logger
+from job_metrics import JobMetrics, RecordCounter
 from map_reduce_interface import MapReduceInterface
+from map_reduce_utils import MapSideCombiner, batched_records, has_batch_map, has_combiner, map_batch_records
+from partitioners import HashPartitioner, Partitioner, describe_partitioner
+from result_cache import ResultCache, job_source_hash
+
+# Bytes previos al desplazamiento procesado que se usan para detectar si la entrada fue reescrita
+_CHECKSUM_WINDOW = 4096
+
+
+def _clip_blocks(blocks: List[Dict[str, Any]], start: int, end: int) -> List[Dict[str, Any]]:
+    """
+    Recorta las ubicaciones de bloques al rango de bytes [start, end) del archivo.
+    """
+    clipped = []
+    for block in blocks:
+        block_start = max(block["offset"], start)
+        block_end = min(block["offset"] + block["length"], end)
+        if block_end > block_start:
+            clipped.append(dict(block, offset=block_start, length=block_end - block_start))
+    return clipped
+
+
+def _merge_previous_output(groups: Iterator[Tuple[Any, List[Any]]],
+                           previous: Iterator[Tuple[Any, Any]]) -> Iterator[Tuple[Any, List[Any]]]:
+    """
+    Une los grupos nuevos de una partición con la salida anterior de su
+    reducer (ambos ordenados por clave): cada clave recibe su valor anterior
+    (si lo tenía) seguido de sus valores nuevos.
+    """
+    previous_groups = ((key, [value]) for key, value in previous)
+    merged = heapq.merge(previous_groups, groups, key=itemgetter(0))
+    for key, parts in groupby(merged, key=itemgetter(0)):
+        values = []
+        for _, part in parts:
+            values.extend(part)
+        yield key, values
+
+
+class MaterializationPolicy:
+    """
+    Define qué datos del job se escriben en HDFS. Cada conjunto de datos se
+    escribe una sola vez; las vistas consolidadas (toda la salida de map, la
+    salida final) se obtienen leyendo las partes de forma perezosa.
+    """
+
+    def __init__(self, write_input: bool = False, map_split_size: int = 100000,
+                 write_final_output: bool = False):
+        """
+        Args:
+            write_input: Copiar la entrada del job a HDFS (jobs/<id>/input/)
+            map_split_size: Registros de entrada por tarea de map (y por archivo de salida de map)
+            write_final_output: Escribir además final_output.json con todos los resultados
+                (duplica las salidas de los reducers; útil solo para inspección manual)
+        """
+        if map_split_size < 1:
+            raise ValueError("map_split_size debe ser mayor que 0")
+        self.write_input = write_input
+        self.map_split_size = map_split_size
+        self.write_final_output = write_final_output
 
 
 class SimpleMapReduceHDFS(MapReduceInterface):
     """
     Implementación simple de MapReduce en Python puro.
     Esta clase demuestra los conceptos básicos sin usar Hadoop.
+    
+    Los archivos intermedios (entrada, salida de map, particiones) se guardan
+    en el formato binario compacto (.bin); las salidas de los reducers, la
+    salida final y los metadatos se mantienen en JSON legible (.json).
+    
+    Los datos fluyen por disco en streaming: cada tarea de map escribe su
+    salida una vez, el shuffle la lee parte por parte y escribe una partición
+    ordenada por reducer, y cada reducer lee su partición registro a registro.
     """
     
-    def __init__(self):
+    def __init__(self, num_reducers: int = 3, partitioner: Partitioner = None, verbosity: int = INFO,
+                 materialization: MaterializationPolicy = None, shuffle_mode: str = "memory",
+                 max_records_in_memory: int = 1000000, hdfs: HDFSSimulator = None, job_id: str = None,
+                 result_cache: ResultCache = None, retry_policy: RetryPolicy = None, io_queue_size: int = 0,
+                 checkpoint_every: int = 16):
         """
         Inicializa el framework MapReduce con simulador HDFS.
+        
+        Args:
+            num_reducers: Número de reducers (y de particiones del shuffle)
+            partitioner: Estrategia de partición de claves (por defecto HashPartitioner)
+            verbosity: 0 (solo errores), 1 (resumen por fase y progreso)
+                o 2 (detalle por registro y por archivo, solo para datos pequeños)
+            materialization: Qué se escribe en HDFS (por defecto MaterializationPolicy())
+            shuffle_mode: "memory" agrupa cada partición en un diccionario; "external"
+                ordena por corridas en disco (datos mayores que la RAM)
+            max_records_in_memory: Pares en memoria, entre todas las particiones,
+                antes de volcar corridas a disco (solo en modo "external")
+            hdfs: Simulador HDFS a usar (por ejemplo, uno con bloques y datanodes).
+                Si es None, se crea uno sin bloques en ./hdfs_sim
+            job_id: Identificador estable del job (directorio jobs/<job_id>/).
+                Necesario para el modo incremental y para reanudar un job
+                (resume=True); si es None, se genera uno único
+            result_cache: Caché de resultados de execute_file (ver ResultCache).
+                Si la entrada y la definición del job no cambiaron, se devuelve
+                el resultado guardado sin ejecutar el job
+            retry_policy: Reintentos de tareas y cuarentena de registros que fallan
+                (por defecto RetryPolicy())
+            io_queue_size: Si es mayor que 0, las salidas de map y de los reducers
+                se escriben en segundo plano (AsyncHDFS) con a lo sumo esa cantidad
+                de escrituras pendientes, y el archivo siguiente del shuffle y la
+                partición del siguiente reducer se leen por adelantado. El cálculo
+                sigue mientras el disco escribe; a cambio, se guardan en memoria
+                la salida de cada tarea y la partición leída por adelantado
+            checkpoint_every: Tareas terminadas entre dos escrituras de
+                job_metadata.json. También se guarda al terminar las fases MAP y
+                SHUFFLE y si el job falla; si el proceso muere, al reanudar se
+                repiten a lo sumo checkpoint_every - 1 tareas de la fase en curso
         """
-        self.hdfs = HDFSSimulator()
-        self.job_id = f"job_{hash(str(id(self))) % 10000:04d}"
-        print(f"Job ID asignado: {self.job_id}")
+        if shuffle_mode not in ("memory", "external"):
+            raise ValueError(f"Modo de shuffle desconocido: {shuffle_mode!r} (use 'memory' o 'external')")
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every debe ser mayor que 0")
+        self.logger = get_logger(type(self).__name__, verbosity)
+        self.num_reducers = num_reducers
+        self.partitioner = partitioner or HashPartitioner()
+        self.materialization = materialization or MaterializationPolicy()
+        self.shuffle_mode = shuffle_mode
+        self.max_records_in_memory = max_records_in_memory
+        self.hdfs = hdfs or HDFSSimulator(verbosity=verbosity)
+        self.job_id = job_id or f"job_{uuid.uuid4().hex[:12]}"
+        self.result_cache = result_cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+        self.io_queue_size = io_queue_size
+        self.checkpoint_every = checkpoint_every
+        self._io = None
+        self.reducer_outputs = []
+        self.job_info = {}
+        self.completed_tasks = {"map": {}, "shuffle": {}, "reduce": {}}
+        self._resume_tasks = {}
+        # Marcas de tareas terminadas que aún no están en job_metadata.json
+        self._unsaved_marks = 0
+        # completed_tasks se actualiza desde el hilo de E/S cuando io_queue_size > 0
+        self._tasks_lock = threading.Lock()
+        self.metrics = JobMetrics()
+        self.logger.info(f"Job ID asignado: {self.job_id}")
     
     def map_function(self, key: Any, value: Any) -> List[Tuple[Any, Any]]:
         """
@@ -33,218 +176,874 @@ class SimpleMapReduceHDFS(MapReduceInterface):
         """
         return [(key, values)]
     
-    def _map_phase(self, input_data: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    def _job_path(self, relative_path: str) -> str:
+        return f"jobs/{self.job_id}/{relative_path}"
+    
+    def _map_output_path(self, map_num: int) -> str:
+        return self._job_path(f"intermediate/map_output_{map_num:05d}.bin")
+    
+    def _resumable(self, phase: str, task_id: int, *paths: str) -> Dict[str, Any]:
+        """
+        Marca de la tarea en el checkpoint que se está reanudando, si la tarea
+        terminó y su salida sigue en HDFS (si no, None: hay que ejecutarla).
+        """
+        done = self._resume_tasks.get(phase, {}).get(str(task_id))
+        if done is None or not all(self.hdfs.exists(path) for path in paths):
+            return None
+        with self._tasks_lock:
+            self.completed_tasks[phase][str(task_id)] = done
+        self.metrics.incr(phase, "resumed_tasks")
+        return done
+    
+    def _mark_done(self, phase: str, task_id: int, **info: Any):
+        """
+        Registra que una tarea terminó y su salida ya está escrita (marca de
+        finalización para reanudar el job). Las marcas se guardan en
+        job_metadata.json cada checkpoint_every tareas y al final de cada fase
+        (ver _save_pending_marks), no una escritura del documento por tarea.
+        """
+        with self._tasks_lock:
+            self.completed_tasks[phase][str(task_id)] = info
+            self._unsaved_marks += 1
+            save = self._unsaved_marks >= self.checkpoint_every
+        if save:
+            self._checkpoint()
+    
+    def _save_pending_marks(self):
+        # Fin de fase: las marcas de las tareas terminadas quedan en el checkpoint
+        if self._unsaved_marks:
+            self._checkpoint()
+    
+    def _write_output(self, file_path: str, data: List[Tuple[Any, Any]], step: str):
+        # Con E/S asíncrona, la escritura queda encolada y el cálculo continúa
+        if self._io is not None:
+            self._io.write_behind(file_path, data, step)
+        else:
+            self.hdfs.write_file(file_path, data, step)
+    
+    def _after_writes(self, fn: Callable[[], Any]):
+        # Ejecuta fn cuando las escrituras ya pedidas estén en HDFS (p. ej. una marca de tarea terminada)
+        if self._io is not None:
+            self._io.submit(fn)
+        else:
+            fn()
+    
+    def _flush_io(self):
+        if self._io is not None:
+            self._io.flush()
+    
+    @contextmanager
+    def _io_pipeline(self) -> Iterator[None]:
+        """
+        Activa la E/S en segundo plano durante una ejecución (si io_queue_size > 0).
+        """
+        if not self.io_queue_size:
+            yield
+            return
+        with AsyncHDFS(self.hdfs, self.io_queue_size) as io:
+            self._io = io
+            try:
+                yield
+            finally:
+                self._io = None
+    
+    def _map_phase(self, input_data: Iterable[Tuple[Any, Any]]) -> List[str]:
         """
         Ejecuta la fase de mapeo sobre los datos de entrada.
-        Simula la escritura de resultados intermedios en HDFS.
+        La entrada se divide en tareas de map_split_size registros y la salida
+        de cada tarea se escribe una sola vez en HDFS.
+        
+        Args:
+            input_data: Pares (clave, valor) de entrada (lista o generador).
+                Un generador se consume por tareas, sin materializarlo
+        
+        Returns:
+            Rutas HDFS de los archivos de salida de map
+        """
+        self.logger.info("Iniciando fase MAP...")
+        progress = ProgressCounter(self.logger, "MAP")
+        
+        map_outputs = []
+        total_pairs = 0
+        
+        # 1. Copia opcional de la entrada, escrita en streaming junto con el map
+        input_writer = (self.hdfs.open_writer(self._job_path("input/input_data.bin"), "INPUT")
+                        if self.materialization.write_input else nullcontext())
+        
+        with input_writer as input_copy:
+            # 2. Una tarea de map por split de entrada
+            for split in batched_records(input_data, self.materialization.map_split_size):
+                progress.add(len(split))
+                if input_copy is not None:
+                    input_copy.write_many(split)
+                
+                map_num = len(map_outputs)
+                done = self._resumable("map", map_num, self._map_output_path(map_num))
+                if done is not None:
+                    map_path, num_pairs = self._map_output_path(map_num), done["pairs"]
+                else:
+                    start = time.perf_counter()
+                    map_path, num_pairs, _ = self._run_map_attempts(lambda: split, map_num)
+                    self.metrics.add_task("map", map_num, time.perf_counter() - start, len(split))
+                    self._after_writes(partial(self._mark_done, "map", map_num, pairs=num_pairs, records=len(split)))
+                map_outputs.append(map_path)
+                total_pairs += num_pairs
+        
+        self.metrics.incr("map", "input_records", progress.count)
+        self.metrics.incr("map", "output_records", total_pairs)
+        self.metrics.incr("map", "tasks", len(map_outputs))
+        self.logger.info(f"Fase MAP completada. {progress.count} registros, {total_pairs} pares intermedios generados.")
+        self.logger.info(f"Archivos MAP creados: {len(map_outputs)}\n")
+        
+        return map_outputs
+    
+    def _run_map_attempts(self, make_records: Callable[[], Iterable[Tuple[Any, Any]]],
+                          map_num: int) -> Tuple[str, int, int]:
+        """
+        Ejecuta una tarea de map con la política de reintentos: cada intento
+        vuelve a leer su entrada con make_records() y escribe su salida de
+        forma atómica, así que un intento fallido no deja datos a medias.
+        
+        Returns:
+            Ruta HDFS de la salida, pares intermedios escritos y registros leídos
+        """
+        def attempt(skip: bool) -> Tuple[str, int, int]:
+            records = RecordCounter(make_records())
+            map_path, num_pairs = self._run_map_task(records, map_num, skip)
+            return map_path, num_pairs, records.count
+        
+        return run_with_retries(attempt, self.retry_policy, "map", map_num, self.logger, self.metrics)
+    
+    def _quarantine_record(self, phase: str, task_id: int, key: Any, value: Any, error: BaseException):
+        self.logger.warning(f"{phase.upper()} falló para {key!r} en la tarea {task_id}: {error!r}; registro en cuarentena")
+        self.metrics.incr(phase, "quarantined_records")
+        self.quarantine.add(phase, task_id, key, value, error)
+    
+    def _run_map_task(self, records: Iterable[Tuple[Any, Any]], map_num: int, skip: bool = False) -> Tuple[str, int]:
+        """
+        Ejecuta una tarea de map y escribe su salida una sola vez en HDFS.
         
         Args:
-            input_data: Lista de pares (clave, valor) de entrada
+            records: Pares (clave, valor) de entrada de la tarea
+            map_num: Número de la tarea (define el nombre del archivo de salida)
+            skip: Aplicar map_function registro a registro, apartando en
+                cuarentena los registros que fallan (último intento)
             
         Returns:
-            Lista de pares (clave, valor) intermedios
+            Ruta HDFS de la salida y número de pares intermedios escritos
         """
-        print("Iniciando fase MAP...")
+        if skip:
+            task_results = map_records_skipping(
+                self, records, lambda key, value, exc: self._quarantine_record("map", map_num, key, value, exc))
+            map_path = self._map_output_path(map_num)
+            self._write_output(map_path, task_results, f"MAP_{map_num}")
+            return map_path, len(task_results)
+        
+        if has_batch_map(self):
+            # Modo por columnas: la tarea se mapea por bloques de filas
+            task_results = map_batch_records(self, records)
+            map_path = self._map_output_path(map_num)
+            self._write_output(map_path, task_results, f"MAP_{map_num}")
+            return map_path, len(task_results)
         
-        # 1. Escribir datos de entrada en HDFS
-        input_path = f"jobs/{self.job_id}/input/input_data.json"
-        self.hdfs.write_file(input_path, input_data, "INPUT")
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         
-        intermediate_results = []
+        # Combinador local a la tarea (si el job define combine_function)
+        combiner = MapSideCombiner(self) if has_combiner(self) else None
+        task_results = []
         
-        # 2. Procesar cada registro y simular escritura por chunks
-        chunk_size = 2  # Simular escritura en chunks pequeños
-        chunk_num = 0
+        for key, value in records:
+            mapped = self.map_function(key, value)
+            if combiner:
+                combiner.add_all(mapped)
+            else:
+                task_results.extend(mapped)
+            if debug:
+                self.logger.debug(f"   MAP: ({key}, {value}) -> {mapped}")
         
-        for i in range(0, len(input_data), chunk_size):
-            chunk = input_data[i:i + chunk_size]
-            chunk_results = []
+        if combiner:
+            task_results = combiner.results()
+        
+        map_path = self._map_output_path(map_num)
+        self._write_output(map_path, task_results, f"MAP_{map_num}")
+        return map_path, len(task_results)
+    
+    def _schedule_splits(self, blocks: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Asigna cada bloque (input split) a un worker, preferiendo los datanodes
+        que tienen una réplica del bloque (localidad de datos). Entre los
+        candidatos se elige el menos cargado; si ninguno guarda el bloque, se
+        usa el worker menos cargado del clúster y la lectura es remota.
+        
+        Args:
+            blocks: Ubicaciones de los bloques (HDFSSimulator.get_block_locations)
             
-            for key, value in chunk:
-                mapped = self.map_function(key, value)
-                chunk_results.extend(mapped)
-                intermediate_results.extend(mapped)
-                print(f"   MAP: ({key}, {value}) -> {mapped}")
+        Returns:
+            Lista de pares (bloque, worker); worker es None sin datanodes
+        """
+        workers = self.hdfs.datanodes
+        load = {worker: 0 for worker in workers}
+        assignments = []
+        
+        for block in blocks:
+            candidates = [worker for worker in block["locations"] if worker in load] or workers
+            worker = min(candidates, key=load.get) if candidates else None
+            if worker is not None:
+                load[worker] += 1
+            assignments.append((block, worker))
+        
+        return assignments
+    
+    def _read_split_lines(self, file_path: str, block: Dict[str, Any], worker: str,
+                          skip_header: bool, encoding: str) -> Iterator[Tuple[int, str]]:
+        """
+        Lee las líneas de un input split alineado a bloque, con la regla de
+        TextInputFormat de Hadoop: el split procesa cada línea que empieza
+        dentro de su rango de bytes, aunque termine en el bloque siguiente.
+        
+        Returns:
+            Generador de pares (desplazamiento en bytes, línea) sin líneas vacías
+        """
+        start = block["offset"]
+        end = start + block["length"]
+        
+        with self.hdfs.open_stream(file_path, preferred_datanode=worker) as f:
+            if start == 0:
+                pos = 0
+                if skip_header:
+                    pos += len(f.readline())
+            else:
+                # La línea que cruza el inicio del split pertenece al split anterior
+                f.seek(start - 1)
+                pos = start - 1 + len(f.readline())
+            
+            while pos < end:
+                line = f.readline()
+                if not line:
+                    break
+                text = line.decode(encoding).rstrip("\r\n")
+                if text.strip():
+                    yield pos, text
+                pos += len(line)
+    
+    def _map_blocks_phase(self, file_path: str, skip_header: bool, encoding: str,
+                          start_offset: int = 0, end_offset: int = None) -> List[str]:
+        """
+        Fase de mapeo sobre un archivo de texto almacenado en HDFS: una tarea
+        de map por bloque, planificada en un worker local al bloque.
+        
+        Args:
+            start_offset: Primer byte a procesar (las líneas que empiezan antes se omiten)
+            end_offset: Fin del rango a procesar; si es None, el final del archivo
+        
+        Returns:
+            Rutas HDFS de los archivos de salida de map
+        """
+        self.logger.info("Iniciando fase MAP...")
+        blocks = self.hdfs.get_block_locations(file_path)
+        if start_offset or end_offset is not None:
+            end = blocks[-1]["offset"] + blocks[-1]["length"] if blocks else 0
+            blocks = _clip_blocks(blocks, start_offset, end if end_offset is None else end_offset)
+        assignments = self._schedule_splits(blocks)
+        
+        map_outputs = []
+        total_pairs = 0
+        local_tasks = 0
+        
+        for block, worker in assignments:
+            local = worker in block["locations"]
+            local_tasks += local
+            self.logger.debug(f"   MAP_{len(map_outputs)}: bloque {block['block_id']} "
+                              f"({block['length']} bytes) en {worker} [{'local' if local else 'remoto'}]")
             
-            # 3. Escribir chunk de resultados intermedios en HDFS
-            if chunk_results:
-                chunk_path = f"jobs/{self.job_id}/intermediate/map_output_chunk_{chunk_num:03d}.json"
-                self.hdfs.write_file(chunk_path, chunk_results, f"MAP_CHUNK_{chunk_num}")
-                chunk_num += 1
+            map_num = len(map_outputs)
+            done = self._resumable("map", map_num, self._map_output_path(map_num))
+            if done is not None:
+                map_path, num_pairs, num_records = self._map_output_path(map_num), done["pairs"], done["records"]
+            else:
+                start = time.perf_counter()
+                map_path, num_pairs, num_records = self._run_map_attempts(
+                    lambda: self._read_split_lines(file_path, block, worker, skip_header, encoding), map_num)
+                self.metrics.add_task("map", map_num, time.perf_counter() - start, num_records)
+                self._after_writes(partial(self._mark_done, "map", map_num, pairs=num_pairs, records=num_records))
+            map_outputs.append(map_path)
+            total_pairs += num_pairs
+            self.metrics.incr("map", "input_records", num_records)
         
-        # 4. Escribir archivo consolidado de resultados MAP
-        consolidated_path = f"jobs/{self.job_id}/intermediate/map_output_consolidated.json"
-        self.hdfs.write_file(consolidated_path, intermediate_results, "MAP_CONSOLIDATED")
+        self.metrics.incr("map", "output_records", total_pairs)
+        self.metrics.incr("map", "tasks", len(map_outputs))
+        self.metrics.incr("map", "data_local_tasks", local_tasks)
+        self.job_info.update(input_file=file_path, map_tasks=len(assignments),
+                             data_local_map_tasks=local_tasks)
         
-        print(f"Fase MAP completada. {len(intermediate_results)} pares intermedios generados.")
-        print(f"Archivos MAP creados: {chunk_num} chunks + 1 consolidado\n")
+        self.logger.info(f"Fase MAP completada. {total_pairs} pares intermedios generados.")
+        self.logger.info(f"Tareas MAP: {len(map_outputs)} (una por bloque), {local_tasks} con datos locales\n")
         
-        return intermediate_results
+        return map_outputs
     
-    def _shuffle_phase(self, intermediate_data: List[Tuple[Any, Any]]) -> Dict[Any, List[Any]]:
+    def _iter_map_output(self, map_outputs: List[str]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Vista consolidada de la salida de map: recorre las partes en orden
+        sin escribir ni cargar una copia completa.
+        """
+        for map_num, map_path in enumerate(map_outputs):
+            if self._io is not None and map_num + 1 < len(map_outputs):
+                # Lectura anticipada de la parte siguiente mientras se reparte esta
+                self._io.prefetch(map_outputs[map_num + 1])
+            with self._open_records(map_path) as records:
+                yield from records
+    
+    def _open_records(self, file_path: str):
+        # Con E/S asíncrona, el archivo puede estar ya leído por adelantado (prefetch)
+        if self._io is not None:
+            return nullcontext(iter(self._io.read_file(file_path)))
+        return self.hdfs.open_reader(file_path)
+    
+    def _shuffle_phase(self, map_outputs: List[str]) -> List[str]:
         """
         Ejecuta la fase de shuffle/sort, agrupando valores por clave.
-        Simula la escritura de datos agrupados en HDFS por particiones.
+        Cada par se envía a la partición que indica el partitioner y las claves
+        se ordenan solo dentro de su partición (no hay orden global).
+        Cada partición se escribe una vez en HDFS como registros (clave, valores)
+        ordenados por clave.
         
         Args:
-            intermediate_data: Lista de pares (clave, valor) intermedios
-            
+            map_outputs: Rutas HDFS de la salida de map
+        
         Returns:
-            Diccionario con claves como keys y listas de valores como values
+            Rutas HDFS de las particiones, una por reducer
         """
-        print("Iniciando fase SHUFFLE...")
+        self.logger.info("Iniciando fase SHUFFLE...")
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        external = self.shuffle_mode == "external"
+        partition_paths = [self._job_path(f"partitions/partition_{partition_num:03d}.bin")
+                           for partition_num in range(self.num_reducers)]
+        
+        # Al reanudar, las particiones ya escritas se reutilizan si ninguna tarea de map se repitió
+        if self.metrics.counters["map"].get("resumed_tasks", 0) < len(map_outputs):
+            self._resume_tasks.pop("shuffle", None)
+        done = self._resumable("shuffle", 0, *partition_paths)
+        if done is not None:
+            self.metrics.incr("shuffle", "groups", done["groups"])
+            self.logger.info(f"Fase SHUFFLE reanudada: {done['groups']} grupos en particiones ya escritas\n")
+            return partition_paths
+        
+        # 1. Leer los datos intermedios parte por parte y enviar cada par a su partición
+        if external:
+            budget = max(1, self.max_records_in_memory // self.num_reducers)
+            buffers = [ExternalShuffle(budget) for _ in range(self.num_reducers)]
+        else:
+            buffers = [defaultdict(list) for _ in range(self.num_reducers)]
+        get_partition = self.partitioner.get_partition
         
-        # 1. Leer datos intermedios desde HDFS (simulación de lectura distributiva)
-        consolidated_path = f"jobs/{self.job_id}/intermediate/map_output_consolidated.json"
-        print(f"Leyendo datos intermedios desde HDFS: /{consolidated_path}")
+        input_records = RecordCounter(self._iter_map_output(map_outputs))
+        for key, value in input_records:
+            buffer = buffers[get_partition(key, self.num_reducers)]
+            if external:
+                buffer.add(key, value)
+            else:
+                buffer[key].append(value)
         
-        grouped_data = defaultdict(list)
+        # 2. Ordenar las claves de cada partición y escribirla en HDFS.
+        # En Hadoop real, cada reducer recibe exactamente una partición de claves
+        total_groups = 0
+        spills = 0
         
-        # 2. Agrupar datos por clave
-        for key, value in intermediate_data:
-            grouped_data[key].append(value)
+        for partition_num, buffer in enumerate(buffers):
+            if external:
+                spills += buffer.spill_count
+                groups = buffer.groups()
+            else:
+                groups = iter(sorted(buffer.items()))
             
-        # 3. Ordenar las claves para consistencia
-        sorted_groups = dict(sorted(grouped_data.items()))
-        
-        # 4. Simular escritura de particiones en HDFS
-        # En Hadoop real, cada reducer recibe una partición de claves
-        partition_size = max(1, len(sorted_groups) // 3)  # Simular 3 reducers
-        partition_num = 0
-        current_partition = {}
-        
-        for i, (key, values) in enumerate(sorted_groups.items()):
-            current_partition[key] = values
-            print(f"   SHUFFLE: {key} -> {values}")
+            partition_path = partition_paths[partition_num]
+            with self.hdfs.open_writer(partition_path, f"PARTITION_{partition_num}") as writer:
+                for key, values in groups:
+                    writer.write(key, values)
+                    if debug:
+                        self.logger.debug(f"   SHUFFLE [{partition_num}]: {key} -> {values}")
             
-            # Escribir partición cuando alcance el tamaño límite
-            if len(current_partition) >= partition_size or i == len(sorted_groups) - 1:
-                partition_path = f"jobs/{self.job_id}/partitions/partition_{partition_num:03d}.json"
-                partition_data = [(k, v) for k, v_list in current_partition.items() for v in v_list]
-                self.hdfs.write_file(partition_path, partition_data, f"PARTITION_{partition_num}")
-                
-                partition_num += 1
-                current_partition = {}
-        
-        # 5. Escribir archivo consolidado de grupos
-        grouped_consolidated_path = f"jobs/{self.job_id}/shuffle/grouped_data.json"
-        grouped_flat = [(k, v_list) for k, v_list in sorted_groups.items()]
-        self.hdfs.write_file(grouped_consolidated_path, grouped_flat, "SHUFFLE_CONSOLIDATED")
+            total_groups += writer.count
+            buffers[partition_num] = None  # liberar la partición ya escrita
         
-        print(f"Fase SHUFFLE completada. {len(sorted_groups)} grupos creados.")
-        print(f"Particiones creadas: {partition_num}\n")
+        self.metrics.incr("shuffle", "input_records", input_records.count)
+        self.metrics.incr("shuffle", "groups", total_groups)
+        self.metrics.incr("shuffle", "spills", spills)
+        self.metrics.incr("shuffle", "partitions", len(partition_paths))
+        self._mark_done("shuffle", 0, groups=total_groups)
+        self.logger.info(f"Fase SHUFFLE completada. {total_groups} grupos creados.")
+        if external:
+            self.logger.info(f"Corridas volcadas a disco: {spills}")
+        self.logger.info(f"Particiones creadas: {len(partition_paths)}\n")
         
-        return sorted_groups
+        return partition_paths
     
-    def _reduce_phase(self, grouped_data: Dict[Any, List[Any]]) -> List[Tuple[Any, Any]]:
+    def _reduce_phase(self, partition_paths: List[str], previous_outputs: List[str] = None) -> List[Tuple[Any, Any]]:
         """
         Ejecuta la fase de reducción sobre los datos agrupados.
-        Simula la escritura de resultados finales en HDFS.
+        El reducer i lee en streaming únicamente la partición i, por lo que los
+        reducers son independientes entre sí.
         
         Args:
-            grouped_data: Diccionario con datos agrupados por clave
-            
+            partition_paths: Rutas HDFS de las particiones, una por reducer
+            previous_outputs: Salidas de los reducers de la ejecución anterior
+                (modo incremental). Cada reducer mezcla su salida anterior con
+                los grupos nuevos de su partición y la reemplaza
+        
         Returns:
             Lista de pares (clave, valor) finales
         """
-        print("Iniciando fase REDUCE...")
+        self.logger.info("Iniciando fase REDUCE...")
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         
         final_results = []
+        self.reducer_outputs = []
+        # Al reanudar, las salidas de los reducers solo valen si las particiones no se reescribieron
+        if "shuffle" not in self._resume_tasks:
+            self._resume_tasks.pop("reduce", None)
         
-        # 1. Simular procesamiento por reducer (cada uno procesa ciertas claves)
-        reducer_outputs = []
-        reducer_num = 0
-        
-        # Dividir trabajo entre múltiples reducers simulados
-        keys = list(grouped_data.keys())
-        reducer_batch_size = max(1, len(keys) // 2)  # Simular 2 reducers
-        
-        for i in range(0, len(keys), reducer_batch_size):
-            reducer_batch = keys[i:i + reducer_batch_size]
-            reducer_results = []
+        for reducer_num, partition_path in enumerate(partition_paths):
+            if debug:
+                self.logger.debug(f"   REDUCER {reducer_num} procesando /{partition_path}")
             
-            print(f"   REDUCER {reducer_num} procesando claves: {reducer_batch}")
-            
-            for key in reducer_batch:
-                values = grouped_data[key]
-                reduced = self.reduce_function(key, values)
-                reducer_results.extend(reduced)
+            reducer_output_path = self._job_path(f"output/reducer_{reducer_num:03d}.json")
+            if self._io is not None and reducer_num + 1 < len(partition_paths):
+                # Lectura anticipada de la partición del siguiente reducer mientras se reduce esta
+                self._io.prefetch(partition_paths[reducer_num + 1])
+            done = self._resumable("reduce", reducer_num, reducer_output_path)
+            if done is not None:
+                # Reducer confirmado en la ejecución interrumpida: se lee su salida
+                final_results.extend(self.hdfs.read_file(reducer_output_path))
+                num_groups = done["groups"]
+            else:
+                # Cada reducer escribe su salida una sola vez en HDFS (reintentando si falla)
+                start = time.perf_counter()
+                previous_output = previous_outputs[reducer_num] if previous_outputs else None
+                reduced, num_groups = run_with_retries(
+                    lambda skip: self._run_reducer(reducer_num, partition_path, previous_output,
+                                                   reducer_output_path, skip),
+                    self.retry_policy, "reduce", reducer_num, self.logger, self.metrics)
                 final_results.extend(reduced)
-                print(f"      REDUCE: {key}, {values} -> {reduced}")
-            
-            # 2. Escribir salida de cada reducer en HDFS
-            if reducer_results:
-                reducer_output_path = f"jobs/{self.job_id}/output/reducer_{reducer_num:03d}.json"
-                self.hdfs.write_file(reducer_output_path, reducer_results, f"REDUCER_{reducer_num}")
-                reducer_outputs.append(f"reducer_{reducer_num:03d}.json")
+                self.metrics.add_task("reduce", reducer_num, time.perf_counter() - start, num_groups)
+                self._after_writes(partial(self._mark_done, "reduce", reducer_num,
+                                           groups=num_groups, results=len(reduced)))
             
-            reducer_num += 1
+            self.metrics.incr("reduce", "input_groups", num_groups)
+            self.reducer_outputs.append(reducer_output_path)
+        
+        self._flush_io()
+        self.metrics.incr("reduce", "output_records", len(final_results))
+        self.metrics.incr("reduce", "tasks", len(partition_paths))
         
-        # 3. Escribir resultado final consolidado
-        final_output_path = f"jobs/{self.job_id}/output/final_output.json"
-        self.hdfs.write_file(final_output_path, final_results, "FINAL_OUTPUT")
+        # Salida final consolidada solo si la política lo pide; por defecto
+        # se sirve con read_output(), leyendo las salidas de los reducers
+        if self.materialization.write_final_output:
+            final_output_path = self._job_path("output/final_output.json")
+            self.hdfs.write_file(final_output_path, final_results, "FINAL_OUTPUT")
         
-        # 4. Crear archivo de metadatos del job
+        self.logger.info(f"Fase REDUCE completada. {len(final_results)} resultados finales.")
+        self.logger.info(f"Archivos de salida: {len(self.reducer_outputs)} reducers\n")
+        
+        return final_results
+    
+    def _run_reducer(self, reducer_num: int, partition_path: str, previous_output: str,
+                     output_path: str, skip: bool = False) -> Tuple[List[Tuple[Any, Any]], int]:
+        """
+        Un intento de un reducer: lee su partición (mezclada con su salida
+        anterior en modo incremental), aplica reduce_function y escribe su
+        salida de forma atómica.
+        
+        Args:
+            skip: Apartar en cuarentena los grupos que fallan (último intento)
+        
+        Returns:
+            Pares finales del reducer y número de grupos reducidos
+        """
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        results = []
+        num_groups = 0
+        previous_reader = self.hdfs.open_reader(previous_output) if previous_output else nullcontext(None)
+        # Con E/S asíncrona, la salida se encola al terminar en lugar de escribirse en streaming
+        output_writer = (self.hdfs.open_writer(output_path, f"REDUCER_{reducer_num}")
+                         if self._io is None else nullcontext(None))
+        with self._open_records(partition_path) as groups, previous_reader as previous, output_writer as writer:
+            if previous is not None:
+                groups = _merge_previous_output(groups, previous)
+            if skip:
+                groups = RecordCounter(groups)
+                results = list(reduce_groups_skipping(
+                    self, groups,
+                    lambda key, values, exc: self._quarantine_record("reduce", reducer_num, key, values, exc)))
+                num_groups = groups.count
+                if writer is not None:
+                    writer.write_many(results)
+            else:
+                for key, values in groups:
+                    reduced = self.reduce_function(key, values)
+                    if writer is not None:
+                        writer.write_many(reduced)
+                    results.extend(reduced)
+                    num_groups += 1
+                    if debug:
+                        self.logger.debug(f"      REDUCE: {key}, {values} -> {reduced}")
+        
+        if writer is None:
+            self._io.write_behind(output_path, results, f"REDUCER_{reducer_num}")
+        return results, num_groups
+    
+    def _checkpoint(self, status: str = "RUNNING"):
+        """
+        Guarda en job_metadata.json el estado del job y las marcas de las
+        tareas terminadas, para reanudarlo si la ejecución se interrumpe.
+        """
+        with self._tasks_lock:
+            tasks = copy.deepcopy(self.completed_tasks)
+            self._unsaved_marks = 0
+        metadata = {"job_id": self.job_id, "status": status, "tasks": tasks}
+        metadata.update(self.job_info)
+        self._save_metadata(metadata)
+    
+    @contextmanager
+    def _failure_checkpoint(self) -> Iterator[None]:
+        """
+        Si el bloque `with` falla, deja el job marcado como FAILED (con sus
+        tareas terminadas) antes de propagar el error.
+        """
+        try:
+            yield
+        except BaseException as exc:
+            self.job_info["error"] = repr(exc)
+            self._checkpoint("FAILED")
+            raise
+    
+    def _save_metadata(self, metadata: Dict[str, Any]):
+        metadata_path = self._job_path("job_metadata.json")
+        metadata_tuples = [(k, v) for k, v in metadata.items()]
+        self.hdfs.write_file(metadata_path, metadata_tuples, "METADATA")
+    
+    def _write_metadata(self, total_results: int):
+        """
+        Crea el archivo de metadatos del job, con los contadores y métricas
+        de la ejecución.
+        """
         metadata = {
             "job_id": self.job_id,
-            "total_results": len(final_results),
-            "reducers_used": reducer_num,
-            "reducer_outputs": reducer_outputs,
-            "status": "COMPLETED"
+            "total_results": total_results,
+            "reducers_used": len(self.reducer_outputs),
+            "reducer_outputs": [path.rsplit("/", 1)[-1] for path in self.reducer_outputs],
+            "status": "COMPLETED",
+            "tasks": self.completed_tasks
         }
-        metadata_path = f"jobs/{self.job_id}/job_metadata.json"
-        metadata_tuples = [(k, v) for k, v in metadata.items()]
-        self.hdfs.write_file(metadata_path, metadata_tuples, "METADATA")
-        
-        print(f"Fase REDUCE completada. {len(final_results)} resultados finales.")
-        print(f"Archivos de salida: {len(reducer_outputs)} reducers + 1 consolidado\n")
+        metadata.update(self.job_info)
+        if self.quarantine.entries:
+            # Registros que fallaron en todos los intentos, para revisarlos a mano
+            quarantine_path = self._job_path("quarantine.json")
+            self.hdfs.write_file(quarantine_path, enumerate(self.quarantine.entries), "QUARANTINE")
+            metadata["quarantined_records"] = len(self.quarantine)
+            self.logger.warning(f"{len(self.quarantine)} registros en cuarentena: /{quarantine_path}")
+        metadata["metrics"] = self.metrics.to_dict()
+        self._save_metadata(metadata)
+    
+    def read_output(self) -> Iterator[Tuple[Any, Any]]:
+        """
+        Vista consolidada de la salida del job: recorre de forma perezosa las
+        salidas de los reducers en orden, sin un archivo final duplicado.
         
-        return final_results
+        Returns:
+            Iterador de pares (clave, valor) finales
+        """
+        return chain.from_iterable(self.hdfs.read_file(path) for path in self.reducer_outputs)
     
-    def execute(self, input_data: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    def execute(self, input_data: Iterable[Tuple[Any, Any]], return_metrics: bool = False, resume: bool = False):
         """
         Ejecuta el pipeline completo de MapReduce con simulación HDFS.
         
         Args:
-            input_data: Datos de entrada como lista de pares (clave, valor)
+            input_data: Datos de entrada como pares (clave, valor) (lista o generador)
+            return_metrics: Si es True, devuelve también las métricas del job
+            resume: Si es True, retoma la última ejecución de este job_id: las
+                tareas marcadas como terminadas en job_metadata.json no se
+                repiten. La entrada debe ser la misma que la de esa ejecución
+        
+        Returns:
+            Resultados finales como lista de pares (clave, valor), o la tupla
+            (resultados, métricas) con return_metrics (ver JobMetrics.to_dict)
+        """
+        self.logger.info("Iniciando proceso MapReduce con simulación HDFS")
+        self.logger.info("=" * 60)
+        self._start_run()
+        self.job_info["run_config"] = {"input": "records", "map_split_size": self.materialization.map_split_size,
+                                       "num_reducers": self.num_reducers,
+                                       "partitioner": describe_partitioner(self.partitioner)}
+        if resume:
+            self._load_checkpoint()
+        
+        with self._failure_checkpoint(), self._io_pipeline():
+            # Fase 1: Map (un archivo de salida por tarea)
+            with self.metrics.phase("map"):
+                map_outputs = self._map_phase(input_data)
+            
+            return self._run_shuffle_and_reduce(map_outputs, return_metrics)
+    
+    def execute_file(self, file_path: str, skip_header: bool = False, encoding: str = "utf-8",
+                     return_metrics: bool = False, incremental: bool = False, resume: bool = False):
+        """
+        Ejecuta el job sobre un archivo de texto que ya está en HDFS (ver
+        HDFSSimulator.put_file). Se crea un input split por bloque y cada tarea
+        de map se planifica en un datanode que guarda ese bloque, sin que el
+        driver lea los datos. map_function recibe (desplazamiento, línea).
+        
+        Args:
+            file_path: Ruta del archivo en HDFS
+            skip_header: Si es True, descarta la primera línea (encabezado del CSV)
+            encoding: Codificación del archivo
+            return_metrics: Si es True, devuelve también las métricas del job
+            incremental: Si es True, procesa solo lo agregado al archivo desde la
+                última ejecución incremental de este job_id y lo mezcla con las
+                salidas guardadas de los reducers (ver _plan_incremental)
+            resume: Si es True, retoma la última ejecución de este job_id sobre
+                el mismo archivo sin repetir las tareas ya terminadas (no se
+                combina con incremental)
             
         Returns:
-            Resultados finales como lista de pares (clave, valor)
+            Resultados finales como lista de pares (clave, valor), o la tupla
+            (resultados, métricas) con return_metrics
         """
-        print("Iniciando proceso MapReduce con simulación HDFS")
-        print("=" * 60)
+        if incremental and resume:
+            raise ValueError("resume no se puede combinar con incremental")
+        self.logger.info(f"Iniciando proceso MapReduce sobre /{file_path}")
+        self.logger.info("=" * 60)
+        self._start_run()
         
-        # Fase 1: Map
-        intermediate_data = self._map_phase(input_data)
+        start_offset, end_offset, previous_outputs = 0, None, None
+        if incremental:
+            start_offset, end_offset, previous_outputs = self._plan_incremental(file_path)
+        elif self.result_cache is not None:
+            config = {"skip_header": skip_header, "encoding": encoding, "num_reducers": self.num_reducers,
+                      "partitioner": describe_partitioner(self.partitioner), "input_columns": self.input_columns}
+            fingerprint = self.result_cache.input_fingerprint(file_path)
+            cache_key = self.result_cache.make_key(self, config, fingerprint)
+            cached = self.result_cache.lookup(cache_key)
+            if cached is not None:
+                return self._cached_results(cached, return_metrics)
+            self.job_info["cache_key"] = cache_key
         
-        # Fase 2: Shuffle/Sort
-        grouped_data = self._shuffle_phase(intermediate_data)
+        # El archivo (tamaño y fecha de modificación) y la configuración deben
+        # coincidir para reutilizar las tareas de un checkpoint
+        self.job_info["run_config"] = {
+            "input_file": file_path, "input_size": self.hdfs.get_file_size(file_path),
+            "input_mtime": self.hdfs.get_modification_time(file_path), "skip_header": skip_header,
+            "encoding": encoding, "num_reducers": self.num_reducers,
+            "partitioner": describe_partitioner(self.partitioner)}
+        if resume:
+            self._load_checkpoint()
+        
+        with self._failure_checkpoint(), self._io_pipeline():
+            # Fase 1: Map (una tarea por bloque)
+            with self.metrics.phase("map"):
+                map_outputs = self._map_blocks_phase(file_path, skip_header, encoding, start_offset, end_offset)
+            
+            results = self._run_shuffle_and_reduce(map_outputs, return_metrics, previous_outputs)
+        if "cache_key" in self.job_info:
+            self.result_cache.store(self.job_info["cache_key"], self.job_id, fingerprint)
+        return results
+    
+    async def execute_async(self, input_data: Iterable[Tuple[Any, Any]], return_metrics: bool = False,
+                            resume: bool = False):
+        """
+        Versión para asyncio de execute: el job corre en un hilo aparte y el
+        bucle de eventos queda libre mientras tanto.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.execute, input_data, return_metrics, resume))
+    
+    async def execute_file_async(self, file_path: str, **kwargs: Any):
+        """
+        Versión para asyncio de execute_file (mismos argumentos).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.execute_file, file_path, **kwargs))
+    
+    def _cached_results(self, metadata: Dict[str, Any], return_metrics: bool):
+        """
+        Sirve el resultado de una ejecución anterior guardada en la caché:
+        las salidas de sus reducers se leen directamente de HDFS.
+        """
+        self.reducer_outputs = [f"jobs/{metadata['job_id']}/output/{name}" for name in metadata["reducer_outputs"]]
+        final_results = list(self.read_output())
+        self.metrics.incr("cache", "hits")
+        self.metrics.incr("reduce", "output_records", len(final_results))
+        
+        self.logger.info(f"Proceso MapReduce completado (resultado en caché del job {metadata['job_id']})!")
+        self.logger.info("=" * 60)
+        
+        if return_metrics:
+            return final_results, self.metrics.to_dict()
+        return final_results
+    
+    def _read_metadata(self) -> Dict[str, Any]:
+        """
+        Metadatos de la última ejecución de este job_id (vacío si no hay).
+        """
+        metadata_path = self._job_path("job_metadata.json")
+        if not self.hdfs.exists(metadata_path):
+            return {}
+        return dict(self.hdfs.read_file(metadata_path))
+    
+    def _input_checksum(self, file_path: str, offset: int) -> int:
+        """
+        CRC32 de los bytes anteriores a offset (a lo sumo _CHECKSUM_WINDOW).
+        """
+        start = max(0, offset - _CHECKSUM_WINDOW)
+        with self.hdfs.open_stream(file_path) as f:
+            f.seek(start)
+            return zlib.crc32(f.read(offset - start))
+    
+    def _last_line_end(self, file_path: str, size: int) -> int:
+        """
+        Posición siguiente al último salto de línea del archivo: una línea
+        final sin salto de línea puede estar a medio escribir, así que queda
+        para la próxima ejecución incremental.
+        """
+        with self.hdfs.open_stream(file_path) as f:
+            pos = size
+            while pos > 0:
+                start = max(0, pos - _CHECKSUM_WINDOW * 16)
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b"\n")
+                if newline != -1:
+                    return start + newline + 1
+                pos = start
+        return 0
+    
+    def _plan_incremental(self, file_path: str) -> Tuple[int, int, List[str]]:
+        """
+        Decide qué rango de la entrada procesar en modo incremental.
+        
+        Si la ejecución anterior de este job_id procesó el mismo archivo hasta
+        un desplazamiento, con el mismo número de reducers, el mismo
+        partitioner y la misma definición del job (job_source_hash), y los
+        bytes previos a ese desplazamiento no cambiaron, solo se mapea lo
+        agregado desde entonces y las salidas anteriores de los reducers se
+        mezclan con los resultados nuevos. Si no, se procesa el archivo completo.
+        
+        Mezclar resultados parciales solo es correcto si reduce_function es
+        asociativa y conmutativa y devuelve valores del mismo tipo que recibe
+        (sumas, conteos, máximos...), la misma condición que combine_function.
+        
+        Returns:
+            Desplazamiento inicial y final a procesar, y las salidas anteriores
+            de los reducers (None si se procesa todo)
+        """
+        if not has_combiner(self):
+            raise ValueError("El modo incremental requiere un reduce asociativo: defina combine_function")
+        
+        end_offset = self._last_line_end(file_path, self.hdfs.get_file_size(file_path))
+        previous = self._read_metadata()
+        start_offset, previous_outputs = 0, None
+        # Con otro reparto de claves o con otras funciones, las salidas guardadas no se pueden mezclar
+        partitioner = describe_partitioner(self.partitioner)
+        job_hash = job_source_hash(self)
+        
+        # Una ejecución interrumpida puede haber reescrito parte de las salidas: solo vale una completa
+        if (previous.get("status") == "COMPLETED" and previous.get("input_file") == file_path
+                and "input_offset" in previous):
+            offset = previous["input_offset"]
+            if (offset <= end_offset and previous.get("reducers_used") == self.num_reducers
+                    and previous.get("partitioner") == partitioner and previous.get("job_hash") == job_hash
+                    and previous.get("input_checksum") == self._input_checksum(file_path, offset)):
+                start_offset = offset
+                previous_outputs = [self._job_path(f"output/{name}") for name in previous["reducer_outputs"]]
+                self.logger.info(f"Modo incremental: procesando bytes {start_offset}-{end_offset} "
+                                 f"({end_offset - start_offset} bytes nuevos)")
+            else:
+                self.logger.warning("La entrada, la configuración o el job cambió desde la última ejecución: "
+                                    "se procesa el archivo completo")
+        
+        self.job_info.update(input_offset=end_offset, input_checksum=self._input_checksum(file_path, end_offset),
+                             previous_input_offset=start_offset, partitioner=partitioner, job_hash=job_hash)
+        return start_offset, end_offset, previous_outputs
+    
+    def _load_checkpoint(self):
+        """
+        Carga las marcas de las tareas terminadas en la última ejecución de
+        este job_id, si se hizo con la misma entrada y configuración.
+        """
+        previous = self._read_metadata()
+        if not previous.get("tasks"):
+            self.logger.info(f"No hay checkpoint del job {self.job_id}: se ejecuta completo")
+            return
+        if previous.get("run_config") != self.job_info["run_config"]:
+            self.logger.warning(f"La entrada o la configuración del job {self.job_id} cambió desde el "
+                                f"checkpoint: se ejecuta completo")
+            return
+        
+        self._resume_tasks = previous["tasks"]
+        self.metrics.incr("job", "resumed")
+        self.logger.info(f"Reanudando job {self.job_id} ({previous.get('status')}): "
+                         f"{len(self._resume_tasks.get('map', {}))} tareas MAP y "
+                         f"{len(self._resume_tasks.get('reduce', {}))} REDUCE ya terminadas")
+    
+    def _start_run(self):
+        # Información y métricas nuevas por ejecución; los bytes de HDFS se miden como diferencia
+        self.job_info = {}
+        self.completed_tasks = {"map": {}, "shuffle": {}, "reduce": {}}
+        self._resume_tasks = {}
+        self._unsaved_marks = 0
+        self.metrics = JobMetrics()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+        self._hdfs_bytes_start = (self.hdfs.bytes_read, self.hdfs.bytes_written)
+    
+    def _run_shuffle_and_reduce(self, map_outputs: List[str], return_metrics: bool = False,
+                                previous_outputs: List[str] = None):
+        # Las salidas de map encoladas deben estar en HDFS antes del shuffle
+        with self.metrics.phase("map"):
+            self._flush_io()
+            self._save_pending_marks()
+        
+        # Fase 2: Shuffle/Sort (una partición por reducer)
+        with self.metrics.phase("shuffle"):
+            partition_paths = self._shuffle_phase(map_outputs)
+            self._save_pending_marks()
         
         # Fase 3: Reduce
-        final_results = self._reduce_phase(grouped_data)
+        with self.metrics.phase("reduce"):
+            final_results = self._reduce_phase(partition_paths, previous_outputs)
+        
+        bytes_read, bytes_written = self._hdfs_bytes_start
+        self.metrics.incr("hdfs", "bytes_read", self.hdfs.bytes_read - bytes_read)
+        self.metrics.incr("hdfs", "bytes_written", self.hdfs.bytes_written - bytes_written)
+        self._write_metadata(len(final_results))
         
         # Mostrar estructura de archivos HDFS
         self._show_hdfs_structure()
         
-        print("Proceso MapReduce completado!")
-        print("=" * 60)
+        self.metrics.log_summary(self.logger)
+        self.logger.info("Proceso MapReduce completado!")
+        self.logger.info("=" * 60)
         
+        if return_metrics:
+            return final_results, self.metrics.to_dict()
         return final_results
     
     def _show_hdfs_structure(self):
         """
         Muestra la estructura de archivos creada en HDFS durante el job.
+        Lista un archivo por línea, por lo que solo se muestra en modo detallado.
         """
-        print("ESTRUCTURA DE ARCHIVOS HDFS:")
-        print("-" * 40)
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        self.logger.debug("ESTRUCTURA DE ARCHIVOS HDFS:")
+        self.logger.debug("-" * 40)
         
         files = self.hdfs.list_files()
         for file_path in files:
             if self.job_id in file_path:
-                file_size = (self.hdfs.base_path / file_path).stat().st_size
-                print(f"   /{file_path} ({file_size} bytes)")
+                file_size = self.hdfs.get_file_size(file_path)
+                self.logger.debug(f"   /{file_path} ({file_size} bytes)")
         
-        print()
+        self.logger.debug("")
     
     def cleanup_hdfs(self):
         """
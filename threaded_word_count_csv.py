@@ -1,12 +1,21 @@
-from typing import Any, Tuple, List
+from typing import Any, Dict, Iterable, Sequence, Tuple, List
 import csv
-import io
+import logging
 import os
-import threading
 import time
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from columnar import value_counts
+from external_shuffle import ExternalShuffle, new_intermediate_buffer
+from input_formats import CSVInputFormat
+from input_readers import parse_csv_line
+from job_logging import INFO, ProgressCounter, get_logger
+from fault_tolerance import (Quarantine, RetryPolicy, map_records_skipping, quarantine_entry, reduce_groups_skipping,
+                             run_tasks)
+from job_metrics import JobMetrics
 from map_reduce_interface import MapReduceInterface
+from map_reduce_utils import batched, batched_records, iter_groups, map_records
+from numeric_aggregation import NumericAggregator, get_aggregation
 
 
 class ThreadedWordCountMapReduce(MapReduceInterface):
@@ -14,32 +23,45 @@ class ThreadedWordCountMapReduce(MapReduceInterface):
     Implementación de MapReduce con hilos para contador de palabras.
     """
     
-    def __init__(self, num_threads: int = None):
-        self.num_threads = num_threads or os.cpu_count()
-        self.lock = threading.Lock()
-        print(f"Usando {self.num_threads} hilos (CPUs detectadas: {os.cpu_count()})")
+    # Cada bloque de un hilo se proyecta a la columna 6 antes de contarlo
+    input_columns = (6,)
+    # Los conteos parciales de cada bloque (combine_function o
+    # map_batch_function) se suman por clave en el shuffle, sin listas
+    numeric_aggregation = "sum"
     
-    def map_function(self, key: Any, value: str) -> List[Tuple[str, int]]:
+    def __init__(self, num_threads: int = None, chunk_size: int = 10000, verbosity: int = INFO,
+                 shuffle_mode: str = "memory", max_records_in_memory: int = 1000000,
+                 retry_policy: RetryPolicy = None):
+        self.num_threads = num_threads or os.cpu_count()
+        self.chunk_size = chunk_size
+        # "external" vuelca corridas ordenadas a disco cuando se supera max_records_in_memory
+        self.shuffle_mode = shuffle_mode
+        self.max_records_in_memory = max_records_in_memory
+        self.metrics = JobMetrics()
+        # Reintentos por bloque, cuarentena de registros y ejecución especulativa
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
+        # El logging ya es seguro entre hilos: no hace falta un lock global por registro
+        self.logger = get_logger(type(self).__name__, verbosity)
+        self.logger.info(f"Usando {self.num_threads} hilos (CPUs detectadas: {os.cpu_count()})")
+
+    def map_function(self, key: Any, value: Any) -> List[Tuple[str, int]]:
+        # Acepta filas ya parseadas (read_csv_rows) o registros crudos (str o bytes; los
+        # memoryview llegan copiados a bytes, porque los bloques se arman antes de mapear)
         results = []
         
-        if not value or not value.strip():
+        if not value or (isinstance(value, str) and not value.strip()):
             return results
             
-        csv_file = io.StringIO(value)
         try:
-            csv_reader = csv.reader(csv_file)
-            columns = next(csv_reader)
+            columns = parse_csv_line(value)
             
             if len(columns) >= 7:
-                with self.lock:
-                    print(f"{columns[0]}: {columns[6].lower()}")
+                self.logger.debug("%s: %s", columns[0], columns[6])
                 results.append((columns[6], 1))
         
-        except (csv.Error, StopIteration) as e:
-            with self.lock:
-                print(f"Error al leer la línea: {e}")
-        finally:
-            csv_file.close()
+        except csv.Error as e:
+            self.logger.warning("Error al leer la línea: %s", e)
         
         return results
 
@@ -47,31 +69,103 @@ class ThreadedWordCountMapReduce(MapReduceInterface):
         total_count = sum(values)
         return [(key, total_count)]
 
-    def _threaded_map_phase(self, input_data: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    def combine_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        # El conteo es asociativo: cada bloque suma sus propios unos antes del shuffle
+        return [(key, sum(values))]
+
+    def map_batch_function(self, columns: Dict[int, Sequence[str]]) -> List[Tuple[str, int]]:
+        # Modo por columnas: un conteo por bloque en lugar de un par (país, 1) por fila
+        return value_counts(columns[6])
+
+    def _map_chunk(self, task_id: int, chunk: List[Tuple[Any, Any]],
+                   attempt: int) -> Tuple[int, List[Tuple[Any, Any]], List[Dict[str, Any]]]:
+        """
+        Mapea un bloque de registros como una sola tarea del pool.
+        Si hay combine_function, la salida del bloque se pre-agrega; con modo
+        por columnas, el bloque completo se mapea de una vez. Si un registro
+        falla, falla la tarea y run_tasks la reintenta.
+        
+        Returns:
+            Registros del bloque, pares intermedios y registros en cuarentena (ninguno)
+        """
+        return len(chunk), map_records(self, chunk), []
+    
+    def _map_chunk_skipping(self, task_id: int, chunk: List[Tuple[Any, Any]],
+                            attempt: int) -> Tuple[int, List[Tuple[Any, Any]], List[Dict[str, Any]]]:
+        """
+        Último intento de una tarea de map: registro a registro, apartando los
+        registros que fallan. Cada intento devuelve su propia cuarentena: solo
+        se guarda la del intento que gana (ver _run_tasks).
+        """
+        quarantined = []
+        mapped = map_records_skipping(self, chunk, lambda key, value, exc: quarantined.append(
+            quarantine_entry("map", task_id, key, value, exc)))
+        return len(chunk), mapped, quarantined
+    
+    def _run_tasks(self, phase: str, fn, skip_fn, tasks: Iterable[Tuple[int, List[Any]]]):
+        """
+        Ejecuta las tareas de una fase en el pool de hilos con la política de
+        reintentos y registra la duración y los registros de cada una.
+        
+        Returns:
+            Generador de las salidas de las tareas, en orden de término
+        """
+        executor = ThreadPoolExecutor(max_workers=self.num_threads)
+        try:
+            # A lo sumo dos tareas en vuelo por hilo: los resultados se recogen a medida que terminan
+            for task_id, (records, output, quarantined), seconds in run_tasks(
+                    executor, fn, tasks, self.num_threads * 2, self.num_threads, self.retry_policy,
+                    skip_fn, phase, self.logger, self.metrics):
+                self.metrics.add_task(phase, task_id, seconds, records)
+                if quarantined:
+                    # Solo la cuarentena del intento ganador: un intento especulativo
+                    # del mismo bloque habría apartado los mismos registros
+                    for entry in quarantined:
+                        self.logger.warning(f"{phase.upper()} falló para {entry['key']} en el bloque {task_id}: "
+                                            f"{entry['error']}; en cuarentena")
+                    self.metrics.incr(phase, "quarantined_records", len(quarantined))
+                    self.quarantine.extend(quarantined)
+                yield output
+        finally:
+            # Los intentos especulativos que perdieron no se esperan
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _threaded_map_phase(self, input_data: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
         start_time = time.time()
-        print("Iniciando fase MAP con hilos...")
+        self.logger.info(f"Iniciando fase MAP con hilos (bloques de {self.chunk_size} registros)...")
         
-        intermediate_results = []
+        intermediate_results = new_intermediate_buffer(self.shuffle_mode, self.max_records_in_memory,
+                                                       aggregation=get_aggregation(self))
+        progress = ProgressCounter(self.logger, "MAP")
         
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            future_to_data = {executor.submit(self.map_function, key, value): (key, value) 
-                             for key, value in input_data}
-            
-            for future in as_completed(future_to_data):
-                key, value = future_to_data[future]
-                try:
-                    mapped = future.result()
-                    intermediate_results.extend(mapped)
-                except Exception as exc:
-                    print(f'MAP falló para ({key}, {value}): {exc}')
+        # Una tarea por bloque de registros
+        chunks = enumerate(progress.track_batches(batched_records(input_data, self.chunk_size)))
+        for mapped in self._run_tasks("map", self._map_chunk, self._map_chunk_skipping, chunks):
+            intermediate_results.extend(mapped)
         
+        self.metrics.incr("map", "input_records", progress.count)
+        self.metrics.incr("map", "output_records", len(intermediate_results))
+        self.metrics.incr("map", "tasks", len(self.metrics.tasks["map"]))
         end_time = time.time()
-        print(f"Fase MAP completada en {end_time - start_time:.2f}s. {len(intermediate_results)} pares intermedios generados.\n")
+        self.logger.info(f"Fase MAP completada en {end_time - start_time:.2f}s. {progress.count} registros, {len(intermediate_results)} pares intermedios generados.\n")
         return intermediate_results
 
     def _shuffle_phase(self, intermediate_data: List[Tuple[Any, Any]]) -> dict:
         start_time = time.time()
-        print("Iniciando fase SHUFFLE...")
+        self.logger.info("Iniciando fase SHUFFLE...")
+        
+        self.metrics.incr("shuffle", "input_records", len(intermediate_data))
+        if isinstance(intermediate_data, ExternalShuffle):
+            self.metrics.incr("shuffle", "spills", intermediate_data.spill_count)
+            # La mezcla de corridas se hace de forma perezosa mientras REDUCE consume los grupos
+            self.logger.info(f"Fase SHUFFLE externa: {intermediate_data.spill_count} corridas en disco.\n")
+            return intermediate_data.groups()
+        if isinstance(intermediate_data, NumericAggregator):
+            # Los valores ya se acumularon por clave al recoger la salida de MAP
+            self.metrics.incr("shuffle", "groups", intermediate_data.num_keys)
+            self.logger.info(f"Fase SHUFFLE completada. {intermediate_data.num_keys} claves agregadas "
+                             f"({intermediate_data.aggregation}).\n")
+            return intermediate_data
         
         grouped_data = defaultdict(list)
         
@@ -79,65 +173,117 @@ class ThreadedWordCountMapReduce(MapReduceInterface):
             grouped_data[key].append(value)
             
         sorted_groups = dict(sorted(grouped_data.items()))
+        self.metrics.incr("shuffle", "groups", len(sorted_groups))
         
-        for key, values in sorted_groups.items():
-            print(f"   SHUFFLE: {key} -> {values}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for key, values in sorted_groups.items():
+                self.logger.debug(f"   SHUFFLE: {key} -> {values}")
             
         end_time = time.time()
-        print(f"Fase SHUFFLE completada en {end_time - start_time:.2f}s. {len(sorted_groups)} grupos creados.\n")
+        self.logger.info(f"Fase SHUFFLE completada en {end_time - start_time:.2f}s. {len(sorted_groups)} grupos creados.\n")
         return sorted_groups
 
-    def _threaded_reduce_phase(self, grouped_data: dict) -> List[Tuple[Any, Any]]:
+    def _reduce_groups(self, task_id: int, groups: List[Tuple[Any, List[Any]]],
+                       attempt: int) -> Tuple[int, List[Tuple[Any, Any]], List[Dict[str, Any]]]:
+        """
+        Reduce un bloque de grupos como una sola tarea del pool.
+        
+        Returns:
+            Grupos del bloque, pares finales y grupos en cuarentena (ninguno)
+        """
+        results = []
+        for key, values in groups:
+            results.extend(self.reduce_function(key, values))
+        return len(groups), results, []
+    
+    def _reduce_groups_skipping(self, task_id: int, groups: List[Tuple[Any, List[Any]]],
+                                attempt: int) -> Tuple[int, List[Tuple[Any, Any]], List[Dict[str, Any]]]:
+        """
+        Último intento de una tarea de reduce: aparta los grupos que fallan en
+        la cuarentena del intento (ver _map_chunk_skipping).
+        """
+        quarantined = []
+        reduced = list(reduce_groups_skipping(self, groups, lambda key, values, exc: quarantined.append(
+            quarantine_entry("reduce", task_id, key, values, exc))))
+        return len(groups), reduced, quarantined
+
+    def _threaded_reduce_phase(self, grouped_data) -> List[Tuple[Any, Any]]:
         start_time = time.time()
-        print("Iniciando fase REDUCE con hilos...")
+        self.logger.info("Iniciando fase REDUCE con hilos...")
+        
+        if isinstance(grouped_data, NumericAggregator):
+            # La agregación numérica reemplaza a reduce_function: no hay tareas que repartir
+            final_results = grouped_data.results()
+            self.metrics.incr("reduce", "input_groups", len(final_results))
+            self.metrics.incr("reduce", "output_records", len(final_results))
+            self.logger.info(f"Fase REDUCE completada en {time.time() - start_time:.2f}s. "
+                             f"{len(final_results)} resultados finales.\n")
+            return final_results
         
         final_results = []
         
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            future_to_key = {executor.submit(self.reduce_function, key, values): key 
-                            for key, values in grouped_data.items()}
-            
-            for future in as_completed(future_to_key):
-                key = future_to_key[future]
-                try:
-                    reduced = future.result()
-                    final_results.extend(reduced)
-                except Exception as exc:
-                    print(f'REDUCE falló para {key}: {exc}')
+        # Una tarea por bloque de grupos (no por clave): reducir una clave es
+        # mucho más barato que crear un futuro. Los bloques se arman a medida
+        # que hay hilos libres, así también funciona con el shuffle externo.
+        # Para reducers realmente paralelos (sin GIL) usar ProcessPoolMapReduce
+        blocks = enumerate(batched(iter_groups(grouped_data), self.chunk_size))
+        for reduced in self._run_tasks("reduce", self._reduce_groups, self._reduce_groups_skipping, blocks):
+            final_results.extend(reduced)
         
+        reduce_tasks = self.metrics.tasks["reduce"]
+        self.metrics.incr("reduce", "input_groups", sum(groups for _, _, groups in reduce_tasks))
+        self.metrics.incr("reduce", "output_records", len(final_results))
+        self.metrics.incr("reduce", "tasks", len(reduce_tasks))
         end_time = time.time()
-        print(f"Fase REDUCE completada en {end_time - start_time:.2f}s. {len(final_results)} resultados finales.\n")
+        self.logger.info(f"Fase REDUCE completada en {end_time - start_time:.2f}s. {len(final_results)} resultados finales.\n")
         return final_results
 
-    def execute(self, input_data: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    def execute(self, input_data: Iterable[Tuple[Any, Any]], return_metrics: bool = False):
+        """
+        Ejecuta el pipeline completo de MapReduce con hilos.
+        
+        Args:
+            input_data: Datos de entrada como pares (clave, valor)
+            return_metrics: Si es True, devuelve también las métricas del job
+        
+        Returns:
+            Resultados finales, o la tupla (resultados, métricas) con return_metrics
+        """
         total_start = time.time()
-        print("Iniciando proceso MapReduce con hilos")
-        print("=" * 50)
+        self.logger.info("Iniciando proceso MapReduce con hilos")
+        self.logger.info("=" * 50)
+        self.metrics = JobMetrics()
+        self.quarantine = Quarantine(self.retry_policy.max_quarantined)
         
         # Fase 1: Map con hilos
-        intermediate_data = self._threaded_map_phase(input_data)
+        with self.metrics.phase("map"):
+            intermediate_data = self._threaded_map_phase(input_data)
         
         # Fase 2: Shuffle/Sort
-        grouped_data = self._shuffle_phase(intermediate_data)
+        with self.metrics.phase("shuffle"):
+            grouped_data = self._shuffle_phase(intermediate_data)
         
         # Fase 3: Reduce con hilos
-        final_results = self._threaded_reduce_phase(grouped_data)
+        with self.metrics.phase("reduce"):
+            final_results = self._threaded_reduce_phase(grouped_data)
         
         total_end = time.time()
-        print(f"Proceso MapReduce con hilos completado en {total_end - total_start:.2f}s!")
-        print("=" * 50)
+        self.metrics.log_summary(self.logger)
+        if self.quarantine.entries:
+            self.logger.warning(f"{len(self.quarantine)} registros en cuarentena (ver self.quarantine.entries)")
+        self.logger.info(f"Proceso MapReduce con hilos completado en {total_end - total_start:.2f}s!")
+        self.logger.info("=" * 50)
         
+        if return_metrics:
+            return final_results, self.metrics.to_dict()
         return final_results
 
 
 # Ejemplo de uso
 if __name__ == "__main__":
-    with open("data/customers-2000000.csv", "r", encoding="utf-8") as file:
-        text = file.read()
-        
-    chunks = text.split("\n")[1:]  # Eliminar encabezado
-    
-    documents = [(index, chunk) for index, chunk in enumerate(chunks) if chunk.strip()]
+    # Registros sin decodificar (bytes): se leen del archivo mapeado en memoria
+    # y cada hilo los decodifica y parsea dentro de map_function
+    documents = CSVInputFormat(raw_values="bytes").read_records("data/customers-2000000.csv")
         
     print("EJEMPLO: Contador de Palabras con MapReduce usando Hilos")
     print("=" * 60)
@@ -1,7 +1,9 @@
-from typing import Any, Tuple, List
+from typing import Any, Dict, Sequence, Tuple, List
+from columnar import value_counts
+from input_formats import CSVInputFormat
+from input_readers import parse_csv_line
 from simple_map_reduce import SimpleMapReduce
 import csv
-import io
 import time
 
 
@@ -10,29 +12,33 @@ class WordCountMapReduce(SimpleMapReduce):
     Ejemplo clásico: Contador de palabras usando MapReduce.
     """
     
-    def map_function(self, key: Any, value: str) -> List[Tuple[str, int]]:
-        #usamos io.StringIO para convertir el string en un objeto file
+    # La columna 6 de cada bloque llega como np.ndarray (si NumPy está
+    # instalado) y value_counts la cuenta con np.unique
+    input_columns = (6,)
+    columns_as_arrays = True
+    # Los conteos de np.unique (o los unos de map_function) se suman por
+    # valor de la columna 6 en el shuffle, sin llamar a reduce_function
+    numeric_aggregation = "sum"
+    
+    def map_function(self, key: Any, value: Any) -> List[Tuple[str, int]]:
+        # value es una fila ya parseada (read_csv_rows) o un registro crudo (str, bytes o memoryview)
         
         results = []
         
         # Verificar si la línea está vacía o solo contiene espacios
-        if not value or not value.strip():
+        if not value or (isinstance(value, str) and not value.strip()):
             return results
             
-        csv_file = io.StringIO(value)
         try:
-            csv_reader = csv.reader(csv_file)
-            columns = next(csv_reader)
+            columns = parse_csv_line(value)
             
             # Verificar que la línea tenga al menos 7 columnas
             if len(columns) >= 7:
-                print(f"{columns[0]}: {columns[6].lower()}")
+                self.logger.debug("%s: %s", columns[0], columns[6])
                 results.append((columns[6], 1))
         
-        except (csv.Error, StopIteration) as e:
-            print(f"Error al leer la línea: {e}")
-        finally:
-            csv_file.close()
+        except csv.Error as e:
+            self.logger.warning("Error al leer la línea: %s", e)
         
         return results
 
@@ -41,29 +47,28 @@ class WordCountMapReduce(SimpleMapReduce):
         total_count = sum(values)
         return [(key, total_count)]
 
+    def combine_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        """
+        Suma parcial de conteos dentro de cada tarea de map.
+        """
+        return [(key, sum(values))]
+
+    def map_batch_function(self, columns: Dict[int, Sequence[str]]) -> List[Tuple[str, int]]:
+        """
+        Cuenta la columna 6 de un bloque completo de filas de una sola vez.
+        """
+        return value_counts(columns[6])
+
 
 
 
 # Ejemplo de uso
 if __name__ == "__main__":
-    # Datos de ejemplo: documentos de texto
-    
-    with open("data/customers-2000000.csv", "r", encoding="utf-8") as file:
-        text = file.read()
-        
-    # Creamos chucks por linea
-    chunks = text.split("\n")
-    
-    # eliminamos el encabezado del csv
-    chunks = chunks[1:]
-    
-    documents = []
-    
-    # iteramos los chunks y generamos una lista de documentos por chunk, el indice es un consecutivo
-    # Filtramos líneas vacías
-    for index, chunk in enumerate(chunks):
-        if chunk.strip():  # Solo agregar líneas que no estén vacías
-            documents.append((index, chunk))
+    # Recorremos el CSV mapeado en memoria sin crear un str por línea: cada
+    # registro llega a map_function como una vista (memoryview) de sus bytes y
+    # solo se decodifica al parsearlo con parse_csv_line. Se omite el encabezado
+    # y las filas vacías; la clave es el desplazamiento en bytes del registro
+    documents = CSVInputFormat(raw_values="memoryview").read_records("data/customers-2000000.csv")
         
     
     print("EJEMPLO: Contador de Palabras con MapReduce")
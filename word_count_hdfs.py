@@ -21,6 +21,12 @@ class WordCountMapReduce(SimpleMapReduceHDFS):
         total_count = sum(values)
         return [(key, total_count)]
 
+    def combine_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        """
+        Suma parcial de conteos dentro de cada tarea de map.
+        """
+        return [(key, sum(values))]
+
 
 # Ejemplo de uso
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
-import csv
-import io
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
 
+from columnar import value_counts
+from input_readers import parse_csv_line, read_csv_rows
 from simple_map_reduce import SimpleMapReduce
 
 
@@ -10,19 +10,23 @@ class WordCountMapReduce(SimpleMapReduce):
     Ejemplo clásico: Contador de palabras usando MapReduce.
     """
 
-    def map_function(self, key: Any, value: str) -> List[Tuple[str, int]]:
-        # Usamos un diccionario para contar palabras
-        csv_file = io.StringIO(value)
+    # map_batch_function cuenta la misma columna que map_function (columns[6])
+    input_columns = (6,)
+    # reduce_function solo suma los unos de cada valor de la columna 6: el
+    # shuffle guarda un total por valor en lugar de la lista de unos
+    numeric_aggregation = "sum"
+
+    def map_function(self, key: Any, value: Any) -> List[Tuple[str, int]]:
+        # value llega como fila ya parseada (read_csv_rows) o como línea cruda
         results = []
         try:
-            reader = csv.reader(csv_file)
-            columns = next(reader)  # Leer la primera fila como encabezados
-            print("Encabezados:", columns)
+            columns = parse_csv_line(value)
+            self.logger.debug("Encabezados: %s", columns)
             results.append(
                 (columns[6], 1)
             )  # Guardar el número de columnas como un ejemplo
         except Exception as e:
-            print("Error al leer el CSV:", e)
+            self.logger.warning("Error al leer el CSV: %s", e)
 
         return results
 
@@ -32,23 +36,23 @@ class WordCountMapReduce(SimpleMapReduce):
         total_count = sum(values)
         return [(key, total_count)]
 
+    def combine_function(self, key: str, values: List[int]) -> List[Tuple[str, int]]:
+        # Suma parcial de conteos antes del shuffle
+        return [(key, sum(values))]
 
-# Ejemplo de uso
-if __name__ == "__main__":
+    def map_batch_function(
+        self, columns: Dict[int, Sequence[str]]
+    ) -> List[Tuple[str, int]]:
+        # Conteo vectorizado de la columna completa del bloque
+        return value_counts(columns[6])
 
-    with open("data/customers-2000000.csv", "r", encoding="utf-8") as f:
-        file = f.read()
 
-    # Datos de ejemplo: documentos de texto
-    documents = []
-    # Creamos chunks por line
-    chunks = file.split("\n")
-    chunks = chunks[1::]  # Limitar a los primeros 1000 para pruebas
+# Ejemplo de uso
+if __name__ == "__main__":
 
-    # Iteramos sobre los chunks y los agregamos a la lista de documentos
-    # Cada chunk es una tupla (índice, contenido del chunk)
-    for index, chunk in enumerate(chunks):
-        documents.append((index, chunk))
+    # Cada fila del CSV (sin encabezado) es una tupla (índice, columnas).
+    # El archivo se parsea con un solo csv.reader, de forma perezosa
+    documents = read_csv_rows("data/customers-2000000.csv")
 
     print("EJEMPLO: Contador de Palabras con MapReduce")
     print("=" * 60)